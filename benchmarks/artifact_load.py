@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from model.artifact_bundle import ArtifactBundle  # noqa: E402
+
+PICKLE_LOAD = '''
+import pickle, time
+started = time.perf_counter()
+import xgboost
+imported = time.perf_counter()
+for name in ['temperature_model.pkl', 'condition_model.pkl', 'temperature_features.pkl', 'condition_features.pkl']:
+    with open({dir!r} + '/' + name, 'rb') as f:
+        pickle.load(f)
+print(imported - started, time.perf_counter() - imported)
+'''
+
+BUNDLE_LOAD = '''
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+from model.artifact_bundle import ArtifactBundle
+imported = time.perf_counter()
+bundle = ArtifactBundle({dir!r})
+bundle.reg_model, bundle.clf_model
+print(imported - started, time.perf_counter() - imported)
+'''
+
+
+def _write_legacy_pickles(bundle, target_dir):
+    """
+    Write the same models in the old pickle layout for comparison.
+    """
+    for name, model in [('temperature', bundle.reg_model), ('condition', bundle.clf_model)]:
+        with open(os.path.join(target_dir, f'{name}_model.pkl'), 'wb') as f:
+            pickle.dump(model, f)
+        with open(os.path.join(target_dir, f'{name}_features.pkl'), 'wb') as f:
+            pickle.dump(bundle.features(name), f)
+
+
+def _cold_runs(code, runs):
+    imports, loads, walls = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        walls.append(time.perf_counter() - started)
+        import_s, load_s = map(float, out.stdout.strip().splitlines()[-1].split())
+        imports.append(import_s)
+        loads.append(load_s)
+    return {
+        'import_ms_median': round(statistics.median(imports) * 1000, 2),
+        'load_ms_median': round(statistics.median(loads) * 1000, 2),
+        'process_ms_median': round(statistics.median(walls) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold load time of pickle vs. versioned bundle artifacts.")
+    parser.add_argument('--artifacts-dir', default='artifacts')
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    artifacts_dir = os.path.abspath(args.artifacts_dir)
+    bundle = ArtifactBundle(artifacts_dir)
+    with tempfile.TemporaryDirectory() as legacy_dir:
+        _write_legacy_pickles(bundle, legacy_dir)
+        results = {
+            'version': bundle.version,
+            'pickle': _cold_runs(PICKLE_LOAD.format(dir=legacy_dir), args.runs),
+            'bundle': _cold_runs(BUNDLE_LOAD.format(root=REPO_ROOT, dir=artifacts_dir), args.runs),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from model.artifact_bundle import ArtifactBundle  # noqa: E402
+from model.compiled_trees import load_compiled, predict_compiled  # noqa: E402
+
+XGBOOST_PATH = '''
+import sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import numpy as np
+from model.artifact_bundle import ArtifactBundle
+bundle = ArtifactBundle({dir!r})
+reg, clf, le = bundle.reg_model, bundle.clf_model, bundle.label_encoder
+loaded = time.perf_counter()
+reg.predict(np.load({temp!r})), le.inverse_transform(clf.predict(np.load({cond!r})))
+print(loaded - started, time.perf_counter() - loaded, 'xgboost' in sys.modules, 'pandas' in sys.modules)
+'''
+
+COMPILED_PATH = '''
+import sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import numpy as np
+from model.compiled_trees import load_compiled, predict_compiled
+compiled = load_compiled({dir!r})
+loaded = time.perf_counter()
+predict_compiled(compiled, np.load({temp!r}), np.load({cond!r}))
+print(loaded - started, time.perf_counter() - loaded, 'xgboost' in sys.modules, 'pandas' in sys.modules)
+'''
+
+
+def _sample_matrix(features, n_rows, n_classes, rng, missing_rate=0.02):
+    X = rng.uniform(0, 30, (n_rows, len(features))).astype(np.float32)
+    X[rng.random(X.shape) < missing_rate] = np.nan
+    if 'weather_condition' in features:
+        X[:, features.index('weather_condition')] = rng.integers(n_classes, size=n_rows)
+    return X
+
+
+def _cold_runs(code, runs):
+    loads, predicts, walls = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        walls.append(time.perf_counter() - started)
+        load_s, predict_s, xgboost_loaded, pandas_loaded = out.stdout.strip().splitlines()[-1].split()
+        loads.append(float(load_s))
+        predicts.append(float(predict_s))
+    return {
+        'import_and_load_ms_median': round(statistics.median(loads) * 1000, 2),
+        'first_batch_ms_median': round(statistics.median(predicts) * 1000, 2),
+        'process_ms_median': round(statistics.median(walls) * 1000, 2),
+        'imports_xgboost': xgboost_loaded == 'True',
+        'imports_pandas': pandas_loaded == 'True',
+    }
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 4)
+
+
+def run_benchmark(artifacts_dir, batch_sizes=(1, 24, 256, 4096), runs=5, cold_batch=24, seed=0):
+    """
+    Compare the XGBoost estimators of the current bundle with its compiled
+    trees: output equivalence, cold start of a fresh process that loads the
+    models and scores one batch, and warm per-batch latency.
+
+    Returns:
+        dict: 'equivalence', 'cold_start' and 'per_batch' results.
+    """
+    bundle = ArtifactBundle(artifacts_dir)
+    reg, clf, le = bundle.reg_model, bundle.clf_model, bundle.label_encoder
+    compiled = load_compiled(artifacts_dir)
+    rng = np.random.default_rng(seed)
+    n_classes = len(le.classes_)
+    X_temp = _sample_matrix(compiled['temp_features'], max(batch_sizes), n_classes, rng)
+    X_cond = _sample_matrix(compiled['cond_features'], max(batch_sizes), n_classes, rng)
+
+    temperatures, conditions = predict_compiled(compiled, X_temp, X_cond)
+    proba = clf.predict_proba(X_cond)
+    equivalence = {
+        'rows': len(X_temp),
+        'temperature_max_abs_diff': float(np.abs(reg.predict(X_temp) - temperatures).max()),
+        'condition_agreement': float(np.mean(le.inverse_transform(clf.predict(X_cond)) == conditions)),
+        'probability_max_abs_diff': float(np.abs(proba - compiled['condition'].predict_proba(X_cond)).max()),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {'temp': os.path.join(tmp, 'temp.npy'), 'cond': os.path.join(tmp, 'cond.npy')}
+        np.save(paths['temp'], X_temp[:cold_batch])
+        np.save(paths['cond'], X_cond[:cold_batch])
+        cold_start = {
+            'batch_rows': cold_batch,
+            'xgboost': _cold_runs(XGBOOST_PATH.format(root=REPO_ROOT, dir=artifacts_dir, **paths), runs),
+            'compiled': _cold_runs(COMPILED_PATH.format(root=REPO_ROOT, dir=artifacts_dir, **paths), runs),
+        }
+
+    per_batch = []
+    for size in batch_sizes:
+        repeat = max(5, min(200, 20000 // size))
+        per_batch.append({
+            'rows': size,
+            'xgboost_ms': _median_ms(lambda: (reg.predict(X_temp[:size]),
+                                              le.inverse_transform(clf.predict(X_cond[:size]))), repeat),
+            'compiled_ms': _median_ms(lambda: predict_compiled(compiled, X_temp[:size], X_cond[:size]), repeat),
+        })
+    return {
+        'version': bundle.version,
+        'trees': {'temperature': len(compiled['temperature'].roots), 'condition': len(compiled['condition'].roots)},
+        'equivalence': equivalence,
+        'cold_start': cold_start,
+        'per_batch': per_batch,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare XGBoost and compiled NumPy tree inference.")
+    parser.add_argument('--artifacts-dir', default='artifacts')
+    parser.add_argument('--runs', type=int, default=5, help="Cold-start processes per path.")
+    parser.add_argument('--batch-sizes', default='1,24,256,4096')
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    print(json.dumps(run_benchmark(os.path.abspath(args.artifacts_dir), batch_sizes, args.runs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
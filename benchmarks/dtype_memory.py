@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic_weather import synthetic_hourly, synthetic_sites  # noqa: E402
+from model.data_fetcher import HOURLY_VARIABLES  # noqa: E402
+from model.data_preprocessor import RAW_DTYPES, enforce_schema, preprocess_data  # noqa: E402
+from model.feature_engineering import feature_engineering_pipeline  # noqa: E402
+from model.instrumentation import frame_memory_mb  # noqa: E402
+from model.model_retrain_automation import create_lagged_features  # noqa: E402
+
+
+def legacy_dtypes(df):
+    """
+    The same frame in the dtypes the pipeline used before the compact schema:
+    float64/int64 numbers and Python string objects for labels.
+    """
+    casts = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            casts[col] = object
+        elif str(dtype) == 'Int8' or dtype.kind == 'f':
+            casts[col] = np.float64
+        elif dtype.kind in 'iu':
+            casts[col] = np.int64
+    return df.astype(casts)
+
+
+def memory_report(years=3, sites=1):
+    """
+    Build the raw, preprocessed, feature and lagged frames of synthetic sites
+    and compare their memory in the compact schema against the old dtypes.
+
+    Returns:
+        list: One dict per stage with rows, compact and legacy MiB and the reduction.
+    """
+    stages = {}
+    for index, (_, latitude, _) in enumerate(synthetic_sites(sites)):
+        raw = enforce_schema(synthetic_hourly(years, site=index, latitude=latitude), RAW_DTYPES)
+        df = preprocess_data(raw.copy())
+        features, _ = feature_engineering_pipeline(df.copy())
+        lagged = create_lagged_features(features).dropna()
+        for name, frame in [('fetch', raw[['time'] + HOURLY_VARIABLES]), ('preprocess_data', df),
+                            ('feature_engineering', features), ('create_lagged_features', lagged)]:
+            totals = stages.setdefault(name, {'rows': 0, 'compact_mb': 0.0, 'legacy_mb': 0.0})
+            totals['rows'] += len(frame)
+            totals['compact_mb'] += frame_memory_mb(frame)
+            totals['legacy_mb'] += frame_memory_mb(legacy_dtypes(frame))
+    return [
+        {'stage': name, 'rows': t['rows'], 'compact_mb': round(t['compact_mb'], 2),
+         'legacy_mb': round(t['legacy_mb'], 2), 'reduction': round(1 - t['compact_mb'] / t['legacy_mb'], 3)}
+        for name, t in stages.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of each pipeline frame, compact schema vs. old dtypes.")
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--sites', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    report = memory_report(args.years, args.sites)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'stage':24} {'rows':>9} {'compact MB':>11} {'legacy MB':>10} {'saved':>7}")
+    for row in report:
+        print(f"{row['stage']:24} {row['rows']:>9} {row['compact_mb']:>11.2f} {row['legacy_mb']:>10.2f} "
+              f"{row['reduction']:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
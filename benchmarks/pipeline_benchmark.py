@@ -0,0 +1,266 @@
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import xgboost as xgb  # noqa: E402
+
+from benchmarks.synthetic_weather import synthetic_hourly, synthetic_sites  # noqa: E402
+from model import data_preprocessor, feature_engineering, model_retrain_automation, training_orchestrator  # noqa: E402
+from model.artifact_bundle import publish_bundle  # noqa: E402
+from model.data_preprocessor import preprocess_data  # noqa: E402
+from model.feature_engineering import feature_engineering_pipeline  # noqa: E402
+from model.forecasting import forecast_recursive  # noqa: E402
+from model.instrumentation import rss_mb  # noqa: E402
+from model.lag_features import DEFAULT_LAGS, normalize_lags  # noqa: E402
+from model.model_retrain_automation import create_lagged_features, predict_next_step  # noqa: E402
+from model.training_orchestrator import build_training_matrix, fit_full  # noqa: E402
+
+DEFAULT_TOLERANCE = 0.2
+
+# Inner functions timed separately, as (module, attribute name). They are
+# looked up through the module at call time, so wrapping the attribute is enough.
+TRACED_FUNCTIONS = [
+    (data_preprocessor, 'handle_missing_values'),
+    (data_preprocessor, 'handle_outliers'),
+    (feature_engineering, 'encode_weather_condition'),
+    (feature_engineering, 'encode_datetime_features'),
+    (feature_engineering, 'add_rolling_features'),
+    (model_retrain_automation, 'lag_frame'),
+    (training_orchestrator, 'encode_object_columns'),
+]
+
+
+class RssSampler:
+    """
+    Samples the resident set size in a background thread to find the peak
+    reached while a block of code runs.
+    """
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.start_mb = self.peak_mb = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_mb = rss_mb()
+        self.peak_mb = max(self.peak_mb, self.end_mb)
+
+
+@contextlib.contextmanager
+def traced_functions(timings):
+    """
+    Temporarily wrap `TRACED_FUNCTIONS` to accumulate their wall time in `timings`.
+    """
+    originals = []
+    for module, name in TRACED_FUNCTIONS:
+        original = getattr(module, name)
+
+        @functools.wraps(original)
+        def wrapper(*args, __original=original, __name=name, **kwargs):
+            started = time.perf_counter()
+            try:
+                return __original(*args, **kwargs)
+            finally:
+                timings.setdefault(__name, []).append(time.perf_counter() - started)
+
+        setattr(module, name, wrapper)
+        originals.append((module, name, original))
+    try:
+        yield
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+
+def _stage(results, name, rows, fn, *args, **kwargs):
+    """
+    Run one stage with its output silenced and record wall time, rows/s and memory.
+    """
+    with RssSampler() as rss, contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        value = fn(*args, **kwargs)
+        wall = time.perf_counter() - started
+    results.setdefault(name, []).append({
+        'wall_s': wall,
+        'rows': rows,
+        'peak_rss_mb': rss.peak_mb,
+        'rss_delta_mb': rss.end_mb - rss.start_mb,
+    })
+    return value
+
+
+def run_site(raw, artifacts_dir, n_jobs, stages, functions):
+    """
+    Run the retraining pipeline of `run_model_retrain` on one site's raw frame
+    (a full refit: one shared training matrix, both models fitted
+    concurrently), timing every stage.
+    """
+    n_raw = len(raw)
+    with traced_functions(functions):
+        df = _stage(stages, 'preprocess_data', n_raw, preprocess_data, raw.copy())
+        df, le = _stage(stages, 'feature_engineering_pipeline', n_raw, feature_engineering_pipeline, df)
+        df_lagged = _stage(stages, 'create_lagged_features', n_raw,
+                           lambda: create_lagged_features(df).dropna())
+        n_train = len(df_lagged)
+        data = _stage(stages, 'build_training_matrix', n_train, build_training_matrix, df_lagged, le)
+        models, _ = _stage(stages, 'fit_models', n_train, fit_full, data, le, n_jobs)
+        model_reg, model_cls = models['temperature'], models['condition']
+        temp_features, cond_features = data.features('temperature'), data.features('condition')
+        _stage(stages, 'publish_bundle', 1, publish_bundle, artifacts_dir,
+               models=models, features={'temperature': temp_features, 'condition': cond_features},
+               feature_dtypes=data.dtypes, label_classes=le.classes_, lags=normalize_lags(DEFAULT_LAGS),
+               training_window=(df_lagged['date_time'].min(), df_lagged['date_time'].max()))
+        _stage(stages, 'predict_next_step', 1, predict_next_step, df_lagged, model_reg, model_cls, le,
+               artifacts_dir=artifacts_dir)
+        _stage(stages, 'forecast_recursive_168h', 168, forecast_recursive, df_lagged, model_reg, model_cls, le,
+               temp_features, cond_features, 168)
+
+
+def _summarize(samples):
+    summary = {}
+    for name, runs in samples.items():
+        wall = [r['wall_s'] for r in runs]
+        summary[name] = {
+            'wall_s': round(statistics.median(wall), 6),
+            'wall_s_total': round(sum(wall), 6),
+            'rows': int(statistics.median(r['rows'] for r in runs)),
+            'rows_per_s': round(statistics.median(r['rows'] / r['wall_s'] for r in runs if r['wall_s'] > 0), 1),
+            'peak_rss_mb': round(max(r['peak_rss_mb'] for r in runs), 1),
+            'rss_delta_mb': round(statistics.median(r['rss_delta_mb'] for r in runs), 1),
+        }
+    return summary
+
+
+def run_benchmark(years=3, sites=2, repeat=1, n_jobs=None, seed=0):
+    """
+    Generate `sites` synthetic sites of `years` years each and run the full
+    pipeline on each of them `repeat` times. Nothing touches the network.
+
+    Returns:
+        dict: Metadata, per-stage and per-function summaries, and end-to-end totals.
+    """
+    stages, functions, end_to_end = {}, {}, []
+    started_all = time.perf_counter()
+    for index, (name, latitude, _) in enumerate(synthetic_sites(sites)):
+        raw = synthetic_hourly(years, site=index, latitude=latitude, seed=seed)
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as artifacts_dir, RssSampler() as rss:
+                started = time.perf_counter()
+                run_site(raw, artifacts_dir, n_jobs, stages, functions)
+                wall = time.perf_counter() - started
+            end_to_end.append({'wall_s': wall, 'rows': len(raw), 'peak_rss_mb': rss.peak_mb,
+                               'rss_delta_mb': rss.end_mb - rss.start_mb})
+        print(f"{name}: {len(raw)} rows, {end_to_end[-1]['wall_s']:.2f}s")
+
+    function_summary = {name: {'wall_s_total': round(sum(calls), 6), 'calls': len(calls)}
+                        for name, calls in functions.items()}
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'years': years,
+            'sites': sites,
+            'repeat': repeat,
+            'seed': seed,
+            'n_jobs': n_jobs,
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'xgboost': xgb.__version__,
+            'total_s': round(time.perf_counter() - started_all, 3),
+        },
+        'end_to_end': _summarize({'pipeline': end_to_end})['pipeline'],
+        'stages': _summarize(stages),
+        'functions': function_summary,
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare median stage wall times (and the end-to-end time) with a baseline.
+
+    Args:
+        results (dict): Output of `run_benchmark`.
+        baseline (dict): A previously saved `run_benchmark` output.
+        tolerance (float): Allowed relative slowdown before a stage counts as a regression.
+
+    Returns:
+        list: One dict per stage present in both runs, with the ratio and a 'regression' flag.
+    """
+    rows = []
+    pairs = [('end_to_end', results['end_to_end'], baseline.get('end_to_end'))]
+    pairs += [(name, stage, baseline.get('stages', {}).get(name)) for name, stage in results['stages'].items()]
+    for name, current, previous in pairs:
+        if not previous or not previous.get('wall_s'):
+            continue
+        ratio = current['wall_s'] / previous['wall_s']
+        rows.append({
+            'stage': name,
+            'baseline_s': previous['wall_s'],
+            'current_s': current['wall_s'],
+            'ratio': round(ratio, 3),
+            'peak_rss_mb': current['peak_rss_mb'],
+            'baseline_peak_rss_mb': previous.get('peak_rss_mb'),
+            'regression': ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the retraining pipeline on synthetic data, offline.")
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--sites', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="Saved results to compare against.")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown flagged as a regression (default: 0.2).")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.years, args.sites, args.repeat, args.n_jobs, args.seed)
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['comparison'] = compare(results, json.load(f), args.tolerance)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'stage':32} {'median s':>10} {'rows/s':>12} {'peak MB':>9}")
+    for name, stage in [('end_to_end', results['end_to_end'])] + list(results['stages'].items()):
+        print(f"{name:32} {stage['wall_s']:>10.4f} {stage['rows_per_s']:>12.0f} {stage['peak_rss_mb']:>9.1f}")
+    regressions = [row for row in results.get('comparison', []) if row['regression']]
+    for row in regressions:
+        print(f"REGRESSION {row['stage']}: {row['baseline_s']:.4f}s -> {row['current_s']:.4f}s ({row['ratio']}x)")
+    print(f"Results written to {args.output}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
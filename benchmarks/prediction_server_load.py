@@ -0,0 +1,98 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.prediction_server import create_server  # noqa: E402
+
+
+def _sample_rows(models, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    features = sorted(set(models['temp_features']) | set(models['cond_features']))
+    conditions = list(models['label_encoder'].classes_)
+    rows = []
+    for _ in range(n_rows):
+        row = {name: float(rng.uniform(0, 30)) for name in features}
+        row['weather_condition'] = conditions[rng.integers(len(conditions))]
+        rows.append(row)
+    return rows
+
+
+def run_load(port, payloads, clients, requests_per_client):
+    """
+    Fire requests from `clients` keep-alive connections in parallel.
+
+    Returns:
+        tuple: (latencies in seconds, wall time in seconds, rows scored)
+    """
+    latencies = []
+    rows_scored = [0]
+    lock = threading.Lock()
+
+    def client(worker):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        local, scored = [], 0
+        for i in range(requests_per_client):
+            body = payloads[(worker + i) % len(payloads)]
+            started = time.perf_counter()
+            conn.request('POST', '/predict', body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            data = json.loads(response.read())
+            local.append(time.perf_counter() - started)
+            scored += len(data['predictions'])
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            rows_scored[0] += scored
+
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - started, rows_scored[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local prediction server.")
+    parser.add_argument('--artifacts-dir', default='artifacts')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help="Requests per client")
+    parser.add_argument('--batch-size', type=int, default=1, help="Rows per request")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = create_server(args.artifacts_dir, port=0, max_wait_ms=args.max_wait_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _, models = server.batcher.cache.get()
+    rows = _sample_rows(models, 64 * args.batch_size)
+    payloads = [json.dumps({'rows': rows[i:i + args.batch_size]}).encode()
+                for i in range(0, len(rows), args.batch_size)]
+
+    run_load(server.server_port, payloads, 2, 10)  # warm-up
+    latencies, wall, scored = run_load(server.server_port, payloads, args.clients, args.requests)
+    server.shutdown()
+    server.batcher.close()
+
+    ms = np.array(latencies) * 1000
+    print(json.dumps({
+        'clients': args.clients,
+        'requests': len(latencies),
+        'rows_per_request': args.batch_size,
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'requests_per_s': round(len(latencies) / wall, 1),
+        'rows_per_s': round(scored / wall, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
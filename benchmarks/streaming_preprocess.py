@@ -0,0 +1,81 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_weather import synthetic_hourly  # noqa: E402
+from model.data_preprocessor import preprocess_data  # noqa: E402
+from model.instrumentation import rss_mb  # noqa: E402
+from model.streaming_preprocessor import preprocess_store  # noqa: E402
+from model.weather_store import append_observations, load_observations  # noqa: E402
+
+LOCATION = 'synthetic'
+
+
+def build_store(root, years, first_year=2000):
+    """
+    Write `years` years of synthetic observations to a store, one year at a time.
+    """
+    for offset in range(years):
+        append_observations(synthetic_hourly(1, start=f"{first_year + offset}-01-01", seed=offset), LOCATION, root)
+
+
+def _run(mode, root, queue):
+    baseline = rss_mb()
+    started = time.perf_counter()
+    if mode == 'batch':
+        rows = len(preprocess_data(load_observations(LOCATION, root=root)))
+    else:
+        rows = sum(len(chunk) for chunk in preprocess_store(LOCATION, root, two_pass=(mode == 'stream')))
+    seconds = time.perf_counter() - started
+    # ru_maxrss is the peak of this (fresh) process, in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+    queue.put({'mode': mode, 'rows': rows, 'seconds': round(seconds, 3),
+               'baseline_mb': round(baseline, 1), 'peak_mb': round(peak, 1)})
+
+
+def measure(mode, root):
+    """
+    Preprocess the store in a fresh process and report its time and peak memory.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run, args=(mode, root, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of batch vs. month-by-month preprocessing.")
+    parser.add_argument('--years', type=int, nargs='+', default=[5, 20])
+    parser.add_argument('--modes', nargs='+', default=['batch', 'stream', 'stream-running'],
+                        choices=['batch', 'stream', 'stream-running'])
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    report = []
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as root:
+            build_store(root, years)
+            report += [{'years': years, **measure(mode, root)} for mode in args.modes]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'years':>5} {'mode':16} {'rows':>9} {'seconds':>8} {'peak MB':>8} {'above baseline':>15}")
+    for row in report:
+        print(f"{row['years']:>5} {row['mode']:16} {row['rows']:>9} {row['seconds']:>8.2f} {row['peak_mb']:>8.1f} "
+              f"{row['peak_mb'] - row['baseline_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
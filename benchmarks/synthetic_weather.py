@@ -0,0 +1,118 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from model.data_fetcher import HOURLY_VARIABLES  # noqa: E402
+
+DEFAULT_START = '2021-01-01'
+
+
+def synthetic_sites(count):
+    """
+    Deterministic (name, latitude, longitude) tuples spread over India.
+    """
+    rng = np.random.default_rng(1234)
+    latitudes = rng.uniform(8.0, 32.0, count).round(4)
+    longitudes = rng.uniform(70.0, 90.0, count).round(4)
+    return [(f"site{i:03d}", float(lat), float(lon)) for i, (lat, lon) in enumerate(zip(latitudes, longitudes))]
+
+
+def _ar1(rng, n, phi, scale):
+    """
+    Autocorrelated noise, so consecutive hours look like weather rather than dice rolls.
+    """
+    noise = rng.normal(0.0, scale, n)
+    for i in range(1, n):
+        noise[i] += phi * noise[i - 1]
+    return noise
+
+
+def synthetic_hourly(years, site=0, latitude=17.385, start=DEFAULT_START, missing_rate=0.002, outlier_rate=0.0005,
+                     seed=0):
+    """
+    Generate Open-Meteo-shaped hourly observations. The same arguments always
+    produce the same frame. Temperature follows a seasonal and a diurnal
+    cycle plus autocorrelated noise; humidity and pressure move against it;
+    rain falls from overcast hours and the weather code is derived from cloud
+    cover, precipitation and humidity. A small share of values is blanked or
+    pushed out of range so preprocessing has real work to do.
+
+    Args:
+        years (float): Length of the series in years.
+        site (int): Site index; each site gets its own random stream.
+        latitude (float): Shifts the base temperature and the seasonal amplitude.
+        start (str): First timestamp.
+        missing_rate (float): Share of NaNs injected into temperature, humidity,
+            pressure, cloud cover and precipitation.
+        outlier_rate (float): Share of out-of-range temperature and pressure values.
+        seed (int): Base seed.
+
+    Returns:
+        pd.DataFrame: 'time' plus `HOURLY_VARIABLES`, as returned by the chunked fetch.
+    """
+    rng = np.random.default_rng([seed, site])
+    time = pd.date_range(start, periods=int(round(years * 8760)), freq='h')
+    n = len(time)
+    day_angle = 2 * np.pi * (time.dayofyear.to_numpy() - 15) / 365.25
+    hour_angle = 2 * np.pi * (time.hour.to_numpy() - 9) / 24
+
+    season = -np.cos(day_angle)
+    base = 34.0 - 0.45 * abs(latitude)
+    temperature = (base + (2.0 + 0.25 * abs(latitude)) * season + 5.5 * np.sin(hour_angle)
+                   + _ar1(rng, n, 0.97, 0.45))
+    monsoon = np.clip(np.sin(2 * np.pi * (time.dayofyear.to_numpy() - 150) / 365.25 * 2), 0, None)
+    cloudcover = np.clip(35 + 45 * monsoon + _ar1(rng, n, 0.95, 6.0), 0, 100)
+    humidity = np.clip(55 - 1.8 * (temperature - base) + 0.3 * cloudcover + _ar1(rng, n, 0.9, 3.0), 5, 100)
+    pressure = 1010.0 - 6.0 * season + 1.2 * np.sin(2 * hour_angle) + _ar1(rng, n, 0.99, 0.25)
+    wind_speed = np.abs(8 + 6 * monsoon + _ar1(rng, n, 0.9, 1.5))
+    wind_direction = np.mod(np.cumsum(rng.normal(0, 8, n)) + 220, 360)
+
+    raining = (cloudcover > 75) & (rng.random(n) < 0.25 + 0.4 * monsoon)
+    precipitation = np.where(raining, rng.exponential(1.2, n), 0.0)
+
+    weathercode = np.select(
+        [precipitation > 7.5, precipitation > 2.5, precipitation > 0.5, precipitation > 0,
+         (humidity > 95) & (cloudcover > 60), cloudcover < 20, cloudcover < 50, cloudcover < 80],
+        [95, 63, 61, 51, 45, 0, 1, 2],
+        default=3,
+    )
+
+    df = pd.DataFrame({
+        'time': time,
+        'temperature_2m': temperature.round(1),
+        'relative_humidity_2m': humidity.round().astype(np.int64),
+        'wind_speed_10m': wind_speed.round(1),
+        'wind_direction_10m': wind_direction.round().astype(np.int64),
+        'pressure_msl': pressure.round(1),
+        'precipitation': precipitation.round(1),
+        'cloudcover': cloudcover.round().astype(np.int64),
+        'weathercode': weathercode.astype(np.int64),
+    })
+
+    for column in ['temperature_2m', 'pressure_msl']:
+        rows = rng.random(n) < outlier_rate
+        df.loc[rows, column] = df.loc[rows, column] * 3
+    for column in ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'cloudcover', 'precipitation']:
+        rows = rng.random(n) < missing_rate
+        df[column] = df[column].astype(float)
+        df.loc[rows, column] = np.nan
+    return df
+
+
+def synthetic_response(years, site=0, latitude=17.385, longitude=78.4867, start=DEFAULT_START, seed=0):
+    """
+    The same data as `synthetic_hourly`, in the JSON layout of the Open-Meteo archive API.
+
+    Returns:
+        dict: Response body with 'latitude', 'longitude' and an 'hourly' dict of lists.
+    """
+    df = synthetic_hourly(years, site, latitude, start, seed=seed)
+    hourly = {'time': df['time'].dt.strftime('%Y-%m-%dT%H:%M').tolist()}
+    for column in HOURLY_VARIABLES:
+        hourly[column] = [None if pd.isna(v) else v for v in df[column].tolist()]
+    return {'latitude': latitude, 'longitude': longitude, 'hourly': hourly}
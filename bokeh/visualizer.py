@@ -1,21 +1,171 @@
+import os
+import sys
+
 from bokeh.io import curdoc
 from bokeh.plotting import figure
 from bokeh.models import ColumnDataSource, HoverTool, Div
 from bokeh.layouts import column
+from bokeh.events import RangesUpdate
+import numpy as np
 import pandas as pd
 
+# Appended (not prepended) so the installed bokeh package still wins over this folder
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(REPO_ROOT)
+
+from model.data_fetcher import DEFAULT_LATITUDE, DEFAULT_LONGITUDE  # noqa: E402
+from model.downsampling import downsample  # noqa: E402
+from model.rollups import load_rollup  # noqa: E402
+from model.weather_store import DEFAULT_STORE_DIR, load_observations, location_key  # noqa: E402
+
+# Defaults match the daemon run from the repository root (`/app` in Docker)
+STORE_DIR = os.environ.get('WEATHER_STORE_DIR', os.path.join(REPO_ROOT, DEFAULT_STORE_DIR))
+FORECAST_CSV = os.environ.get('WEATHER_FORECAST_CSV', os.path.join(REPO_ROOT, 'weather_forecast.csv'))
+LOCATION = location_key(float(os.environ.get('WEATHER_LATITUDE', DEFAULT_LATITUDE)),
+                        float(os.environ.get('WEATHER_LONGITUDE', DEFAULT_LONGITUDE)))
+MAX_POINTS = 2000          # points per series sent to the browser
+REFRESH_MS = 60 * 1000     # how often the store is polled for new rows
+
+
+def _epoch_ms(times):
+    return times.to_numpy('datetime64[ms]').astype(np.int64).astype(np.float64)
+
+
+def load_hourly(start=None):
+    """
+    Load observed temperature from the weather store as (epoch ms, °C) arrays.
+    Only rows strictly after `start` are returned when it is given.
+    """
+    df = load_observations(LOCATION, start=start, root=STORE_DIR, columns=['temperature_2m'])
+    if df.empty:
+        return np.empty(0), np.empty(0)
+    if start is not None:
+        df = df[df['time'] > pd.Timestamp(start)]
+    return _epoch_ms(df['time']), df['temperature_2m'].to_numpy(np.float64)
+
+
+def load_daily(start=None):
+    """
+    Load daily mean temperature from the precomputed daily rollup, so the
+    cost depends on the number of days rather than on the raw hours.
+    """
+    df = load_rollup(LOCATION, 'daily', start=start, root=STORE_DIR, columns=['temperature_2m_mean'])
+    if df.empty:
+        return np.empty(0), np.empty(0)
+    return _epoch_ms(df['time']), df['temperature_2m_mean'].to_numpy(np.float64)
+
+
+def load_forecast():
+    if not os.path.exists(FORECAST_CSV):
+        return dict(timestamp=[], temperature=[], weather_condition=[])
+    forecast = pd.read_csv(FORECAST_CSV, parse_dates=['date_time'])
+    return dict(timestamp=forecast['date_time'], temperature=forecast['temperature'],
+                weather_condition=forecast['weather_condition'])
+
+
+class SeriesView:
+    """
+    Full-resolution series kept on the server, of which at most `max_points`
+    (LTTB-downsampled over the visible window) are sent to the browser.
+    """
+
+    def __init__(self, times, values, max_points=MAX_POINTS):
+        self.times, self.values = times, values
+        self.max_points = max_points
+        self.window = None
+        self.source = ColumnDataSource(data=dict(timestamp=[], temperature=[]))
+        self.render()
+
+    def render(self, x0=None, x1=None):
+        """
+        Send the downsampled window [x0, x1] (the whole series by default),
+        padded by one point on each side so lines run off the plot edges.
+        """
+        self.window = None if x0 is None else (x0, x1)
+        lo, hi = 0, len(self.times)
+        if x0 is not None:
+            lo = max(np.searchsorted(self.times, x0) - 1, 0)
+            hi = min(np.searchsorted(self.times, x1, side='right') + 1, len(self.times))
+        x, y = downsample(self.times[lo:hi], self.values[lo:hi], self.max_points)
+        self.source.data = dict(timestamp=x, temperature=y)
+
+    def _follows_latest(self):
+        return self.window is None or len(self.times) == 0 or self.window[1] >= self.times[-1]
+
+    def extend(self, times, values):
+        """
+        Add new points to the full series. A first point equal to the current
+        last timestamp replaces it (e.g. a daily mean that gained hours).
+        While the browser is looking at the latest data, its window is
+        downsampled again up to the new last point, so the overview keeps
+        the whole history.
+        """
+        if len(times) == 0:
+            return
+        follows = self._follows_latest()
+        if len(self.times) and times[0] == self.times[-1]:
+            self.values[-1] = values[0]
+            times, values = times[1:], values[1:]
+        self.times = np.concatenate([self.times, times])
+        self.values = np.concatenate([self.values, values])
+        if follows:
+            if self.window is None:
+                self.render()
+            else:
+                self.render(self.window[0], self.times[-1])
+
+def style_plot(plot):
+    plot.title.text_font_size = "16px"
+    plot.title.text_color = "#2c3e50"
+    plot.xaxis.axis_label_text_font_size = "12px"
+    plot.yaxis.axis_label_text_font_size = "12px"
+    plot.xaxis.axis_label_text_font_style = "normal"
+    plot.yaxis.axis_label_text_font_style = "normal"
+    plot.xaxis.major_label_text_font_size = "10px"
+    plot.yaxis.major_label_text_font_size = "10px"
+
+
+def style_legend(plot):
+    plot.legend.location = "top_right"
+    plot.legend.label_text_font_size = "10px"
+    plot.legend.padding = 8
+    plot.legend.spacing = 5
+    plot.legend.background_fill_alpha = 0.7
+
+
+def new_plot(title, x_axis_label):
+    plot = figure(
+        title=title,
+        x_axis_type='datetime',
+        x_axis_label=x_axis_label,
+        y_axis_label='Temperature (°C)',
+        width=1200,
+        height=350,
+        tools="pan,wheel_zoom,box_zoom,reset,save",
+        toolbar_location="above",
+        background_fill_color="#f0f0f0",
+        title_location="above",
+        margin=(20, 10, 20, 10)
+    )
+    style_plot(plot)
+    return plot
+
+
+def on_range_change(plot, view):
+    def callback(event):
+        if event.x0 is None or event.x1 is None:
+            view.render()
+        else:
+            view.render(event.x0, event.x1)
+    plot.on_event(RangesUpdate, callback)
+
+
 # Load and prepare data
-weather_data = pd.read_csv("../src/weather_data_with_predictions.csv")
-weather_data['timestamp'] = pd.to_datetime(weather_data['date_time'])
-weather_data['temperature'] = pd.to_numeric(weather_data['temperature'], errors='coerce')
-
-# Extract last predicted point
-last_point = weather_data.iloc[-1]
-prediction_source = ColumnDataSource(data=dict(
-    timestamp=[last_point['timestamp']],
-    temperature=[last_point['temperature']],
-    weather_condition=[last_point['weather_condition']]
-))
+hourly_times, hourly_temperatures = load_hourly()
+hourly_view = SeriesView(hourly_times, hourly_temperatures)
+daily_view = SeriesView(*load_daily())
+prediction_source = ColumnDataSource(data=load_forecast())
+forecast_mtime = os.path.getmtime(FORECAST_CSV) if os.path.exists(FORECAST_CSV) else None
 
 # HTML Title and Description
 title_div = Div(text="""
@@ -24,39 +174,16 @@ title_div = Div(text="""
     </h1>
     <p style="font-size:14px; color:#34495e; text-align:center; line-height:1.5; max-width:800px; margin:0 auto;">
         Explore observed temperature trends in Hyderabad with hourly and daily views.<br>
-        <strong style="color:#e74c3c;">🔺 Hover over the red square</strong> in the hourly chart for the predicted temperature.
+        <strong style="color:#e74c3c;">🔺 Hover over the red squares</strong> in the hourly chart for the predicted temperature.
     </p>
 """, width=1200, css_classes=['title-div'])
 
 # Hourly Plot
-hourly_data = weather_data.set_index('timestamp').resample('h').mean(numeric_only=True).reset_index()
-hourly_source = ColumnDataSource(hourly_data)
-
-hourly_plot = figure(
-    title="🌇 Hourly Temperature Trend",
-    x_axis_type='datetime',
-    x_axis_label='Time',
-    y_axis_label='Temperature (°C)',
-    width=1200,
-    height=350,
-    tools="pan,wheel_zoom,box_zoom,reset,save",
-    toolbar_location="above",
-    background_fill_color="#f0f0f0",
-    title_location="above",
-    margin=(20, 10, 20, 10)
-)
-hourly_plot.title.text_font_size = "16px"
-hourly_plot.title.text_color = "#2c3e50"
-hourly_plot.xaxis.axis_label_text_font_size = "12px"
-hourly_plot.yaxis.axis_label_text_font_size = "12px"
-hourly_plot.xaxis.axis_label_text_font_style = "normal"
-hourly_plot.yaxis.axis_label_text_font_style = "normal"
-hourly_plot.xaxis.major_label_text_font_size = "10px"
-hourly_plot.yaxis.major_label_text_font_size = "10px"
+hourly_plot = new_plot("🌇 Hourly Temperature Trend", 'Time')
 
 # Plot observed and predicted
-hourly_plot.line('timestamp', 'temperature', source=hourly_source, line_width=3, color='dodgerblue', legend_label="Observed")
-obs_renderer = hourly_plot.circle('timestamp', 'temperature', source=hourly_source, size=6, color='dodgerblue', alpha=0.6)
+hourly_plot.line('timestamp', 'temperature', source=hourly_view.source, line_width=3, color='dodgerblue', legend_label="Observed")
+obs_renderer = hourly_plot.circle('timestamp', 'temperature', source=hourly_view.source, size=6, color='dodgerblue', alpha=0.6)
 pred_renderer = hourly_plot.square('timestamp', 'temperature', source=prediction_source, size=12, color='red', legend_label="Predicted", line_width=2)
 
 # Hover for observed points
@@ -68,51 +195,23 @@ hover_observed = HoverTool(
 )
 hourly_plot.add_tools(hover_observed)
 
-# Hover for predicted point
+# Hover for predicted points
 hover_predicted = HoverTool(
-    tooltips=[("Date", "@timestamp{%F %H:%M}"), ("Predicted Temp", "@temperature{0.0} °C")],
+    tooltips=[("Date", "@timestamp{%F %H:%M}"), ("Predicted Temp", "@temperature{0.0} °C"),
+              ("Condition", "@weather_condition")],
     formatters={'@timestamp': 'datetime'},
     mode='vline',
     renderers=[pred_renderer]
 )
 hourly_plot.add_tools(hover_predicted)
-
-# Style legend
-hourly_plot.legend.location = "top_right"
-hourly_plot.legend.label_text_font_size = "10px"
-hourly_plot.legend.padding = 8
-hourly_plot.legend.spacing = 5
-hourly_plot.legend.background_fill_alpha = 0.7
+style_legend(hourly_plot)
 
 # Daily Plot
-daily_data = weather_data.set_index('timestamp').resample('D').mean(numeric_only=True).reset_index()
-daily_source = ColumnDataSource(daily_data)
-
-daily_plot = figure(
-    title="📆 Daily Average Temperature",
-    x_axis_type='datetime',
-    x_axis_label='Date',
-    y_axis_label='Temperature (°C)',
-    width=1200,
-    height=350,
-    tools="pan,wheel_zoom,box_zoom,reset,save",
-    toolbar_location="above",
-    background_fill_color="#f0f0f0",
-    title_location="above",
-    margin=(20, 10, 20, 10)
-)
-daily_plot.title.text_font_size = "16px"
-daily_plot.title.text_color = "#2c3e50"
-daily_plot.xaxis.axis_label_text_font_size = "12px"
-daily_plot.yaxis.axis_label_text_font_size = "12px"
-daily_plot.xaxis.axis_label_text_font_style = "normal"
-daily_plot.yaxis.axis_label_text_font_style = "normal"
-daily_plot.xaxis.major_label_text_font_size = "10px"
-daily_plot.yaxis.major_label_text_font_size = "10px"
+daily_plot = new_plot("📆 Daily Average Temperature", 'Date')
 
 # Plot daily
-daily_plot.line('timestamp', 'temperature', source=daily_source, line_width=3, color='green', legend_label="Daily Avg")
-daily_plot.circle('timestamp', 'temperature', source=daily_source, size=6, color='green', alpha=0.6)
+daily_plot.line('timestamp', 'temperature', source=daily_view.source, line_width=3, color='green', legend_label="Daily Avg")
+daily_plot.circle('timestamp', 'temperature', source=daily_view.source, size=6, color='green', alpha=0.6)
 
 # Hover for daily
 hover_daily = HoverTool(
@@ -121,12 +220,33 @@ hover_daily = HoverTool(
     mode='vline'
 )
 daily_plot.add_tools(hover_daily)
-daily_plot.legend.location = "top_right"
-daily_plot.legend.label_text_font_size = "10px"
-daily_plot.legend.padding = 8
-daily_plot.legend.spacing = 5
-daily_plot.legend.background_fill_alpha = 0.7
+style_legend(daily_plot)
+
+# Load more detail when zooming or panning
+on_range_change(hourly_plot, hourly_view)
+on_range_change(daily_plot, daily_view)
+
+
+def refresh():
+    """
+    Stream rows that reached the store since the last refresh, and reload
+    the forecast when a retraining run has rewritten it.
+    """
+    global forecast_mtime
+    last = pd.to_datetime(hourly_view.times[-1], unit='ms') if len(hourly_view.times) else None
+    times, temperatures = load_hourly(start=last)
+    if len(times):
+        hourly_view.extend(times, temperatures)
+        # Re-read the days touched by the new rows, including the current last day
+        daily_view.extend(*load_daily(start=pd.to_datetime(times[0], unit='ms').floor('D')))
+
+    mtime = os.path.getmtime(FORECAST_CSV) if os.path.exists(FORECAST_CSV) else None
+    if mtime != forecast_mtime:
+        forecast_mtime = mtime
+        prediction_source.data = load_forecast()
+
 
 # Layout
 layout = column(title_div, hourly_plot, daily_plot, sizing_mode="stretch_width", css_classes=['dashboard-layout'])
 curdoc().add_root(layout)
+curdoc().add_periodic_callback(refresh, REFRESH_MS)
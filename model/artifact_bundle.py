@@ -0,0 +1,217 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_FORMAT = 1
+KEEP_VERSIONS = 5
+
+MODEL_FILES = {
+    'temperature': 'temperature_model.ubj',
+    'condition': 'condition_model.ubj',
+}
+COMPILED_FILES = {
+    'temperature': 'temperature_model.npz',
+    'condition': 'condition_model.npz',
+}
+# xgboost is imported only when a model is loaded, so reading a bundle's
+# compiled trees (see `compiled_trees`) does not pay for it
+MODEL_CLASSES = {
+    'temperature': 'XGBRegressor',
+    'condition': 'XGBClassifier',
+}
+
+
+def _sha256(buffer):
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def _write_atomic(path, text):
+    with open(f"{path}.tmp", 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
+
+
+def current_version(artifacts_dir):
+    """
+    Return the version the "current" pointer refers to.
+
+    Args:
+        artifacts_dir (str): Artifacts directory.
+
+    Returns:
+        str: Version id, or None if nothing has been published.
+    """
+    try:
+        with open(os.path.join(artifacts_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_bundle(artifacts_dir, models, features, feature_dtypes, label_classes, lags, training_window,
+                   metrics=None, extra=None):
+    """
+    Write a new artifact version and atomically point "current" at it.
+    The version directory is fully written under a temporary name before it
+    is renamed into place, so readers never see a partial bundle. Each model
+    is also exported as flat NumPy tree arrays for `compiled_trees`.
+
+    Args:
+        artifacts_dir (str): Artifacts directory.
+        models (dict): {'temperature': XGBRegressor, 'condition': XGBClassifier}.
+        features (dict): Feature list per model name.
+        feature_dtypes (dict): {feature: dtype string} per model name.
+        label_classes (list): LabelEncoder classes for weather_condition.
+        lags (list): Lag offsets used to build the features.
+        training_window (tuple): First and last training timestamps.
+        metrics (dict, optional): Validation metrics for the run.
+        extra (dict, optional): Additional JSON-serializable manifest entries.
+
+    Returns:
+        str: The published version id.
+    """
+    import xgboost as xgb
+    from model.compiled_trees import export_ensemble, save_ensemble
+
+    versions_root = os.path.join(artifacts_dir, VERSIONS_DIR)
+    os.makedirs(versions_root, exist_ok=True)
+    version = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    staging = os.path.join(versions_root, f".staging-{version}")
+    os.makedirs(staging)
+
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'xgboost_version': xgb.__version__,
+        'models': {},
+        'label_classes': [str(c) for c in label_classes],
+        'lags': [int(lag) for lag in lags],
+        'training_window': [str(t) for t in training_window],
+        'metrics': metrics,
+        **(extra or {}),
+    }
+    for name, model in models.items():
+        raw = model.get_booster().save_raw(raw_format='ubj')
+        with open(os.path.join(staging, MODEL_FILES[name]), 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        compiled_path = os.path.join(staging, COMPILED_FILES[name])
+        save_ensemble(export_ensemble(model), compiled_path)
+        with open(compiled_path, 'rb') as f:
+            compiled_sha256 = _sha256(f.read())
+        manifest['models'][name] = {
+            'file': MODEL_FILES[name],
+            'sha256': _sha256(raw),
+            'compiled': {'file': COMPILED_FILES[name], 'sha256': compiled_sha256},
+            'features': list(features[name]),
+            'dtypes': feature_dtypes[name],
+        }
+    _write_atomic(os.path.join(staging, MANIFEST_FILE), json.dumps(manifest, indent=2, default=str))
+
+    os.rename(staging, os.path.join(versions_root, version))
+    _write_atomic(os.path.join(artifacts_dir, CURRENT_FILE), version)
+    print(f"Published artifact version {version} to {artifacts_dir}")
+    prune_versions(artifacts_dir)
+    return version
+
+
+def prune_versions(artifacts_dir, keep=KEEP_VERSIONS):
+    """
+    Delete all but the newest `keep` versions; the current one is never deleted.
+    """
+    versions_root = os.path.join(artifacts_dir, VERSIONS_DIR)
+    current = current_version(artifacts_dir)
+    versions = sorted(v for v in os.listdir(versions_root) if not v.startswith('.'))
+    for version in versions[:-keep]:
+        if version != current:
+            shutil.rmtree(os.path.join(versions_root, version), ignore_errors=True)
+
+
+class ArtifactBundle:
+    """
+    Read-only view of one artifact version. The manifest is read on
+    construction; models are loaded on first access by memory-mapping the
+    native XGBoost file, verifying its checksum and handing the bytes to
+    XGBoost.
+    """
+
+    def __init__(self, artifacts_dir, version=None):
+        self.version = version or current_version(artifacts_dir)
+        if self.version is None:
+            raise FileNotFoundError(f"No artifact version published in {artifacts_dir}")
+        self.path = os.path.join(artifacts_dir, VERSIONS_DIR, self.version)
+        with open(os.path.join(self.path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self._models = {}
+        self._label_encoder = None
+
+    def features(self, name):
+        """
+        Feature list of the named model ('temperature' or 'condition').
+        """
+        return self.manifest['models'][name]['features']
+
+    def model(self, name):
+        """
+        Load (once) and return the named model.
+
+        Raises:
+            ValueError: If the file does not match the manifest checksum.
+        """
+        if name not in self._models:
+            entry = self.manifest['models'][name]
+            with open(os.path.join(self.path, entry['file']), 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if _sha256(mapped) != entry['sha256']:
+                        raise ValueError(f"Checksum mismatch for {name} model in version {self.version}")
+                    raw = bytearray(mapped)
+            import xgboost as xgb
+            model = getattr(xgb, MODEL_CLASSES[name])()
+            model.load_model(raw)
+            self._models[name] = model
+        return self._models[name]
+
+    @property
+    def reg_model(self):
+        return self.model('temperature')
+
+    @property
+    def clf_model(self):
+        return self.model('condition')
+
+    @property
+    def label_encoder(self):
+        if self._label_encoder is None:
+            from sklearn.preprocessing import LabelEncoder
+            le = LabelEncoder()
+            le.classes_ = np.array(self.manifest['label_classes'], dtype=object)
+            self._label_encoder = le
+        return self._label_encoder
+
+
+def load_bundle(artifacts_dir, version=None):
+    """
+    Open the current (or a given) artifact version.
+
+    Args:
+        artifacts_dir (str): Artifacts directory.
+        version (str, optional): Specific version id.
+
+    Returns:
+        ArtifactBundle: The bundle, or None if nothing has been published.
+    """
+    if version is None and current_version(artifacts_dir) is None:
+        return None
+    return ArtifactBundle(artifacts_dir, version)
@@ -0,0 +1,170 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from model.artifact_bundle import load_bundle
+from model.data_fetcher import DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+from model.data_preprocessor import CODE_MAP, preprocess_data
+from model.feature_engineering import feature_engineering_pipeline
+from model.forecasting import _numeric_matrix, _predict_classes
+from model.instrumentation import RunRecorder, stage
+from model.model_retrain_automation import ARTIFACTS_DIR, condition_codes, create_lagged_features
+from model.prediction_log import PredictionLog
+from model.weather_store import DEFAULT_STORE_DIR, load_observations, location_key
+
+
+def score_range(raw_df, bundle, start=None, end=None):
+    """
+    Score every hour of a time range in bulk. Follows the `predict_next_step`
+    convention: the features of hour t give the prediction for hour t + 1.
+    The features are built once for all of `raw_df`, each model is called
+    once on the rows of the range and the condition codes are decoded in one
+    call. Hours whose features are incomplete (gaps in the store, conditions
+    the model has never seen) are skipped, as they are in training.
+
+    The gap-filling mode, the outlier medians and the smoothing are computed
+    over all of `raw_df`, so a prediction depends on the range only if
+    `raw_df` is cut to it; `backfill` passes the whole stored history.
+
+    Args:
+        raw_df (pd.DataFrame): Raw observations the features are built from.
+        bundle (ArtifactBundle): Models, feature lists, lags and label classes to score with.
+        start (datetime, optional): First hour to predict.
+        end (datetime, optional): Last hour to predict.
+
+    Returns:
+        pd.DataFrame: 'date_time', 'model_version', 'temperature' and
+            'weather_condition' predictions next to the 'observed_temperature'
+            and 'observed_condition' of that hour.
+    """
+    le = bundle.label_encoder
+    df, _ = feature_engineering_pipeline(preprocess_data(raw_df))
+    # The pipeline encodes with the classes of this window; the model knows the bundle's
+    df['weather_condition_encoded'] = condition_codes(df['weather_condition'], le)
+    df_lagged = create_lagged_features(df, bundle.manifest['lags'])
+
+    target_times = df_lagged['date_time'] + pd.Timedelta(hours=1)
+    in_range = np.ones(len(df_lagged), dtype=bool)
+    if start is not None:
+        in_range &= (target_times >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        in_range &= (target_times <= pd.Timestamp(end)).to_numpy()
+    rows = df_lagged[in_range]
+    X_temp = _numeric_matrix(rows, bundle.features('temperature'), le)
+    X_cond = _numeric_matrix(rows, bundle.features('condition'), le)
+    complete = ~(np.isnan(X_temp).any(axis=1) | np.isnan(X_cond).any(axis=1))
+
+    if complete.any():
+        temperatures = bundle.reg_model.get_booster().inplace_predict(X_temp[complete])
+        conditions = le.inverse_transform(_predict_classes(bundle.clf_model, X_cond[complete]))
+    else:
+        temperatures, conditions = np.empty(0, dtype=np.float32), np.empty(0, dtype=object)
+
+    times = target_times[in_range][complete].reset_index(drop=True)
+    observed = raw_df.set_index('time').reindex(times)
+    return pd.DataFrame({
+        'date_time': times,
+        'model_version': bundle.version,
+        'temperature': temperatures.astype(float).round(4),
+        'weather_condition': conditions,
+        'observed_temperature': observed['temperature_2m'].to_numpy(dtype=float, na_value=np.nan),
+        'observed_condition': observed['weathercode'].map(CODE_MAP).to_numpy(dtype=object),
+    })
+
+
+def accuracy(scored):
+    """
+    Temperature RMSE/MAE and condition accuracy over the scored hours that have an observation.
+    """
+    observed = scored.dropna(subset=['observed_temperature'])
+    errors = observed['temperature'] - observed['observed_temperature']
+    return {
+        'scored': len(observed),
+        'temperature_rmse': round(float(np.sqrt(np.mean(errors ** 2))), 4) if len(observed) else None,
+        'temperature_mae': round(float(errors.abs().mean()), 4) if len(observed) else None,
+        'condition_accuracy': (round(float((observed['weather_condition'] == observed['observed_condition']).mean()), 4)
+                               if len(observed) else None),
+    }
+
+
+def write_predictions(scored, path):
+    """
+    Write scored hours in one call, as Parquet for a '.parquet' path and CSV otherwise.
+    """
+    if path.endswith('.parquet'):
+        scored.to_parquet(path, index=False)
+    else:
+        scored.to_csv(path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+
+
+def backfill(location, start=None, end=None, root=DEFAULT_STORE_DIR, artifacts_dir=ARTIFACTS_DIR, version=None,
+             output='backfill_predictions.csv'):
+    """
+    Score a time range of a location's stored history with one artifact
+    version and write the predictions. They are also merged into the
+    location's prediction log as horizon-1 forecasts of that version, so
+    they are scored and reported with the live ones. The features are always
+    built from the whole store, so an hour gets the same prediction whatever
+    range it is scored in. Stage timings are appended to the run metrics of
+    `artifacts_dir` as a 'backfill' run.
+
+    Args:
+        location (str): Location key from `location_key`.
+        start (datetime, optional): First hour to predict (default: the start of the store).
+        end (datetime, optional): Last hour to predict (default: the end of the store).
+        root (str): Root directory of the weather store.
+        artifacts_dir (str): Artifacts directory.
+        version (str, optional): Artifact version to score with (default: the current one).
+        output (str): Output file.
+
+    Returns:
+        pd.DataFrame: The scored hours (see `score_range`).
+
+    Raises:
+        FileNotFoundError: If no artifact version is published.
+    """
+    bundle = load_bundle(artifacts_dir, version)
+    if bundle is None:
+        raise FileNotFoundError(f"No artifact version published in {artifacts_dir}")
+    with RunRecorder('backfill', artifacts_dir, location=location, model_version=bundle.version) as run:
+        with stage('load_observations') as entry:
+            raw_df = load_observations(location, root=root)
+            entry['rows_out'] = len(raw_df)
+        if raw_df.empty:
+            raise ValueError(f"No observations stored under {root} for {location}")
+        with stage('score_range', len(raw_df)) as entry:
+            scored = score_range(raw_df, bundle, start, end)
+            entry['rows_out'] = len(scored)
+        with stage('write_predictions', len(scored)):
+            write_predictions(scored, output)
+        with stage('log_predictions', len(scored)) as entry:
+            # Each prediction is a one-hour-ahead forecast issued from the hour before
+            entry['rows_out'] = PredictionLog(location, root).insert(scored.assign(horizon=1), bundle.version)
+        run.set(output=output, **accuracy(scored))
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a time range of the stored history in bulk.")
+    parser.add_argument('--latitude', type=float, default=DEFAULT_LATITUDE)
+    parser.add_argument('--longitude', type=float, default=DEFAULT_LONGITUDE)
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--artifacts-dir', default=ARTIFACTS_DIR)
+    parser.add_argument('--start', help="First hour to predict (default: start of the store).")
+    parser.add_argument('--end', help="Last hour to predict (default: end of the store).")
+    parser.add_argument('--version', help="Artifact version to score with (default: current).")
+    parser.add_argument('--output', default='backfill_predictions.csv', help="CSV or .parquet output file.")
+    args = parser.parse_args()
+
+    scored = backfill(location_key(args.latitude, args.longitude), args.start, args.end, args.store_dir,
+                      args.artifacts_dir, args.version, args.output)
+    summary = accuracy(scored)
+    print(f"Scored {len(scored)} hours with version {scored['model_version'].iloc[0] if len(scored) else '-'}: "
+          f"temperature RMSE {summary['temperature_rmse']}, MAE {summary['temperature_mae']}, "
+          f"condition accuracy {summary['condition_accuracy']}. Written to {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from model.data_fetcher import DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+from model.data_preprocessor import preprocess_data
+from model.feature_engineering import feature_engineering_pipeline
+from model.lag_features import DEFAULT_LAGS, normalize_lags
+from model.model_retrain_automation import create_lagged_features
+from model.training_orchestrator import build_training_matrix, fit_and_score
+from model.weather_store import DEFAULT_STORE_DIR, load_observations, location_key
+
+BACKTEST_CACHE_DIR = 'backtest_cache'
+MODELS = ['temperature', 'condition']
+DEFAULT_GRID = {
+    'temperature': {'n_estimators': [100, 200], 'max_depth': [4, 6], 'learning_rate': [0.1, 0.3]},
+    'condition': {'n_estimators': [100, 200], 'max_depth': [4, 6], 'learning_rate': [0.1, 0.3]},
+}
+# Metric each model's configurations are ranked by, and whether higher is better
+PRIMARY_METRIC = {'temperature': ('rmse', False), 'condition': ('f1_macro', True)}
+# Bumped when the cached arrays change layout, so old cache entries are not read
+CACHE_FORMAT = 2
+
+_ARRAYS = ['matrix', 'y_temperature', 'y_condition', 'time']
+_loaded = {}
+
+
+def feature_matrices(raw_df, lags=DEFAULT_LAGS):
+    """
+    Build the shared training matrix of both models from raw observations
+    exactly as `run_model_retrain` does (`build_training_matrix`).
+
+    Args:
+        raw_df (pd.DataFrame): Raw hourly observations.
+        lags (int or iterable): Lag specification.
+
+    Returns:
+        tuple: (arrays, meta) where arrays maps 'matrix', 'y_temperature',
+            'y_condition' and 'time' to NumPy arrays and meta holds each
+            model's column block of the matrix, the feature names and the
+            label classes.
+    """
+    df, le = feature_engineering_pipeline(preprocess_data(raw_df.copy()))
+    df_lagged = create_lagged_features(df, lags).dropna()
+    data = build_training_matrix(df_lagged, le)
+    arrays = {
+        'matrix': data.matrix,
+        'y_temperature': data.targets['temperature'].astype(np.float32),
+        'y_condition': data.targets['condition'].astype(np.int32),
+        'time': df_lagged['date_time'].to_numpy(dtype='datetime64[s]'),
+    }
+    meta = {
+        'blocks': {name: [block.start, block.stop] for name, block in data.blocks.items()},
+        'features': {name: data.features(name) for name in MODELS},
+        'classes': le.classes_.tolist(),
+        'lags': normalize_lags(lags),
+        'rows': len(df_lagged),
+    }
+    return arrays, meta
+
+
+def cached_feature_matrices(raw_df, cache_dir=BACKTEST_CACHE_DIR, lags=DEFAULT_LAGS):
+    """
+    Build the feature matrices once and keep them as .npy files keyed by a
+    hash of the raw data and the lags. Workers memory-map the files, so every
+    fold and configuration shares one copy and reruns skip feature building.
+
+    Returns:
+        str: Directory holding the arrays and 'meta.json'.
+    """
+    digest = hashlib.sha1(pd.util.hash_pandas_object(raw_df, index=False).to_numpy().tobytes())
+    digest.update(repr((normalize_lags(lags), CACHE_FORMAT)).encode())
+    path = os.path.join(cache_dir, digest.hexdigest()[:16])
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return path
+
+    arrays, meta = feature_matrices(raw_df, lags)
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_matrices(path):
+    """
+    Memory-map the cached arrays; each process opens a cache directory once.
+    'X_temperature' and 'X_condition' are column views of the shared matrix.
+    """
+    if path not in _loaded:
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in _ARRAYS}
+        with open(os.path.join(path, 'meta.json')) as f:
+            blocks = json.load(f)['blocks']
+        for name, (start, stop) in blocks.items():
+            arrays[f'X_{name}'] = arrays['matrix'][:, start:stop]
+        _loaded[path] = arrays
+    return _loaded[path]
+
+
+def walk_forward_splits(n_rows, folds=4, test_hours=24 * 30, min_train_hours=24 * 90, window_hours=None):
+    """
+    Consecutive test windows at the end of the history, each trained on the
+    rows before it (expanding, or the last `window_hours` rows when given).
+
+    Args:
+        n_rows (int): Number of hourly rows.
+        folds (int): Number of test windows.
+        test_hours (int): Rows per test window.
+        min_train_hours (int): Fewest rows the first fold may train on.
+        window_hours (int, optional): Length of a sliding training window.
+
+    Returns:
+        list: (train_start, train_end, test_start, test_end) row ranges, oldest first.
+
+    Raises:
+        ValueError: If the history is too short for the requested folds.
+    """
+    first_test = n_rows - folds * test_hours
+    if first_test < min_train_hours:
+        raise ValueError(f"{n_rows} rows cannot hold {folds} folds of {test_hours} hours "
+                         f"after {min_train_hours} training hours")
+    splits = []
+    for fold in range(folds):
+        test_start = first_test + fold * test_hours
+        train_start = max(0, test_start - window_hours) if window_hours else 0
+        splits.append((train_start, test_start, test_start, test_start + test_hours))
+    return splits
+
+
+def parameter_grid(grid):
+    """
+    Expand {'param': [values]} into a list of parameter dicts.
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _limit_threads(n_jobs):
+    # Keep BLAS/OpenMP pools in each worker within its share of the cores
+    threadpool_limits(n_jobs)
+
+
+def _evaluate(task):
+    """
+    Fit one configuration on one fold inside a worker and score it on the
+    fold's test window.
+    """
+    arrays = load_matrices(task['cache_path'])
+    model_name, params, n_jobs = task['model'], task['params'], task['n_jobs']
+    train_start, train_end, test_start, test_end = task['split']
+    X_train, X_test = arrays[f'X_{model_name}'][train_start:train_end], arrays[f'X_{model_name}'][test_start:test_end]
+    y_train, y_test = arrays[f'y_{model_name}'][train_start:train_end], arrays[f'y_{model_name}'][test_start:test_end]
+
+    _, result = fit_and_score(model_name, X_train, y_train, X_test, y_test, n_jobs, params)
+    fit_seconds, predict_seconds = result.pop('fit_seconds'), result.pop('predict_seconds')
+    return {
+        'model': model_name,
+        'params': params,
+        'fold': task['fold'],
+        'train_rows': len(y_train),
+        'test_rows': len(y_test),
+        **result,
+        'fit_seconds': round(fit_seconds, 4),
+        'predict_seconds': round(predict_seconds, 4),
+        'train_rows_per_s': round(len(y_train) / fit_seconds, 1),
+        'predict_rows_per_s': round(len(y_test) / predict_seconds, 1) if predict_seconds else None,
+    }
+
+
+def summarize(results):
+    """
+    Average the fold results of each configuration and rank the
+    configurations of each model by its primary metric.
+
+    Returns:
+        dict: Per model, a list of configuration summaries, best first.
+    """
+    summary = {}
+    frame = pd.DataFrame(results)
+    for model_name, rows in frame.groupby('model'):
+        metric, higher_is_better = PRIMARY_METRIC[model_name]
+        metric_names = ['rmse', 'mae'] if model_name == 'temperature' else ['accuracy', 'f1_macro']
+        configs = []
+        for key, group in rows.groupby(rows['params'].map(lambda p: json.dumps(p, sort_keys=True))):
+            configs.append({
+                'params': json.loads(key),
+                'folds': len(group),
+                **{name: round(group[name].mean(), 4) for name in metric_names},
+                f'{metric}_std': round(group[metric].std(ddof=0), 4),
+                'fit_seconds': round(group['fit_seconds'].mean(), 4),
+                'train_rows_per_s': round(group['train_rows'].sum() / group['fit_seconds'].sum(), 1),
+                'predict_rows_per_s': round(group['test_rows'].sum() / group['predict_seconds'].sum(), 1),
+            })
+        summary[model_name] = sorted(configs, key=lambda c: -c[metric] if higher_is_better else c[metric])
+    return summary
+
+
+def run_backtest(raw_df, grid=DEFAULT_GRID, folds=4, test_hours=24 * 30, min_train_hours=24 * 90,
+                 window_hours=None, workers=None, cache_dir=BACKTEST_CACHE_DIR, lags=DEFAULT_LAGS):
+    """
+    Evaluate every configuration of the grid on walk-forward folds of the
+    history, for both models, in a process pool. The cores are split evenly
+    between the workers and each worker's XGBoost and BLAS threads are held to
+    its share, so the pool does not oversubscribe the machine.
+
+    The preprocessing statistics (outlier medians, cloud-cover mode) and the
+    label encoder are fitted on the whole window, as in a training run; lags
+    and rolling means only look back.
+
+    Args:
+        raw_df (pd.DataFrame): Raw hourly observations.
+        grid (dict): Per model ('temperature', 'condition'), XGBoost parameters
+            mapped to the values to try.
+        folds (int): Number of walk-forward test windows.
+        test_hours (int): Length of each test window.
+        min_train_hours (int): Fewest rows the first fold may train on.
+        window_hours (int, optional): Train on a sliding window instead of all earlier rows.
+        workers (int, optional): Number of worker processes (default: all cores).
+        cache_dir (str): Directory of the feature matrix cache.
+        lags (int or iterable): Lag specification.
+
+    Returns:
+        dict: 'meta', the per-fold 'results' and the ranked per-model 'summary'.
+    """
+    started = time.perf_counter()
+    cache_path = cached_feature_matrices(raw_df, cache_dir, lags)
+    with open(os.path.join(cache_path, 'meta.json')) as f:
+        meta = json.load(f)
+    features_seconds = time.perf_counter() - started
+    splits = walk_forward_splits(meta['rows'], folds, test_hours, min_train_hours, window_hours)
+
+    cores = os.cpu_count() or 1
+    tasks = [
+        {'model': model_name, 'params': params, 'fold': fold, 'split': split, 'cache_path': cache_path}
+        for model_name in MODELS if model_name in grid
+        for params in parameter_grid(grid[model_name])
+        for fold, split in enumerate(splits)
+    ]
+    workers = min(workers or cores, len(tasks)) or 1
+    n_jobs = max(1, cores // workers)
+    # Longest fits first so the pool does not end on one straggler
+    tasks.sort(key=lambda t: t['split'][1] - t['split'][0], reverse=True)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_threads, initargs=(n_jobs,)) as pool:
+        futures = [pool.submit(_evaluate, {**task, 'n_jobs': n_jobs}) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            metric = PRIMARY_METRIC[result['model']][0]
+            print(f"[{result['model']} fold {result['fold']}] {result['params']} "
+                  f"{metric}={result[metric]:.4f} fit {result['fit_seconds']:.2f}s")
+            results.append(result)
+
+    results.sort(key=lambda r: (r['model'], json.dumps(r['params'], sort_keys=True), r['fold']))
+    times = load_matrices(cache_path)['time']
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'rows': meta['rows'],
+            'history': [str(times[0]), str(times[-1])],
+            'folds': [{'train': [str(times[a]), str(times[b - 1])], 'test': [str(times[c]), str(times[d - 1])]}
+                      for a, b, c, d in splits],
+            'workers': workers,
+            'threads_per_worker': n_jobs,
+            'feature_cache': cache_path,
+            'features_seconds': round(features_seconds, 3),
+            'total_seconds': round(time.perf_counter() - started, 3),
+        },
+        'results': results,
+        'summary': summarize(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest and grid search of both models.")
+    parser.add_argument('--latitude', type=float, default=DEFAULT_LATITUDE)
+    parser.add_argument('--longitude', type=float, default=DEFAULT_LONGITUDE)
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--years', type=float, default=None, help="Use only the last N years of the store.")
+    parser.add_argument('--grid', help="JSON file of {model: {param: [values]}} (default: a small built-in grid).")
+    parser.add_argument('--folds', type=int, default=4)
+    parser.add_argument('--test-hours', type=int, default=24 * 30)
+    parser.add_argument('--window-hours', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-dir', default=BACKTEST_CACHE_DIR)
+    parser.add_argument('--output', default='backtest_report.json')
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    start = datetime.utcnow() - timedelta(days=365 * args.years) if args.years else None
+    raw_df = load_observations(location_key(args.latitude, args.longitude), start=start, root=args.store_dir)
+    if raw_df.empty:
+        raise SystemExit(f"No observations stored under {args.store_dir} for this location")
+
+    report = run_backtest(raw_df, grid, args.folds, args.test_hours, window_hours=args.window_hours,
+                          workers=args.workers, cache_dir=args.cache_dir)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for model_name, configs in report['summary'].items():
+        metric = PRIMARY_METRIC[model_name][0]
+        print(f"\n{model_name}: ranked by {metric}")
+        for config in configs:
+            print(f"  {json.dumps(config['params'], sort_keys=True):60} {metric}={config[metric]:.4f} "
+                  f"(±{config[f'{metric}_std']:.4f})  train {config['train_rows_per_s']:.0f} rows/s  "
+                  f"predict {config['predict_rows_per_s']:.0f} rows/s")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import json
+import os
+
+import numpy as np
+
+from model.artifact_bundle import MANIFEST_FILE, VERSIONS_DIR, _sha256, current_version
+
+# Output transform of each supported objective
+OBJECTIVES = {
+    'reg:squarederror': 'identity',
+    'binary:logistic': 'sigmoid',
+    'multi:softprob': 'softmax',
+    'multi:softmax': 'softmax',
+}
+# Rows scored per vectorized pass, to bound the (rows x trees) index arrays
+ROW_BLOCK = 2048
+
+
+def _node_depths(left, right):
+    # Children always have larger ids than their parent
+    depth = np.zeros(len(left), dtype=np.int32)
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return depth
+
+
+def export_ensemble(model):
+    """
+    Flatten a trained XGBRegressor/XGBClassifier into NumPy arrays. All trees
+    share one node table: split feature, threshold, left/right child and
+    default direction (for missing values) of every node, and the leaf values.
+    Leaves point to themselves, so a traversal can run a fixed number of steps.
+
+    Args:
+        model (XGBRegressor or XGBClassifier): Trained model.
+
+    Returns:
+        dict: Arrays for `CompiledEnsemble` / `save_ensemble`.
+
+    Raises:
+        ValueError: If the booster, the objective or a split type is not supported.
+    """
+    learner = json.loads(model.get_booster().save_raw(raw_format='json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Objective {objective!r} is not supported, expected one of {list(OBJECTIVES)}")
+    if learner['gradient_booster']['name'] != 'gbtree':
+        raise ValueError("Only gbtree boosters can be compiled")
+    trees = learner['gradient_booster']['model']['trees']
+    groups = max(1, int(learner['learner_model_param']['num_class']))
+    tree_group = np.asarray(learner['gradient_booster']['model']['tree_info'], dtype=np.int32)
+    if not np.array_equal(tree_group, np.tile(np.arange(groups), len(trees) // groups)):
+        raise ValueError("Expected one tree per class in every boosting round")
+
+    columns = {name: [] for name in ['feature', 'threshold', 'left', 'right', 'default_left', 'value']}
+    roots, depth, offset = [], 0, 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Categorical splits are not supported")
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        leaf = left == -1
+        nodes = np.arange(len(left), dtype=np.int32) + offset
+        columns['feature'].append(np.where(leaf, 0, tree['split_indices']).astype(np.int32))
+        columns['threshold'].append(np.where(leaf, np.float32(0), conditions))
+        columns['left'].append(np.where(leaf, nodes, left + offset))
+        columns['right'].append(np.where(leaf, nodes, right + offset))
+        columns['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+        columns['value'].append(np.where(leaf, conditions, np.float32(0)))
+        roots.append(offset)
+        depth = max(depth, int(_node_depths(left, right).max()))
+        offset += len(left)
+
+    base_score = float(learner['learner_model_param']['base_score'])
+    if OBJECTIVES[objective] == 'sigmoid':
+        base_score = float(np.log(base_score / (1 - base_score)))
+    arrays = {name: np.concatenate(parts) for name, parts in columns.items()}
+    arrays.update(
+        roots=np.asarray(roots, dtype=np.int32),
+        groups=np.int32(groups),
+        depth=np.int32(depth),
+        base_margin=np.float32(base_score),
+        transform=np.array(OBJECTIVES[objective]),
+    )
+    return arrays
+
+
+def save_ensemble(arrays, path):
+    """
+    Write exported arrays to an uncompressed .npz file.
+    """
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class CompiledEnsemble:
+    """
+    NumPy evaluator of an exported tree ensemble. A batch is scored by
+    walking all trees for all rows at once: every step gathers the split
+    feature of the current node of each (row, tree) pair and moves to a
+    child, for as many steps as the deepest tree. Leaf values are summed in
+    float32 in boosting order on top of the base margin, as XGBoost does, so
+    the outputs match its predictions.
+    """
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.groups = int(arrays['groups'])
+        self.depth = int(arrays['depth'])
+        self.base_margin = np.float32(arrays['base_margin'])
+        self.transform = str(arrays['transform'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def _leaves(self, X):
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node]
+
+    def margins(self, X):
+        """
+        Raw scores before the output transform.
+
+        Args:
+            X (np.ndarray): Feature rows (rows x features), NaN for missing values.
+
+        Returns:
+            np.ndarray: float32 array of shape (rows, classes), one column for regression.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        margins = np.empty((len(X), self.groups), dtype=np.float32)
+        for start in range(0, len(X), ROW_BLOCK):
+            leaves = self._leaves(X[start:start + ROW_BLOCK]).reshape(len(X[start:start + ROW_BLOCK]), -1,
+                                                                     self.groups)
+            # cumsum adds in boosting order, in float32, like XGBoost's predictor
+            total = np.concatenate([np.full((len(leaves), 1, self.groups), self.base_margin), leaves], axis=1)
+            margins[start:start + ROW_BLOCK] = np.cumsum(total, axis=1, dtype=np.float32)[:, -1]
+        return margins
+
+    def predict_proba(self, X):
+        """
+        Class probabilities of a classifier.
+        """
+        margins = self.margins(X)
+        if self.transform == 'sigmoid':
+            positive = 1 / (1 + np.exp(-margins[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        exp = np.exp(margins - margins.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        """
+        Regression values, or class indices of a classifier (as `predict` of
+        the XGBoost estimator).
+        """
+        margins = self.margins(X)
+        if self.transform == 'identity':
+            return margins[:, 0]
+        if self.transform == 'sigmoid':
+            return (margins[:, 0] > 0).astype(np.int64)
+        return margins.argmax(axis=1)
+
+
+def load_compiled(artifacts_dir, version=None):
+    """
+    Load the compiled trees of the current (or a given) artifact version,
+    without importing xgboost, scikit-learn or pandas.
+
+    Returns:
+        dict: 'version', the 'temperature' and 'condition' ensembles, their
+            feature lists ('temp_features', 'cond_features') and 'label_classes'.
+
+    Raises:
+        FileNotFoundError: If nothing is published or the version was published
+            without compiled trees.
+        ValueError: If a file does not match the manifest checksum.
+    """
+    version = version or current_version(artifacts_dir)
+    if version is None:
+        raise FileNotFoundError(f"No artifact version published in {artifacts_dir}")
+    path = os.path.join(artifacts_dir, VERSIONS_DIR, version)
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    compiled = {'version': version}
+    for name, entry in manifest['models'].items():
+        if 'compiled' not in entry:
+            raise FileNotFoundError(f"Artifact version {version} has no compiled trees; retrain to publish them")
+        with open(os.path.join(path, entry['compiled']['file']), 'rb') as f:
+            if _sha256(f.read()) != entry['compiled']['sha256']:
+                raise ValueError(f"Checksum mismatch for compiled {name} model in version {version}")
+        compiled[name] = CompiledEnsemble.load(os.path.join(path, entry['compiled']['file']))
+    compiled['temp_features'] = manifest['models']['temperature']['features']
+    compiled['cond_features'] = manifest['models']['condition']['features']
+    compiled['label_classes'] = np.array(manifest['label_classes'], dtype=object)
+    return compiled
+
+
+def predict_compiled(compiled, X_temp, X_cond):
+    """
+    Score feature matrices (columns in the order of 'temp_features' and
+    'cond_features', 'weather_condition' as its label code) with both models.
+
+    Returns:
+        tuple: (temperatures, weather condition labels) as arrays.
+    """
+    temperatures = compiled['temperature'].predict(X_temp)
+    conditions = compiled['label_classes'][compiled['condition'].predict(X_cond)]
+    return temperatures, conditions
@@ -1,17 +1,66 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 import pandas as pd
 
+from model.data_preprocessor import RAW_DTYPES, enforce_schema
+from model.instrumentation import record_api_calls
+from model.response_cache import default_cache
+from model.rollups import has_rollups, rebuild_rollups, update_rollups
+from model.weather_store import (DEFAULT_STORE_DIR, location_key, append_observations,
+                                 last_observation_time)
+
+DEFAULT_LATITUDE = 17.3850
+DEFAULT_LONGITUDE = 78.4867
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+HOURLY_VARIABLES = [
+    'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m', 'wind_direction_10m',
+    'pressure_msl', 'precipitation', 'cloudcover', 'weathercode'
+]
+TIMEZONE = 'Asia/Kolkata'
+REQUEST_TIMEOUT = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _request_params(start_date, end_date, latitude, longitude):
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'start_date': start_date,
+        'end_date': end_date,
+        'hourly': ','.join(HOURLY_VARIABLES),
+        'timezone': TIMEZONE,
+    }
+
+
+def _request_open_meteo(start_date, end_date, latitude, longitude, session, base_url, timeout):
+    params = _request_params(start_date, end_date, latitude, longitude)
+    response = (session or requests).get(base_url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response
+
 
-def fetch_open_meteo(start_date, end_date, latitude=17.3850, longitude=78.4867):
+def fetch_open_meteo(start_date, end_date, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE,
+                     session=None, base_url=ARCHIVE_URL, timeout=REQUEST_TIMEOUT, cache=None):
     """
-    Fetch historical weather data from the Open-Meteo API.
+    Fetch historical weather data from the Open-Meteo API, answering from
+    the response cache when the window is cached.
 
     Args:
         start_date (str): Start date in 'YYYY-MM-DD' format.
         end_date (str): End date in 'YYYY-MM-DD' format.
         latitude (float): Latitude of the location (default: Hyderabad).
         longitude (float): Longitude of the location (default: Hyderabad).
+        session (requests.Session, optional): Session to reuse pooled connections.
+        base_url (str): Archive endpoint, overridable for a local stub server.
+        timeout (float): Connect/read timeout in seconds.
+        cache (ResponseCache, optional): Response cache (default: `default_cache()`;
+            False to always download).
 
     Returns:
         dict: JSON response containing hourly weather data.
@@ -19,43 +68,172 @@ def fetch_open_meteo(start_date, end_date, latitude=17.3850, longitude=78.4867):
     Raises:
         requests.RequestException: If the API request fails.
     """
-    url = (
-        "https://archive-api.open-meteo.com/v1/archive?"
-        f"latitude={latitude}&longitude={longitude}"
-        f"&start_date={start_date}&end_date={end_date}"
-        "&hourly=temperature_2m,relative_humidity_2m,wind_speed_10m,"
-        "wind_direction_10m,pressure_msl,precipitation,cloudcover,weathercode"
-        "&timezone=Asia%2FKolkata"
-    )
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    cache = default_cache() if cache is None else cache
+    params = _request_params(start_date, end_date, latitude, longitude)
+    data = cache.get(base_url, params) if cache else None
+    if data is None:
+        response = _request_open_meteo(start_date, end_date, latitude, longitude, session, base_url, timeout)
+        data = response.json()
+        if cache:
+            cache.put(base_url, params, response.content)
+    return data
+
+
+def split_date_range(start_date, end_date, chunk='month'):
+    """
+    Split an inclusive date range into calendar-aligned windows.
+
+    Args:
+        start_date (str): Start date in 'YYYY-MM-DD' format.
+        end_date (str): End date in 'YYYY-MM-DD' format.
+        chunk (str): Window size, 'month' or 'quarter'.
+
+    Returns:
+        list: (start, end) tuples of 'YYYY-MM-DD' strings, in order.
+    """
+    freq = {'month': 'MS', 'quarter': 'QS'}[chunk]
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    boundaries = [start] + [b for b in pd.date_range(start, end, freq=freq) if b > start]
+    windows = []
+    for i, window_start in enumerate(boundaries):
+        window_end = boundaries[i + 1] - timedelta(days=1) if i + 1 < len(boundaries) else end
+        windows.append((window_start.date().isoformat(), window_end.date().isoformat()))
+    return windows
+
+
+def _fetch_with_retries(session, start_date, end_date, latitude, longitude, base_url, timeout,
+                        retries, backoff, cache=None):
+    """
+    Fetch one window, retrying connection errors, timeouts and retryable
+    status codes with exponential backoff plus full jitter. Cached windows
+    are answered without a request.
+    """
+    started = time.perf_counter()
+    params = _request_params(start_date, end_date, latitude, longitude)
+    data = cache.get(base_url, params) if cache else None
+    if data is not None:
+        latency = {'start_date': start_date, 'end_date': end_date, 'seconds': time.perf_counter() - started,
+                   'attempts': 0, 'bytes': 0, 'cached': True}
+        return pd.DataFrame(data['hourly']), latency
+
+    for attempt in range(retries + 1):
+        try:
+            response = _request_open_meteo(start_date, end_date, latitude, longitude, session, base_url, timeout)
+            data = response.json()
+            break
+        except requests.RequestException as exc:
+            status = getattr(exc.response, 'status_code', None)
+            retryable = status is None or status in RETRY_STATUS_CODES
+            if not retryable or attempt == retries:
+                raise
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+    if cache:
+        cache.put(base_url, params, response.content)
+    latency = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'seconds': time.perf_counter() - started,
+        'attempts': attempt + 1,
+        'bytes': len(response.content),
+    }
+    return pd.DataFrame(data['hourly']), latency
+
+
+def fetch_open_meteo_chunked(start_date, end_date, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE,
+                             chunk='month', max_workers=4, retries=3, backoff=0.5,
+                             base_url=ARCHIVE_URL, timeout=REQUEST_TIMEOUT, cache=None):
+    """
+    Fetch a long date range as month- or quarter-sized windows downloaded
+    concurrently over a shared keep-alive session, then stitch the windows
+    into one frame. Windows found in the response cache are not downloaded,
+    so a rerun over the same range makes no network calls.
+
+    Args:
+        start_date (str): Start date in 'YYYY-MM-DD' format.
+        end_date (str): End date in 'YYYY-MM-DD' format.
+        latitude (float): Latitude of the location (default: Hyderabad).
+        longitude (float): Longitude of the location (default: Hyderabad).
+        chunk (str): Window size, 'month' or 'quarter'.
+        max_workers (int): Maximum number of concurrent requests.
+        retries (int): Retries per window after the first attempt.
+        backoff (float): Base backoff in seconds, doubled on every retry.
+        base_url (str): Archive endpoint, overridable for a local stub server.
+        timeout (float): Connect/read timeout in seconds per request.
+        cache (ResponseCache, optional): Response cache (default: `default_cache()`;
+            False to always download).
 
+    Returns:
+        pd.DataFrame: Hourly data ordered by 'time' with duplicate hours removed.
+            Per-window latencies and payload sizes are available in
+            `df.attrs['chunk_latencies']` and are added to the active run metrics.
 
-def get_initial_data(years=3):
+    Raises:
+        requests.RequestException: If a window still fails after all retries.
+    """
+    cache = default_cache() if cache is None else cache
+    windows = split_date_range(start_date, end_date, chunk)
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(
+                lambda w: _fetch_with_retries(session, w[0], w[1], latitude, longitude, base_url,
+                                              timeout, retries, backoff, cache),
+                windows
+            ))
+
+    frames, latencies = zip(*results)
+    df = pd.concat(frames, ignore_index=True)
+    df['time'] = pd.to_datetime(df['time'])
+    df = df.drop_duplicates(subset='time', keep='last').sort_values('time').reset_index(drop=True)
+    df = enforce_schema(df, RAW_DTYPES)
+    df.attrs['chunk_latencies'] = list(latencies)
+    record_api_calls(latencies)
+
+    seconds = [lat['seconds'] for lat in latencies]
+    cached = sum(1 for lat in latencies if lat.get('cached'))
+    print(f"Fetched {len(windows)} windows ({cached} from cache, {len(df)} rows): "
+          f"max {max(seconds):.2f}s, mean {sum(seconds) / len(seconds):.2f}s per window")
+    return df
+
+
+def _trim_unpublished(df):
+    """
+    Drop the trailing hours the archive has not published yet (all values null).
+    """
+    last_valid = df.drop(columns='time').dropna(how='all').index.max()
+    if pd.isna(last_valid):
+        return df.iloc[:0]
+    return df.loc[:last_valid]
+
+
+def get_initial_data(years=3, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE):
     """
     Fetch initial weather data for the past specified number of years.
 
     Args:
         years (int): Number of years to fetch data for (default: 3).
+        latitude (float): Latitude of the location (default: Hyderabad).
+        longitude (float): Longitude of the location (default: Hyderabad).
 
     Returns:
         pd.DataFrame: DataFrame with initial weather data.
     """
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=365 * years)
-    data = fetch_open_meteo(start_date.isoformat(), end_date.isoformat())
-    df = pd.DataFrame(data['hourly'])
-    df['time'] = pd.to_datetime(df['time'])
-    return df
+    df = fetch_open_meteo_chunked(start_date.isoformat(), end_date.isoformat(), latitude, longitude)
+    return _trim_unpublished(df)
 
 
-def get_new_data(last_end_date):
+def get_new_data(last_end_date, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE):
     """
     Fetch new weather data from the day after the last end date to the current date.
 
     Args:
         last_end_date (str): Last fetched end date in 'YYYY-MM-DD' format.
+        latitude (float): Latitude of the location (default: Hyderabad).
+        longitude (float): Longitude of the location (default: Hyderabad).
 
     Returns:
         pd.DataFrame: DataFrame with new weather data, empty if no new data available.
@@ -65,7 +243,39 @@ def get_new_data(last_end_date):
     end_date = datetime.utcnow().date().isoformat()
     if start_date >= end_date:
         return pd.DataFrame()
-    data = fetch_open_meteo(start_date, end_date)
-    df = pd.DataFrame(data['hourly'])
-    df['time'] = pd.to_datetime(df['time'])
-    return df
+    df = fetch_open_meteo_chunked(start_date, end_date, latitude, longitude)
+    return _trim_unpublished(df)
+
+
+def sync_store(years=3, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE, root=DEFAULT_STORE_DIR):
+    """
+    Bring the local weather store up to date for a location.
+    An empty store is bootstrapped with `get_initial_data`; otherwise only the
+    missing tail is fetched with `get_new_data`, starting from the day of the
+    last stored observation so a partially published day gets completed.
+
+    Args:
+        years (int): History to fetch when the store is empty (default: 3).
+        latitude (float): Latitude of the location (default: Hyderabad).
+        longitude (float): Longitude of the location (default: Hyderabad).
+        root (str): Root directory of the store.
+
+    The rollups of the buckets touched by the fetched rows are refreshed too
+    (all of them the first time, if the store has none yet).
+
+    Returns:
+        int: Number of rows fetched and written to the store.
+    """
+    location = location_key(latitude, longitude)
+    last_time = last_observation_time(location, root)
+    if last_time is None:
+        df = get_initial_data(years, latitude, longitude)
+    else:
+        last_end_date = (last_time.date() - timedelta(days=1)).isoformat()
+        df = get_new_data(last_end_date, latitude, longitude)
+    written = append_observations(df, location, root)
+    if not has_rollups(location, root):
+        rebuild_rollups(location, root)
+    elif written:
+        update_rollups(df['time'], location, root)
+    return written
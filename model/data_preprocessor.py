@@ -21,32 +21,76 @@ historical_data = {
     'precipitation': [500, 0],
 }
 
+COLUMN_RENAMES = {
+    'time': 'date_time',
+    'temperature_2m': 'temperature',
+    'relative_humidity_2m': 'humidity',
+    'wind_speed_10m': 'wind_speed',
+    'wind_direction_10m': 'wind_direction',
+    'pressure_msl': 'pressure',
+    'cloudcover': 'cloud_coverage'
+}
+
+SMOOTH_COLUMNS = ['temperature', 'humidity', 'pressure']
+EWM_SPAN = 5
+
+# Compact schema: float32 sensors, nullable int8 weather codes and a fixed
+# categorical of every condition label, so frames are the same shape for
+# every site and every run.
+WEATHER_CONDITION_DTYPE = pd.CategoricalDtype(list(dict.fromkeys(CODE_MAP.values())) + ["Unknown"])
+RAW_DTYPES = {
+    'temperature_2m': 'float32',
+    'relative_humidity_2m': 'float32',
+    'wind_speed_10m': 'float32',
+    'wind_direction_10m': 'float32',
+    'pressure_msl': 'float32',
+    'precipitation': 'float32',
+    'cloudcover': 'float32',
+    'weathercode': 'Int8',
+}
+COMPACT_DTYPES = {
+    **RAW_DTYPES,
+    **{COLUMN_RENAMES.get(col, col): dtype for col, dtype in RAW_DTYPES.items()},
+    'weather_condition': WEATHER_CONDITION_DTYPE,
+}
+
+
+def enforce_schema(df: pd.DataFrame, dtypes: dict = COMPACT_DTYPES) -> pd.DataFrame:
+    """
+    Cast the columns named in `dtypes` to their compact type. Columns that
+    already have the right type and columns outside the schema are left alone.
+
+    Args:
+        df (pd.DataFrame): Raw or preprocessed weather data.
+        dtypes (dict): Column name to dtype (default: `COMPACT_DTYPES`).
+
+    Returns:
+        pd.DataFrame: The frame with compact dtypes.
+    """
+    casts = {col: dtype for col, dtype in dtypes.items() if col in df.columns and df[col].dtype != dtype}
+    return df.astype(casts) if casts else df
+
 
-def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
+def preprocess_data(df: pd.DataFrame, medians: dict = None) -> pd.DataFrame:
     """
     Preprocess raw weather data by renaming columns, mapping weather codes,
-    handling missing values, and correcting outliers.
+    handling missing values, and correcting outliers. The result follows
+    `COMPACT_DTYPES`.
 
     Args:
         df (pd.DataFrame): Raw weather data DataFrame.
+        medians (dict): Outlier replacement values to use instead of the
+            column medians of `df` (see `handle_outliers`).
 
     Returns:
         pd.DataFrame: Cleaned and preprocessed weather data.
     """
-    df = df.rename(columns={
-        'time': 'date_time',
-        'temperature_2m': 'temperature',
-        'relative_humidity_2m': 'humidity',
-        'wind_speed_10m': 'wind_speed',
-        'wind_direction_10m': 'wind_direction',
-        'pressure_msl': 'pressure',
-        'cloudcover': 'cloud_coverage'
-    })
-    df['weather_condition'] = df['weathercode'].map(CODE_MAP).fillna("Unknown")
+    df = enforce_schema(df.rename(columns=COLUMN_RENAMES))
+    df['weather_condition'] = df['weathercode'].map(CODE_MAP).fillna("Unknown").astype(WEATHER_CONDITION_DTYPE)
     df = handle_missing_values(df)
-    df = handle_outliers(df)
+    df = handle_outliers(df, medians)
 
-    return df
+    return enforce_schema(df)
 
 
 def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
@@ -68,28 +112,43 @@ def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     if 'precipitation' in df.columns:
         df['precipitation'].fillna(0, inplace=True)
 
-    smooth_cols = ['temperature', 'humidity', 'pressure']
-    for col in smooth_cols:
+    for col in SMOOTH_COLUMNS:
         if col in df.columns:
-            df[col] = df[col].ewm(span=5, adjust=False).mean()
+            df[col] = df[col].ewm(span=EWM_SPAN, adjust=False).mean()
 
     return df
 
 
-def handle_outliers(df: pd.DataFrame) -> pd.DataFrame:
+def outlier_medians(df: pd.DataFrame) -> dict:
+    """
+    Column medians `handle_outliers` replaces out-of-range values with.
+
+    Args:
+        df (pd.DataFrame): DataFrame after missing-value handling.
+
+    Returns:
+        dict: Median per outlier-checked column.
+    """
+    return {column: df[column].median() for column in historical_data}
+
+
+def handle_outliers(df: pd.DataFrame, medians: dict = None) -> pd.DataFrame:
     """
     Replace outliers in weather-related numerical columns based on historical thresholds.
-    Values outside the valid range are replaced with the column's median.
+    Values outside the valid range are replaced with the column's median, or
+    with the given frozen medians.
 
     Args:
         df (pd.DataFrame): DataFrame to process for outliers.
+        medians (dict): Replacement value per column (default: the medians of `df`).
 
     Returns:
         pd.DataFrame: DataFrame with outliers corrected.
     """
+    if medians is None:
+        medians = outlier_medians(df)
     for column in historical_data:
         max_val, min_val = historical_data[column]
         outlier_mask = (df[column] < min_val) | (df[column] > max_val)
-        median_val = df[column].median()
-        df.loc[outlier_mask, column] = median_val
+        df.loc[outlier_mask, column] = medians[column]
     return df
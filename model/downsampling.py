@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Pick the points to keep with Largest-Triangle-Three-Buckets, which keeps
+    the visual shape of a series (peaks and troughs) when downsampling.
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+
+    Args:
+        x (np.ndarray): Increasing x values (e.g. epoch milliseconds).
+        y (np.ndarray): Finite values, same length as `x`.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices into `x`/`y`.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (n_out - 2)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(x, y, n_out):
+    """
+    Downsample a series with LTTB, dropping missing values first.
+
+    Args:
+        x (np.ndarray): Increasing x values.
+        y (np.ndarray): Values.
+        n_out (int): Maximum number of points to return.
+
+    Returns:
+        tuple: (x, y) arrays with at most `n_out` points.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    idx = lttb_indices(x, y, n_out)
+    return x[idx], y[idx]
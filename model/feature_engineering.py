@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import LabelEncoder
 
+ROLLING_COLUMNS = ['temperature', 'humidity', 'pressure', 'wind_speed']
+ROLLING_WINDOW = 3
+
 
 def encode_weather_condition(df: pd.DataFrame):
     """
@@ -12,7 +15,7 @@ def encode_weather_condition(df: pd.DataFrame):
     """
     if 'weather_condition' in df.columns:
         le = LabelEncoder()
-        df['weather_condition_encoded'] = le.fit_transform(df['weather_condition'])
+        df['weather_condition_encoded'] = le.fit_transform(df['weather_condition']).astype(np.int8)
 
     return df, le
 
@@ -27,17 +30,17 @@ def encode_datetime_features(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: DataFrame with new time-based features.
     """
     df['date_time'] = pd.to_datetime(df['date_time'])
-    df['hour'] = df['date_time'].dt.hour
-    df['dayofweek'] = df['date_time'].dt.dayofweek
+    df['hour'] = df['date_time'].dt.hour.astype(np.int8)
+    df['dayofweek'] = df['date_time'].dt.dayofweek.astype(np.int8)
 
-    df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-    df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-    df['dayofweek_sin'] = np.sin(2 * np.pi * df['dayofweek'] / 7)
-    df['dayofweek_cos'] = np.cos(2 * np.pi * df['dayofweek'] / 7)
+    df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24).astype(np.float32)
+    df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24).astype(np.float32)
+    df['dayofweek_sin'] = np.sin(2 * np.pi * df['dayofweek'] / 7).astype(np.float32)
+    df['dayofweek_cos'] = np.cos(2 * np.pi * df['dayofweek'] / 7).astype(np.float32)
     return df
 
 
-def add_rolling_features(df: pd.DataFrame, window: int = 3) -> pd.DataFrame:
+def add_rolling_features(df: pd.DataFrame, window: int = ROLLING_WINDOW) -> pd.DataFrame:
     """
     Add rolling mean features for selected numeric columns.
 
@@ -48,10 +51,9 @@ def add_rolling_features(df: pd.DataFrame, window: int = 3) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame with new rolling mean features.
     """
-    rolling_cols = ['temperature', 'humidity', 'pressure', 'wind_speed']
-    for col in rolling_cols:
+    for col in ROLLING_COLUMNS:
         if col in df.columns:
-            df[f'{col}_rolling_mean_{window}'] = df[col].rolling(window=window).mean()
+            df[f'{col}_rolling_mean_{window}'] = df[col].rolling(window=window).mean().astype(np.float32)
     return df
 
 
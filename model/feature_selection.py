@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import xgboost as xgb
+
+from model.data_fetcher import DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+from model.data_preprocessor import preprocess_data
+from model.feature_engineering import feature_engineering_pipeline
+from model.model_retrain_automation import ARTIFACTS_DIR, create_lagged_features
+from model.training_orchestrator import build_training_matrix, fit_and_score, name_features
+from model.weather_store import DEFAULT_STORE_DIR, load_observations, location_key
+
+SELECTION_FILE = 'feature_selection.json'
+IMPORTANCE_METHODS = ['gain', 'shap']
+# Features this correlated (|Pearson r|) with a more important one are dropped
+CORRELATION_THRESHOLD = 0.95
+# Keep the most important clusters until they hold this share of the importance
+IMPORTANCE_COVERAGE = 0.99
+MIN_FEATURES = 8
+CORRELATION_SAMPLE_ROWS = 20000
+SHAP_SAMPLE_ROWS = 2000
+HOLDOUT_HOURS = 24 * 30
+LATENCY_CALLS = 200
+
+
+def _sample_rows(X, rows):
+    # Evenly spaced rows, so the sample covers every season of the history
+    if len(X) <= rows:
+        return X
+    return X[np.linspace(0, len(X) - 1, rows).astype(int)]
+
+
+def feature_importance(model, X, features, method='gain', sample_rows=SHAP_SAMPLE_ROWS):
+    """
+    Importance of each feature of a trained model, normalized to sum to 1.
+
+    Args:
+        model (XGBRegressor or XGBClassifier): Model trained on `features`.
+        X (np.ndarray): Training rows, used by the 'shap' method.
+        features (list): Feature names, in column order.
+        method (str): 'gain' for the total split gain of each feature, or
+            'shap' for its mean absolute SHAP value (XGBoost's TreeSHAP,
+            summed over the classes of a classifier).
+        sample_rows (int): Rows the SHAP values are computed on.
+
+    Returns:
+        dict: Feature name to importance.
+
+    Raises:
+        ValueError: If the method is unknown.
+    """
+    booster = model.get_booster()
+    if method == 'gain':
+        scores = booster.get_score(importance_type='total_gain')
+        values = np.array([scores.get(name, scores.get(f'f{j}', 0.0)) for j, name in enumerate(features)])
+    elif method == 'shap':
+        rows = _sample_rows(X, sample_rows)
+        contributions = booster.predict(xgb.DMatrix(rows, feature_names=booster.feature_names), pred_contribs=True)
+        # (rows, features + 1) or (rows, classes, features + 1); the last column is the bias
+        values = np.abs(contributions[..., :-1]).reshape(len(rows), -1, len(features)).sum(axis=1).mean(axis=0)
+    else:
+        raise ValueError(f"Unknown importance method {method!r}, expected one of {IMPORTANCE_METHODS}")
+    total = values.sum()
+    return dict(zip(features, (values / total if total else values).astype(float)))
+
+
+def correlation_clusters(X, features, importance, threshold=CORRELATION_THRESHOLD,
+                         sample_rows=CORRELATION_SAMPLE_ROWS):
+    """
+    Group features that carry the same signal. Taking the features from the
+    most to the least important, each one not yet in a cluster starts a new
+    cluster and takes in every remaining feature whose absolute correlation
+    with it reaches `threshold`; the first member represents the cluster.
+
+    Args:
+        X (np.ndarray): Training rows.
+        features (list): Feature names, in column order.
+        importance (dict): Output of `feature_importance`.
+        threshold (float): Absolute Pearson correlation that joins a cluster.
+        sample_rows (int): Rows the correlations are computed on.
+
+    Returns:
+        list: Clusters as lists of (feature, correlation with the representative).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.abs(np.corrcoef(_sample_rows(X, sample_rows).astype(np.float64), rowvar=False))
+    # Constant columns have no correlation with anything
+    corr = np.nan_to_num(np.atleast_2d(corr))
+    order = sorted(range(len(features)), key=lambda j: -importance[features[j]])
+    assigned = np.zeros(len(features), dtype=bool)
+    clusters = []
+    for j in order:
+        if assigned[j]:
+            continue
+        members = [k for k in order if not assigned[k] and (k == j or corr[j, k] >= threshold)]
+        assigned[members] = True
+        clusters.append([(features[k], round(float(corr[j, k]), 4)) for k in members])
+    return clusters
+
+
+def select_features(model, X, features, method='gain', threshold=CORRELATION_THRESHOLD,
+                    coverage=IMPORTANCE_COVERAGE, min_features=MIN_FEATURES):
+    """
+    Prune the feature list of a trained model: keep one representative per
+    correlation cluster, then only the clusters that together hold `coverage`
+    of the importance (a cluster counts with the importance of all its
+    members), but at least `min_features` features: when there are fewer
+    clusters than that, the most important of the pruned features are added
+    back.
+
+    Returns:
+        dict: 'features' (kept, in the original column order), 'dropped'
+            (feature to reason) and 'importance' of every feature.
+    """
+    importance = feature_importance(model, X, features, method)
+    clusters = correlation_clusters(X, features, importance, threshold)
+    clusters.sort(key=lambda cluster: -sum(importance[name] for name, _ in cluster))
+
+    kept, dropped, covered = set(), {}, 0.0
+    for cluster in clusters:
+        representative = cluster[0][0]
+        if covered >= coverage and len(kept) >= min_features:
+            for name, _ in cluster:
+                dropped[name] = 'low importance'
+            continue
+        kept.add(representative)
+        covered += sum(importance[name] for name, _ in cluster)
+        for name, corr in cluster[1:]:
+            dropped[name] = f'correlated with {representative} (|r|={corr:.3f})'
+    # Highly collinear inputs can leave fewer clusters than the floor
+    for name in sorted(dropped, key=lambda name: -importance[name]):
+        if len(kept) >= min_features:
+            break
+        kept.add(name)
+        del dropped[name]
+    return {
+        'features': [name for name in features if name in kept],
+        'dropped': dropped,
+        'importance': {name: round(value, 6) for name, value in importance.items()},
+    }
+
+
+def _row_latency_ms(model, row, calls=LATENCY_CALLS):
+    booster = model.get_booster()
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        booster.inplace_predict(row)
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1000, 4)
+
+
+def _fit_and_score(data, split, n_jobs):
+    """
+    Fit both models on the rows before `split` and score them on the rest:
+    accuracy, fit time, batch prediction throughput and single-row latency
+    (the recursive forecast and the prediction server score one row at a time).
+    """
+    models, scores = {}, {}
+    for name in ['temperature', 'condition']:
+        X, y, features = data.X(name), data.targets[name], data.features(name)
+        model, result = fit_and_score(name, X[:split], y[:split], X[split:], y[split:], n_jobs)
+        models[name] = name_features(model, features)
+        scores[name] = {
+            'features': len(features),
+            **{metric: round(value, 4) for metric, value in result.items() if not metric.endswith('_seconds')},
+            'fit_seconds': round(result['fit_seconds'], 3),
+            'predict_rows_per_s': (round((len(y) - split) / result['predict_seconds'], 1)
+                                   if result['predict_seconds'] else None),
+            'row_latency_ms': _row_latency_ms(model, np.ascontiguousarray(X[split:split + 1])),
+        }
+    scores['matrix_mb'] = round(data.matrix.nbytes / 2 ** 20, 2)
+    return models, scores
+
+
+def run_feature_selection(df_lagged, le, method='gain', threshold=CORRELATION_THRESHOLD,
+                          coverage=IMPORTANCE_COVERAGE, min_features=MIN_FEATURES, holdout_hours=HOLDOUT_HOURS,
+                          n_jobs=None):
+    """
+    Select the features of both models from a training run and report the
+    accuracy and speed of the pruned models against the full ones.
+
+    Both models are trained on all features on the history before the last
+    `holdout_hours`; their importances and the feature correlations on those
+    rows give the pruned lists. Both models are then retrained on the pruned
+    lists, and both pairs are scored on the held-out hours.
+
+    Args:
+        df_lagged (pd.DataFrame): Lagged feature frame without missing values.
+        le (LabelEncoder): Encoder for the weather_condition feature.
+        method (str): Importance method, 'gain' or 'shap'.
+        threshold (float): Absolute correlation that makes two features redundant.
+        coverage (float): Share of the importance the kept features must hold.
+        min_features (int): Fewest features kept per model.
+        holdout_hours (int): Most recent hours held out for the report.
+        n_jobs (int, optional): Threads per fit (default: all cores).
+
+    Returns:
+        dict: 'meta', the per-model selection under 'models' and the
+            'report' with the 'full' and 'pruned' scores.
+
+    Raises:
+        ValueError: If the history is not longer than the holdout.
+    """
+    split = len(df_lagged) - holdout_hours
+    if split < holdout_hours:
+        raise ValueError(f"{len(df_lagged)} rows are too few for a {holdout_hours}-hour holdout")
+
+    full = build_training_matrix(df_lagged, le)
+    full_models, full_scores = _fit_and_score(full, split, n_jobs)
+    selection = {
+        name: select_features(full_models[name], full.X(name)[:split], full.features(name), method, threshold,
+                              coverage, min_features)
+        for name in ['temperature', 'condition']
+    }
+    pruned = build_training_matrix(df_lagged, le, {name: s['features'] for name, s in selection.items()})
+    _, pruned_scores = _fit_and_score(pruned, split, n_jobs)
+
+    times = df_lagged['date_time']
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'method': method,
+            'correlation_threshold': threshold,
+            'importance_coverage': coverage,
+            'min_features': min_features,
+            'train': [str(times.iloc[0]), str(times.iloc[split - 1])],
+            'holdout': [str(times.iloc[split]), str(times.iloc[-1])],
+        },
+        'models': selection,
+        'report': {'full': full_scores, 'pruned': pruned_scores},
+    }
+
+
+def save_selection(selection, artifacts_dir=ARTIFACTS_DIR):
+    """
+    Atomically write a `run_feature_selection` result next to the artifacts;
+    the next retraining run trains on (and publishes) its feature lists.
+    """
+    os.makedirs(artifacts_dir, exist_ok=True)
+    path = os.path.join(artifacts_dir, SELECTION_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(selection, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_selection(artifacts_dir=ARTIFACTS_DIR):
+    """
+    Load the saved feature lists.
+
+    Returns:
+        dict: Kept features per model name, or None if no selection is saved.
+    """
+    path = os.path.join(artifacts_dir, SELECTION_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        selection = json.load(f)
+    return {name: model['features'] for name, model in selection['models'].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importance-based feature pruning with an accuracy/speed report.")
+    parser.add_argument('--latitude', type=float, default=DEFAULT_LATITUDE)
+    parser.add_argument('--longitude', type=float, default=DEFAULT_LONGITUDE)
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--years', type=float, default=3, help="History to use, as in training (default: 3).")
+    parser.add_argument('--method', choices=IMPORTANCE_METHODS, default='gain')
+    parser.add_argument('--threshold', type=float, default=CORRELATION_THRESHOLD)
+    parser.add_argument('--coverage', type=float, default=IMPORTANCE_COVERAGE)
+    parser.add_argument('--min-features', type=int, default=MIN_FEATURES)
+    parser.add_argument('--holdout-hours', type=int, default=HOLDOUT_HOURS)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--output', default='feature_selection_report.json')
+    parser.add_argument('--apply', action='store_true',
+                        help="Save the selection so the next retraining run uses the pruned features.")
+    args = parser.parse_args()
+
+    start = datetime.utcnow() - timedelta(days=365 * args.years)
+    raw_df = load_observations(location_key(args.latitude, args.longitude), start=start, root=args.store_dir)
+    if raw_df.empty:
+        raise SystemExit(f"No observations stored under {args.store_dir} for this location")
+    df, le = feature_engineering_pipeline(preprocess_data(raw_df))
+    df_lagged = create_lagged_features(df).dropna()
+
+    selection = run_feature_selection(df_lagged, le, args.method, args.threshold, args.coverage,
+                                      args.min_features, args.holdout_hours, args.n_jobs)
+    with open(args.output, 'w') as f:
+        json.dump(selection, f, indent=2)
+
+    report = selection['report']
+    for name, metrics in [('temperature', ['rmse', 'mae']), ('condition', ['accuracy', 'f1_macro'])]:
+        print(f"\n{name}: kept {len(selection['models'][name]['features'])} of "
+              f"{report['full'][name]['features']} features")
+        for variant in ['full', 'pruned']:
+            scores = report[variant][name]
+            print(f"  {variant:7} " + '  '.join(f"{metric}={scores[metric]:.4f}" for metric in metrics) +
+                  f"  fit {scores['fit_seconds']:.2f}s  predict {scores['predict_rows_per_s']:.0f} rows/s"
+                  f"  row {scores['row_latency_ms']:.3f}ms")
+    print(f"\nTraining matrix: {report['full']['matrix_mb']:.1f} MB -> {report['pruned']['matrix_mb']:.1f} MB")
+    print(f"Report written to {args.output}")
+    if args.apply:
+        save_selection(selection, os.path.join(args.output_dir, ARTIFACTS_DIR))
+        print("Selection saved; the next retraining run trains on the pruned features")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import signal
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+import schedule
+
+from model.data_fetcher import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, sync_store
+from model.forecasting import forecast_recursive
+from model.incremental_features import load_feature_state, update_features
+from model.instrumentation import RUN_LOG_FILE, RunRecorder, stage
+from model.model_retrain_automation import ARTIFACTS_DIR
+from model.prediction_log import log_forecast, score_predictions
+from model.prediction_server import ModelCache
+from model.rollups import record_predictions
+from model.run_model_retrain import FORECAST_HOURS, TRAINING_YEARS, run_model_retrain
+from model.weather_store import DEFAULT_STORE_DIR, load_observations, location_key
+
+LOCK_FILE = '.jobs.lock'
+HISTORY_HOURS = 7 * 24
+RETRAIN_AT = '00:00'
+PREDICT_AT_MINUTE = ':05'
+
+
+@contextlib.contextmanager
+def job_lock(directory):
+    """
+    Hold an exclusive lock on `directory` while a job runs, so two daemons
+    (or a daemon and a cron run of `src/run.py`) never work on the same
+    outputs at once.
+
+    Yields:
+        bool: True if the lock was acquired, False if another process holds it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'w') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class ForecastDaemon:
+    """
+    Resident replacement for the nightly cron run. The interpreter, the
+    libraries, the feature carry-over state, the recent feature rows and the
+    models stay loaded between jobs:
+
+    - the hourly job syncs the store, builds features for the new hours only
+      (`update_features`) and refreshes the forecast;
+    - the daily job runs the full `run_model_retrain` pipeline in-process and
+      takes over its features and models as the new warm state.
+
+    Jobs run one at a time on the main thread and under `job_lock`, so they
+    never overlap. A job whose slot passed while another was running (or
+    while the machine was suspended) runs once as soon as possible, and the
+    retrain job runs at start-up to catch up with any run missed while the
+    daemon was down. SIGTERM/SIGINT stop the daemon after the current job.
+    """
+
+    def __init__(self, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE, store_dir=DEFAULT_STORE_DIR,
+                 output_dir='.', n_jobs=None, retrain_at=RETRAIN_AT, predict_at_minute=PREDICT_AT_MINUTE):
+        self.latitude, self.longitude = latitude, longitude
+        self.location = location_key(latitude, longitude)
+        self.store_dir = store_dir
+        self.output_dir = output_dir
+        self.artifacts_dir = os.path.join(output_dir, ARTIFACTS_DIR)
+        self.n_jobs = n_jobs
+        self.scheduler = schedule.Scheduler()
+        self.scheduler.every().hour.at(predict_at_minute).do(self._run_job, 'hourly', self.hourly_job)
+        self.scheduler.every().day.at(retrain_at).do(self._run_job, 'retrain', self.retrain_job)
+        self._stop = threading.Event()
+        self.models = None
+        self.feature_state = None
+        self.history = None
+        self._forecast_key = None
+
+    def retrain_job(self):
+        """
+        Run the full retraining pipeline and keep its outputs as warm state.
+        """
+        result = run_model_retrain(self.latitude, self.longitude, self.store_dir, self.output_dir, self.n_jobs,
+                                   run_context={'trigger': 'daemon'})
+        self.history = result['features'].iloc[-HISTORY_HOURS:].reset_index(drop=True)
+        self.feature_state = load_feature_state(self.artifacts_dir)
+        if self.models is None:
+            self.models = ModelCache(self.artifacts_dir)
+        self.models.refresh(force=True)
+        self._forecast_key = (self.models.get()[0], self.history['date_time'].iloc[-1])
+
+    def hourly_job(self):
+        """
+        Fetch the hours missing from the store, extend the warm features with
+        them and refresh the forecast if there is new data or a new model.
+        """
+        with RunRecorder('hourly', self.artifacts_dir, location=self.location, trigger='daemon') as run:
+            with stage('sync_store') as entry:
+                entry['rows_out'] = sync_store(TRAINING_YEARS, self.latitude, self.longitude, self.store_dir)
+            with stage('score_predictions') as entry:
+                entry['rows_out'] = score_predictions(self.location, self.store_dir)
+            with stage('load_new_rows') as entry:
+                start = self.feature_state.last_time + timedelta(hours=1)
+                new_raw = load_observations(self.location, start=start, root=self.store_dir)
+                entry['rows_out'] = len(new_raw)
+            if not new_raw.empty:
+                with stage('update_features', len(new_raw)) as entry:
+                    try:
+                        new_rows = update_features(new_raw, self.feature_state).dropna()
+                    except ValueError as exc:
+                        # e.g. a weather condition the encoder has never seen
+                        print(f"Incremental features not possible ({exc}); running a full retrain")
+                        run.set(fallback='retrain')
+                        self.retrain_job()
+                        return
+                    self.history = pd.concat([self.history, new_rows], ignore_index=True).iloc[-HISTORY_HOURS:]
+                    entry['rows_out'] = len(new_rows)
+
+            version, models = self.models.get()
+            key = (version, self.history['date_time'].iloc[-1])
+            run.set(model_version=version, refreshed=key != self._forecast_key)
+            if key == self._forecast_key:
+                print("No new observations or models; forecast unchanged")
+                return
+            with stage('forecast_recursive', len(self.history)) as entry:
+                forecast = forecast_recursive(self.history, models['reg_model'], models['clf_model'],
+                                              models['label_encoder'], models['temp_features'],
+                                              models['cond_features'], FORECAST_HOURS)
+                forecast.to_csv(os.path.join(self.output_dir, 'weather_forecast.csv'), index=False)
+                record_predictions(forecast, self.location, self.store_dir)
+                log_forecast(forecast, version, self.location, self.store_dir)
+                entry['rows_out'] = len(forecast)
+            self._forecast_key = key
+
+    def _run_job(self, name, job):
+        with job_lock(self.output_dir) as acquired:
+            if not acquired:
+                print(f"[{name}] skipped: another process is running a job in {self.output_dir}")
+                return
+            started = time.perf_counter()
+            try:
+                job()
+                status = 'done'
+            except Exception as exc:
+                # Keep the daemon alive; the next slot retries
+                status = f"FAILED ({type(exc).__name__}: {exc})"
+            print(f"[{name}] {status} in {time.perf_counter() - started:.2f}s")
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def run(self):
+        """
+        Bootstrap the warm state, then run due jobs until stopped.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"Forecast daemon started for {self.location}")
+        while self.history is None and not self._stop.is_set():
+            self._run_job('retrain', self.retrain_job)
+            if self.history is None:
+                self._stop.wait(60)
+        while not self._stop.is_set():
+            self.scheduler.run_pending()
+            idle = self.scheduler.idle_seconds
+            self._stop.wait(max(1.0, min(idle if idle is not None else 60.0, 60.0)))
+        print("Forecast daemon stopped")
+
+
+def latency_report(log_path):
+    """
+    Summarize job latency per run type and trigger from a run metrics log,
+    to compare the daemon's jobs with cold cron runs (whose interpreter
+    start-up time is recorded as 'import_seconds').
+
+    Returns:
+        list: One dict per (run_type, trigger) with run counts and median/p95 seconds.
+    """
+    groups = {}
+    with open(log_path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('status') != 'ok':
+                continue
+            key = (record['run_type'], record.get('trigger', 'manual'))
+            groups.setdefault(key, []).append(record['seconds'] + record.get('import_seconds', 0.0))
+    report = []
+    for (run_type, trigger), seconds in sorted(groups.items()):
+        seconds.sort()
+        report.append({
+            'run_type': run_type,
+            'trigger': trigger,
+            'runs': len(seconds),
+            'median_seconds': round(statistics.median(seconds), 3),
+            'p95_seconds': round(seconds[min(len(seconds) - 1, int(0.95 * len(seconds)))], 3),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident scheduler for hourly forecasts and daily retraining.")
+    parser.add_argument('--latitude', type=float, default=DEFAULT_LATITUDE)
+    parser.add_argument('--longitude', type=float, default=DEFAULT_LONGITUDE)
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--retrain-at', default=RETRAIN_AT, help="Daily retrain time, HH:MM (default: 00:00).")
+    parser.add_argument('--report', action='store_true', help="Print per-job latency from the run metrics and exit.")
+    args = parser.parse_args()
+
+    if args.report:
+        for row in latency_report(os.path.join(args.output_dir, ARTIFACTS_DIR, RUN_LOG_FILE)):
+            print(f"{row['run_type']:8} {row['trigger']:8} runs={row['runs']:<5} "
+                  f"median={row['median_seconds']:.2f}s p95={row['p95_seconds']:.2f}s")
+        return
+    ForecastDaemon(args.latitude, args.longitude, args.store_dir, args.output_dir, args.n_jobs,
+                   args.retrain_at).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import re
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from model.data_preprocessor import CODE_MAP
+from model.feature_engineering import encode_datetime_features
+from model.model_retrain_automation import condition_codes
+
+BASE_COLUMNS = ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'pressure', 'precipitation',
+                'cloud_coverage', 'weathercode', 'weather_condition_encoded']
+TIME_COLUMNS = ['hour', 'dayofweek', 'hour_sin', 'hour_cos', 'dayofweek_sin', 'dayofweek_cos']
+DEFAULT_HORIZON_BUCKETS = [(1, 6), (7, 24), (25, 72), (73, 168)]
+
+_LAG_PATTERN = re.compile(r'^(.+)_lag(\d+)$')
+_ROLLING_PATTERN = re.compile(r'^(.+)_rolling_mean_(\d+)$')
+_CONDITION_CODES = {condition: code for code, condition in CODE_MAP.items()}
+
+
+def _time_features(timestamps):
+    return encode_datetime_features(pd.DataFrame({'date_time': timestamps}))[TIME_COLUMNS].to_numpy(np.float32)
+
+
+def _feature_plan(features):
+    """
+    Describe where each model feature comes from in the recursive buffer:
+    a base value or lag (buffer row offset + column), a rolling mean over the
+    buffer, or a calendar feature of the step timestamp. Features with no
+    known source keep the input vector's fill value.
+    """
+    gather_pos, gather_offset, gather_col = [], [], []
+    rolling, calendar = [], []
+    for pos, name in enumerate(features):
+        lag = _LAG_PATTERN.match(name)
+        roll = _ROLLING_PATTERN.match(name)
+        source = 'weather_condition_encoded' if name == 'weather_condition' else name
+        if lag and lag.group(1) in BASE_COLUMNS:
+            gather_pos.append(pos)
+            gather_offset.append(int(lag.group(2)))
+            gather_col.append(BASE_COLUMNS.index(lag.group(1)))
+        elif roll and roll.group(1) in BASE_COLUMNS:
+            rolling.append((pos, BASE_COLUMNS.index(roll.group(1)), int(roll.group(2))))
+        elif source in BASE_COLUMNS:
+            gather_pos.append(pos)
+            gather_offset.append(0)
+            gather_col.append(BASE_COLUMNS.index(source))
+        elif name in TIME_COLUMNS:
+            calendar.append((pos, TIME_COLUMNS.index(name)))
+    return {
+        'gather': (np.array(gather_pos, dtype=int), np.array(gather_offset, dtype=int),
+                   np.array(gather_col, dtype=int)),
+        'rolling': rolling,
+        'calendar': (np.array([p for p, _ in calendar], dtype=int), np.array([c for _, c in calendar], dtype=int)),
+        'depth': max(gather_offset + [w - 1 for _, _, w in rolling] + [0]),
+    }
+
+
+def _fill_row(x, plan, buf, pos, calendar_row):
+    gather_pos, gather_offset, gather_col = plan['gather']
+    x[gather_pos] = buf[pos - gather_offset, gather_col]
+    for vec_pos, col, window in plan['rolling']:
+        x[vec_pos] = buf[pos - window + 1:pos + 1, col].mean()
+    calendar_pos, calendar_col = plan['calendar']
+    x[calendar_pos] = calendar_row[calendar_col]
+
+
+def _predict_classes(clf_model, X):
+    proba = clf_model.get_booster().inplace_predict(X)
+    if proba.ndim == 1:
+        return (proba > 0.5).astype(int)
+    return proba.argmax(axis=1)
+
+
+def forecast_recursive(df, reg_model, clf_model, le, temp_features, cond_features, horizon=24):
+    """
+    Forecast `horizon` hours by feeding each prediction back as input.
+    Follows the `predict_next_step` convention: the features of the row at
+    time t produce the forecast for t + 1 hour. Lags and rolling means are
+    read from one preallocated buffer that is extended in place; exogenous
+    sensors are held at their last observed value.
+
+    Args:
+        df (pd.DataFrame): Feature frame (as used for training) ending at the
+            last observed hour.
+        reg_model (XGBRegressor): Trained temperature model.
+        clf_model (XGBClassifier): Trained weather condition model.
+        le (LabelEncoder): For decoding weather condition.
+        temp_features (list): Feature list of the temperature model.
+        cond_features (list): Feature list of the condition model.
+        horizon (int): Number of hours to forecast (e.g. 24 or 168).
+
+    Returns:
+        pd.DataFrame: One row per step with 'date_time', 'horizon',
+            'temperature' and 'weather_condition'.
+    """
+    temp_plan = _feature_plan(temp_features)
+    cond_plan = _feature_plan(cond_features)
+    depth = max(temp_plan['depth'], cond_plan['depth'])
+
+    history = df[BASE_COLUMNS].iloc[-(depth + 1):].to_numpy(np.float32, na_value=np.nan)
+    buf = np.empty((len(history) + horizon, len(BASE_COLUMNS)), dtype=np.float32)
+    buf[:len(history)] = history
+    start = len(history) - 1
+
+    last_time = pd.Timestamp(df['date_time'].iloc[-1])
+    step_times = pd.date_range(last_time, periods=horizon + 1, freq='h')
+    calendar = _time_features(step_times)
+
+    x_temp = np.zeros((1, len(temp_features)), dtype=np.float32)
+    x_cond = np.full((1, len(cond_features)), np.nan, dtype=np.float32)
+    reg_booster = reg_model.get_booster()
+    temp_col = BASE_COLUMNS.index('temperature')
+    code_col = BASE_COLUMNS.index('weathercode')
+    label_col = BASE_COLUMNS.index('weather_condition_encoded')
+    labels = le.classes_
+    temperatures = np.empty(horizon, dtype=np.float32)
+    encoded = np.empty(horizon, dtype=int)
+
+    for step in range(horizon):
+        pos = start + step
+        _fill_row(x_temp[0], temp_plan, buf, pos, calendar[step])
+        _fill_row(x_cond[0], cond_plan, buf, pos, calendar[step])
+        temperatures[step] = reg_booster.inplace_predict(x_temp)[0]
+        encoded[step] = _predict_classes(clf_model, x_cond)[0]
+
+        buf[pos + 1] = buf[pos]
+        buf[pos + 1, temp_col] = temperatures[step]
+        buf[pos + 1, label_col] = encoded[step]
+        buf[pos + 1, code_col] = _CONDITION_CODES.get(labels[encoded[step]], np.nan)
+
+    return pd.DataFrame({
+        'date_time': step_times[1:],
+        'horizon': np.arange(1, horizon + 1),
+        'temperature': temperatures.astype(float).round(4),
+        'weather_condition': le.inverse_transform(encoded),
+    })
+
+
+def _sampled_horizons(low, high, samples):
+    return np.unique(np.linspace(low, high, num=min(samples, high - low + 1)).round().astype(int))
+
+
+def _direct_matrix(X_base, horizons, base_times):
+    """
+    Repeat the base feature rows once per horizon and append the horizon and
+    the calendar encoding of the target hour.
+    """
+    n_rows = len(X_base)
+    X = np.repeat(X_base[None, :, :], len(horizons), axis=0).reshape(len(horizons) * n_rows, -1)
+    steps = np.repeat(horizons, n_rows)
+    target_times = pd.DatetimeIndex(np.tile(base_times, len(horizons))) + pd.to_timedelta(steps, unit='h')
+    hour, dayofweek = target_times.hour.to_numpy(), target_times.dayofweek.to_numpy()
+    extra = np.column_stack([
+        steps,
+        np.sin(2 * np.pi * hour / 24), np.cos(2 * np.pi * hour / 24),
+        np.sin(2 * np.pi * dayofweek / 7), np.cos(2 * np.pi * dayofweek / 7),
+    ]).astype(np.float32)
+    return np.hstack([X, extra])
+
+
+def _numeric_matrix(df, features, le):
+    X = df.reindex(columns=features)
+    if 'weather_condition' in X.columns:
+        X['weather_condition'] = condition_codes(X['weather_condition'], le)
+    return X.to_numpy(dtype=np.float32, na_value=np.nan)
+
+
+def train_direct_models(df_lagged, le, temp_features, cond_features, buckets=DEFAULT_HORIZON_BUCKETS,
+                        horizons_per_bucket=6, n_estimators=100, n_jobs=None):
+    """
+    Train one temperature and one condition model per horizon bucket. Each
+    model sees the current feature row plus the horizon and the target hour's
+    calendar encoding, on a sample of horizons from its bucket.
+
+    Args:
+        df_lagged (pd.DataFrame): Hourly, gap-free training frame with lag features.
+        le (LabelEncoder): Encoder used for 'weather_condition_encoded'.
+        temp_features (list): Feature list of the temperature model.
+        cond_features (list): Feature list of the condition model.
+        buckets (list): (first, last) horizon in hours for each bucket.
+        horizons_per_bucket (int): Horizons sampled per bucket for training.
+        n_estimators (int): Trees per model.
+        n_jobs (int, optional): Number of threads XGBoost may use.
+
+    Returns:
+        dict: Direct forecaster with the buckets, models and feature lists.
+    """
+    times = df_lagged['date_time'].to_numpy()
+    X_temp = _numeric_matrix(df_lagged, temp_features, le)
+    X_cond = _numeric_matrix(df_lagged, cond_features, le)
+    temperature = df_lagged['temperature'].to_numpy(np.float32)
+    condition = df_lagged['weather_condition_encoded'].to_numpy()
+
+    reg_models, clf_models, clf_classes = [], [], []
+    for low, high in buckets:
+        horizons = _sampled_horizons(low, high, horizons_per_bucket)
+        usable = len(df_lagged) - horizons.max()
+        target_rows = (np.arange(usable)[None, :] + horizons[:, None]).ravel()
+
+        reg = xgb.XGBRegressor(n_estimators=n_estimators, tree_method='hist', random_state=42, n_jobs=n_jobs)
+        reg.fit(_direct_matrix(X_temp[:usable], horizons, times[:usable]), temperature[target_rows])
+
+        classes, y = np.unique(condition[target_rows], return_inverse=True)
+        clf = xgb.XGBClassifier(n_estimators=n_estimators, tree_method='hist', random_state=42, n_jobs=n_jobs)
+        clf.fit(_direct_matrix(X_cond[:usable], horizons, times[:usable]), y)
+
+        reg_models.append(reg)
+        clf_models.append(clf)
+        clf_classes.append(classes)
+        print(f"Trained direct models for horizons {low}-{high}h on {len(target_rows)} rows")
+
+    return {
+        'buckets': list(buckets),
+        'reg_models': reg_models,
+        'clf_models': clf_models,
+        'clf_classes': clf_classes,
+        'temp_features': list(temp_features),
+        'cond_features': list(cond_features),
+    }
+
+
+def forecast_direct(df, direct, le, horizon=24):
+    """
+    Forecast `horizon` hours with the per-bucket direct models. All horizons
+    of a bucket are scored in one batched call per model.
+
+    Args:
+        df (pd.DataFrame): Feature frame with lag features, ending at the last observed hour.
+        direct (dict): Forecaster returned by `train_direct_models`.
+        le (LabelEncoder): For decoding weather condition.
+        horizon (int): Number of hours to forecast, at most the last bucket's end.
+
+    Returns:
+        pd.DataFrame: One row per step with 'date_time', 'horizon',
+            'temperature' and 'weather_condition'.
+    """
+    last = df.iloc[-1:]
+    last_time = np.array([pd.Timestamp(last['date_time'].iloc[0]).to_datetime64()])
+    x_temp = _numeric_matrix(last, direct['temp_features'], le)
+    x_cond = _numeric_matrix(last, direct['cond_features'], le)
+
+    temperatures = np.empty(horizon, dtype=np.float32)
+    encoded = np.empty(horizon, dtype=int)
+    for (low, high), reg, clf, classes in zip(direct['buckets'], direct['reg_models'],
+                                              direct['clf_models'], direct['clf_classes']):
+        if low > horizon:
+            break
+        horizons = np.arange(low, min(high, horizon) + 1)
+        temperatures[horizons - 1] = reg.get_booster().inplace_predict(_direct_matrix(x_temp, horizons, last_time))
+        encoded[horizons - 1] = classes[_predict_classes(clf, _direct_matrix(x_cond, horizons, last_time))]
+
+    steps = np.arange(1, horizon + 1)
+    return pd.DataFrame({
+        'date_time': [pd.Timestamp(last_time[0]) + timedelta(hours=int(h)) for h in steps],
+        'horizon': steps,
+        'temperature': temperatures.astype(float).round(4),
+        'weather_condition': le.inverse_transform(encoded),
+    })
@@ -0,0 +1,245 @@
+import os
+import pickle
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from model.data_preprocessor import (CODE_MAP, COLUMN_RENAMES, EWM_SPAN, SMOOTH_COLUMNS, WEATHER_CONDITION_DTYPE,
+                                     enforce_schema, historical_data, handle_missing_values, outlier_medians)
+from model.feature_engineering import ROLLING_COLUMNS, ROLLING_WINDOW, encode_datetime_features
+from model.lag_features import DEFAULT_LAGS, LAG_COLUMNS, lag_frame, normalize_lags
+
+FEATURE_STATE_FILE = 'feature_state.pkl'
+
+_EWM_ALPHA = 2.0 / (EWM_SPAN + 1)
+
+
+@dataclass
+class FeatureState:
+    """
+    Minimal carry-over state needed to extend the feature frame with new
+    hours without touching the history.
+
+    Attributes:
+        lags (list): Lag offsets used for the lag block.
+        ewm (dict): Per smoothed column, the (weighted, old_wt) accumulators of
+            pandas' adjust=False EWM recurrence after the last row.
+        cloud_counts (dict): Value counts of observed cloud_coverage, for the
+            mode used to fill gaps.
+        outlier_medians (dict): Outlier replacement values, frozen at the
+            medians of the fitted history.
+        rolling_tail (pd.DataFrame): Last `ROLLING_WINDOW - 1` rows of the
+            rolling columns.
+        lag_tail (pd.DataFrame): Last `max(lags)` rows of the lagged columns.
+        label_encoder (LabelEncoder): Encoder fitted on weather_condition.
+        last_time (pd.Timestamp): Timestamp of the last processed row.
+    """
+    lags: list
+    ewm: dict
+    cloud_counts: dict
+    outlier_medians: dict
+    rolling_tail: pd.DataFrame
+    lag_tail: pd.DataFrame
+    label_encoder: LabelEncoder
+    last_time: pd.Timestamp = None
+
+
+def _rename_raw(raw_df):
+    df = enforce_schema(raw_df.rename(columns=COLUMN_RENAMES))
+    df['date_time'] = pd.to_datetime(df['date_time'])
+    return df
+
+
+def _cloud_mode(counts):
+    # pandas' Series.mode() returns the sorted modes; [0] is the smallest tie.
+    top = max(counts.values())
+    return min(value for value, count in counts.items() if count == top)
+
+
+def _ewm_accumulators(raw_values, smoothed_values):
+    """
+    Recover the EWM recurrence state from a full pandas pass: the last output
+    and the weight decayed over trailing missing values.
+    """
+    weighted = smoothed_values[-1] if len(smoothed_values) else np.nan
+    if np.isnan(weighted):
+        return np.nan, 1.0
+    observed = np.flatnonzero(~np.isnan(raw_values))
+    trailing_missing = len(raw_values) - 1 - observed[-1]
+    return weighted, (1.0 - _EWM_ALPHA) ** trailing_missing
+
+
+def ewm_continue(values, weighted, old_wt):
+    """
+    Continue pandas' ewm(adjust=False, ignore_na=False).mean() recurrence over
+    new values, starting from carried accumulators.
+
+    Args:
+        values (np.ndarray): New raw values, NaN for gaps.
+        weighted (float): Last smoothed value, NaN before the first observation.
+        old_wt (float): Weight of `weighted` in the recurrence.
+
+    Returns:
+        tuple: Smoothed values, and the (weighted, old_wt) accumulators to
+        carry to the next call.
+    """
+    out = np.empty(len(values))
+    for i, cur in enumerate(values):
+        is_observation = cur == cur
+        if weighted == weighted:
+            old_wt *= 1.0 - _EWM_ALPHA
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + _EWM_ALPHA * cur) / (old_wt + _EWM_ALPHA)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        out[i] = weighted
+    return out, weighted, old_wt
+
+
+def _replace_outliers(df, medians):
+    for column, (max_val, min_val) in historical_data.items():
+        if column in df.columns:
+            outlier_mask = (df[column] < min_val) | (df[column] > max_val)
+            df.loc[outlier_mask, column] = medians[column]
+    return enforce_schema(df)
+
+
+def fit_feature_state(raw_df, features_df, label_encoder, lags=DEFAULT_LAGS):
+    """
+    Capture the carry-over state after a full feature recompute.
+
+    Args:
+        raw_df (pd.DataFrame): Raw hourly data the features were built from.
+        features_df (pd.DataFrame): Output of `feature_engineering_pipeline`
+            on `preprocess_data(raw_df)`.
+        label_encoder (LabelEncoder): Encoder returned by the pipeline.
+        lags (int or iterable): Lag specification used for training.
+
+    Returns:
+        FeatureState: State to pass to `update_features`.
+    """
+    lags = normalize_lags(lags)
+    renamed = _rename_raw(raw_df)
+    smoothed = handle_missing_values(renamed.copy())
+
+    ewm = {
+        col: _ewm_accumulators(renamed[col].to_numpy(dtype=float), smoothed[col].to_numpy(dtype=float))
+        for col in SMOOTH_COLUMNS
+    }
+    cloud_counts = renamed['cloud_coverage'].dropna().value_counts().to_dict()
+    medians = outlier_medians(smoothed)
+    smoothed = _replace_outliers(smoothed, medians)
+
+    return FeatureState(
+        lags=lags,
+        ewm=ewm,
+        cloud_counts=cloud_counts,
+        outlier_medians=medians,
+        rolling_tail=smoothed[ROLLING_COLUMNS].iloc[-(ROLLING_WINDOW - 1):].reset_index(drop=True),
+        lag_tail=smoothed[LAG_COLUMNS].iloc[-lags[-1]:].reset_index(drop=True),
+        label_encoder=label_encoder,
+        last_time=features_df['date_time'].iloc[-1],
+    )
+
+
+def update_features(new_raw_df, state):
+    """
+    Build feature rows for newly arrived raw hours only.
+    The rows match what `preprocess_data`, `feature_engineering_pipeline`
+    and `create_lagged_features` would produce for them on the full history
+    (rolling means up to floating-point rounding) when the outliers there are
+    replaced with the same frozen medians, i.e.
+    `preprocess_data(raw, medians=state.outlier_medians)`. The medians stay
+    fixed until the next full recompute refits the state.
+
+    Args:
+        new_raw_df (pd.DataFrame): Raw hourly rows strictly after `state.last_time`.
+        state (FeatureState): State from `fit_feature_state` or a previous update;
+            it is advanced in place.
+
+    Returns:
+        pd.DataFrame: Feature rows for the new hours, including lag columns.
+
+    Raises:
+        ValueError: If the rows overlap the processed history, or contain a
+            weather condition the encoder has not seen (a full recompute is
+            needed to refit the encoder).
+    """
+    df = _rename_raw(new_raw_df).reset_index(drop=True)
+    if df.empty:
+        return df
+    if state.last_time is not None and df['date_time'].iloc[0] <= state.last_time:
+        raise ValueError(f"New rows must start after {state.last_time}")
+
+    df['weather_condition'] = df['weathercode'].map(CODE_MAP).fillna("Unknown").astype(WEATHER_CONDITION_DTYPE)
+    unseen = set(df['weather_condition']) - set(state.label_encoder.classes_)
+    if unseen:
+        raise ValueError(f"Unseen weather conditions {sorted(unseen)}; run a full feature recompute")
+
+    for value, count in df['cloud_coverage'].dropna().value_counts().items():
+        state.cloud_counts[value] = state.cloud_counts.get(value, 0) + count
+    if state.cloud_counts:
+        df['cloud_coverage'] = df['cloud_coverage'].fillna(_cloud_mode(state.cloud_counts))
+    df['precipitation'] = df['precipitation'].fillna(0)
+
+    for col in SMOOTH_COLUMNS:
+        weighted, old_wt = state.ewm[col]
+        df[col], weighted, old_wt = ewm_continue(df[col].to_numpy(dtype=float), weighted, old_wt)
+        state.ewm[col] = (weighted, old_wt)
+
+    df = _replace_outliers(df, state.outlier_medians)
+    rolling = pd.concat([state.rolling_tail, df[ROLLING_COLUMNS]], ignore_index=True)
+    history = pd.concat([state.lag_tail, df[LAG_COLUMNS]], ignore_index=True)
+    state.rolling_tail = rolling.iloc[-(ROLLING_WINDOW - 1):].reset_index(drop=True)
+    state.lag_tail = history.iloc[-state.lags[-1]:].reset_index(drop=True)
+
+    df['weather_condition_encoded'] = state.label_encoder.transform(df['weather_condition']).astype(np.int8)
+    df = encode_datetime_features(df)
+
+    rolled = rolling.rolling(window=ROLLING_WINDOW).mean().iloc[-len(df):]
+    for col in ROLLING_COLUMNS:
+        df[f'{col}_rolling_mean_{ROLLING_WINDOW}'] = rolled[col].to_numpy(dtype=np.float32)
+
+    lagged = lag_frame(history, state.lags, LAG_COLUMNS).iloc[-len(df):]
+    df = pd.concat([df, lagged.set_index(df.index)], axis=1)
+
+    state.last_time = df['date_time'].iloc[-1]
+    return df
+
+
+def save_feature_state(state, artifacts_dir):
+    """
+    Pickle the feature state next to the model artifacts.
+
+    Args:
+        state (FeatureState): State to save.
+        artifacts_dir (str): Artifacts directory.
+    """
+    os.makedirs(artifacts_dir, exist_ok=True)
+    path = os.path.join(artifacts_dir, FEATURE_STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(tmp_path, path)
+    print(f"Feature state saved to {path}")
+
+
+def load_feature_state(artifacts_dir):
+    """
+    Load the feature state saved by `save_feature_state`.
+
+    Args:
+        artifacts_dir (str): Artifacts directory.
+
+    Returns:
+        FeatureState: The saved state, or None if there is none.
+    """
+    path = os.path.join(artifacts_dir, FEATURE_STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
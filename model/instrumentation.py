@@ -0,0 +1,192 @@
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime
+
+RUN_LOG_FILE = 'run_metrics.jsonl'
+PROFILES_DIR = 'profiles'
+PROFILE_ENV = 'WEATHER_PROFILE_STAGES'
+PROFILE_TOP_FUNCTIONS = 15
+
+_current_run = contextvars.ContextVar('current_run', default=None)
+
+
+def rss_mb():
+    """
+    Current resident set size in MiB. Falls back to the process peak where
+    /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def frame_memory_mb(df):
+    """
+    Memory held by a DataFrame in MiB, including the contents of object columns.
+    """
+    return round(df.memory_usage(deep=True).sum() / 2 ** 20, 2)
+
+
+def _profile_stages(profile):
+    if profile is None:
+        profile = os.environ.get(PROFILE_ENV, '')
+    if isinstance(profile, str):
+        profile = [name.strip() for name in profile.split(',') if name.strip()]
+    return set(profile)
+
+
+class RunRecorder:
+    """
+    Collects metrics for one pipeline run and appends them as a single JSON
+    line when the run ends. While the recorder is active (inside its `with`
+    block) the module-level `stage` and `record_api_calls` helpers report to
+    it, so instrumented code does not need a reference to it.
+
+    Stages named in `profile` (or in the WEATHER_PROFILE_STAGES environment
+    variable, comma-separated, 'all' for every stage) run under cProfile; the
+    .prof file is written next to the log and the top functions are included
+    in the record.
+    """
+
+    def __init__(self, run_type, log_dir, profile=None, **context):
+        self.log_dir = log_dir
+        self.profile = _profile_stages(profile)
+        self.record = {
+            'run_id': uuid.uuid4().hex[:12],
+            'run_type': run_type,
+            'started_at': datetime.utcnow().isoformat(),
+            **context,
+            'stages': [],
+            'api': {'requests': 0, 'cache_hits': 0, 'attempts': 0, 'bytes': 0, 'seconds_total': 0.0,
+                    'seconds_max': 0.0},
+        }
+        self._stack = []
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_run.set(self)
+        self._started = time.perf_counter()
+        self._rss_start = rss_mb()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_run.reset(self._token)
+        self.record.update(
+            status='ok' if exc is None else 'error',
+            error=None if exc is None else f"{exc_type.__name__}: {exc}",
+            seconds=round(time.perf_counter() - self._started, 4),
+            rss_delta_mb=round(rss_mb() - self._rss_start, 1),
+        )
+        self.write()
+        return False
+
+    def write(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(os.path.join(self.log_dir, RUN_LOG_FILE), 'a') as f:
+            f.write(json.dumps(self.record, default=str) + '\n')
+
+    def set(self, **values):
+        """
+        Attach run-level values (e.g. the retrain path) to the record.
+        """
+        self.record.update(values)
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Time a block and record its duration and memory delta. The yielded
+        dict can be given 'rows_out' and any other values to record.
+        Nested stages are named 'outer.inner'.
+        """
+        full_name = '.'.join(self._stack + [name])
+        entry = {'stage': full_name, 'rows_in': rows_in, 'rows_out': None}
+        profiler = cProfile.Profile() if {'all', name, full_name} & self.profile else None
+        self._stack.append(name)
+        rss_start = rss_mb()
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield entry
+        finally:
+            if profiler:
+                profiler.disable()
+            entry['seconds'] = round(time.perf_counter() - started, 4)
+            entry['rss_delta_mb'] = round(rss_mb() - rss_start, 1)
+            self._stack.pop()
+            if profiler:
+                entry['profile'] = self._save_profile(profiler, full_name)
+            self.record['stages'].append(entry)
+
+    def _save_profile(self, profiler, stage_name):
+        path = os.path.join(self.log_dir, PROFILES_DIR, f"{self.record['run_id']}-{stage_name}.prof")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        return {'file': path, 'top_cumulative': summary.getvalue().strip().splitlines()[-PROFILE_TOP_FUNCTIONS:]}
+
+    def add_api_calls(self, calls):
+        api = self.record['api']
+        for call in calls:
+            if call.get('cached'):
+                api['cache_hits'] += 1
+                continue
+            api['requests'] += 1
+            api['attempts'] += call.get('attempts', 1)
+            api['bytes'] += call.get('bytes', 0)
+            api['seconds_total'] = round(api['seconds_total'] + call['seconds'], 4)
+            api['seconds_max'] = round(max(api['seconds_max'], call['seconds']), 4)
+
+
+def current_run():
+    """
+    Return the active `RunRecorder`, or None outside an instrumented run.
+    """
+    return _current_run.get()
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    """
+    Record a stage on the active run; a no-op (yielding a throwaway dict)
+    when nothing is being recorded.
+    """
+    run = current_run()
+    if run is None:
+        yield {}
+        return
+    with run.stage(name, rows_in) as entry:
+        yield entry
+
+
+def annotate_run(**values):
+    """
+    Attach values to the active run's record; ignored outside an instrumented run.
+    """
+    run = current_run()
+    if run is not None:
+        run.set(**values)
+
+
+def record_api_calls(calls):
+    """
+    Add per-request API statistics ('seconds', 'bytes', 'attempts'; 'cached'
+    for windows answered from the response cache) to the active run.
+    """
+    run = current_run()
+    if run is not None:
+        run.add_api_calls(calls)
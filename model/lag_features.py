@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+LAG_COLUMNS = ['temperature', 'weathercode']
+DEFAULT_LAGS = 24
+
+
+def normalize_lags(lags):
+    """
+    Turn a lag specification into a sorted list of unique positive offsets.
+
+    Args:
+        lags (int or iterable): Either N for lags 1..N, or explicit offsets
+            such as [1, 2, 3, 4, 5, 6, 12, 24, 48, 168].
+
+    Returns:
+        list: Sorted lag offsets.
+
+    Raises:
+        ValueError: If no lags are given or any offset is not positive.
+    """
+    if isinstance(lags, (int, np.integer)):
+        lags = range(1, int(lags) + 1)
+    lags = sorted({int(lag) for lag in lags})
+    if not lags or lags[0] < 1:
+        raise ValueError(f"Lag offsets must be positive integers, got {lags}")
+    return lags
+
+
+def lag_column_names(columns, lags):
+    """
+    Names of the lag columns in the order produced by `build_lag_matrix`
+    (all columns for the first lag, then all columns for the next lag, ...).
+
+    Args:
+        columns (list): Source column names.
+        lags (int or iterable): Lag specification, see `normalize_lags`.
+
+    Returns:
+        list: Column names such as 'temperature_lag1'.
+    """
+    return [f'{col}_lag{lag}' for lag in normalize_lags(lags) for col in columns]
+
+
+def build_lag_matrix(values, lags):
+    """
+    Build the full lag block for a set of series in one vectorized gather.
+    The series are copied once into a NaN-padded float32 buffer; a strided
+    sliding-window view over that buffer exposes every shifted series without
+    copying, and a single fancy-index pulls out the requested offsets.
+
+    Args:
+        values (np.ndarray): Array of shape (rows,) or (rows, columns).
+        lags (int or iterable): Lag specification, see `normalize_lags`.
+
+    Returns:
+        np.ndarray: float32 array of shape (rows, len(lags) * columns) where
+            row t holds values[t - lag] (NaN before the start of the series).
+    """
+    lags = np.asarray(normalize_lags(lags))
+    values = np.asarray(values, dtype=np.float32)
+    if values.ndim == 1:
+        values = values[:, None]
+    rows, cols = values.shape
+    max_lag = int(lags[-1])
+
+    padded = np.empty((rows + max_lag, cols), dtype=np.float32)
+    padded[:max_lag] = np.nan
+    padded[max_lag:] = values
+
+    # windows[t, c, j] == padded[t + j, c] == values[t + j - max_lag, c]
+    windows = sliding_window_view(padded, max_lag + 1, axis=0)
+    block = windows.transpose(0, 2, 1)[:, max_lag - lags, :]
+    return block.reshape(rows, len(lags) * cols)
+
+
+def lag_frame(df, lags=DEFAULT_LAGS, columns=LAG_COLUMNS):
+    """
+    Build the lag block for `columns` of a DataFrame as a float32 DataFrame
+    aligned to the input index.
+
+    Args:
+        df (pd.DataFrame): Frame containing the source columns.
+        lags (int or iterable): Lag specification, see `normalize_lags`.
+        columns (list): Columns to lag.
+
+    Returns:
+        pd.DataFrame: Lag columns named like 'temperature_lag1'.
+    """
+    block = build_lag_matrix(df[columns].to_numpy(dtype=np.float32, na_value=np.nan), lags)
+    return pd.DataFrame(block, index=df.index, columns=lag_column_names(columns, lags), copy=False)
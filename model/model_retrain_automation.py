@@ -4,25 +4,39 @@ from datetime import timedelta
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-import pickle
 
+from model.artifact_bundle import ArtifactBundle
+from model.lag_features import DEFAULT_LAGS, LAG_COLUMNS, lag_frame
 
-def create_lagged_features(df, lags=24):
+
+def create_lagged_features(df, lags=DEFAULT_LAGS, columns=LAG_COLUMNS):
     """
     Create lagged features for time series forecasting.
+    The whole lag block is built in one vectorized operation and attached
+    with a single concat instead of inserting one column per lag.
 
     Args:
         df (pd.DataFrame): Preprocessed weather data.
-        lags (int): Number of lagged timesteps to create (default: 24).
+        lags (int or iterable): Number of lagged timesteps to create, or an
+            explicit sparse set of offsets such as [1, 2, 3, 6, 12, 24, 168]
+            (default: 24).
+        columns (list): Columns to lag (default: temperature and weathercode).
 
     Returns:
-        pd.DataFrame: DataFrame with lagged features added.
+        pd.DataFrame: DataFrame with float32 lagged features added.
     """
-    print(df['weathercode'])
-    for i in range(1, lags + 1):
-        for col in ['temperature', 'weathercode']:
-            df[f'{col}_lag{i}'] = df[col].shift(i)
-    return df
+    return pd.concat([df, lag_frame(df, lags, columns)], axis=1)
+
+
+def feature_columns(df, target_col, remove_cols):
+    """
+    Names of the feature columns for a target: every numeric column when
+    `remove_cols` is set, otherwise every column except 'date_time'.
+    """
+    if remove_cols:
+        numeric_cols = df.select_dtypes(include=['number']).columns
+        return [col for col in numeric_cols if col != target_col]
+    return [col for col in df.columns if col not in ['date_time', target_col]]
 
 
 def prepare_data(df, target_col, remove_cols):
@@ -36,42 +50,73 @@ def prepare_data(df, target_col, remove_cols):
     Returns:
         tuple: (X, y) where X is the feature DataFrame and y is the target Series.
     """
-    if remove_cols:
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        features = [col for col in numeric_cols if col != target_col]
-    else:
-        features = [col for col in df.columns if col not in ['date_time', target_col]]
-
-    X = df[features]
+    X = df[feature_columns(df, target_col, remove_cols)]
     y = df[target_col]
     return X, y
 
 
-def train_regression_model(X, y):
+ARTIFACTS_DIR = 'artifacts'
+MODEL_PARAMS = {'n_estimators': 100, 'tree_method': 'hist', 'random_state': 42}
+
+
+def _thread_budget(n_jobs):
+    return n_jobs or os.cpu_count() or 1
+
+
+def condition_codes(conditions, label_encoder):
+    """
+    Map weather condition labels (object or categorical) to the label
+    encoder's codes, as floats with NaN for labels it has not seen.
+    """
+    codes = {condition: code for code, condition in enumerate(label_encoder.classes_)}
+    if isinstance(conditions.dtype, pd.CategoricalDtype):
+        lookup = np.append(conditions.cat.categories.map(codes).to_numpy(dtype=float, na_value=np.nan), np.nan)
+        return lookup[conditions.cat.codes.to_numpy()]
+    return conditions.map(codes).to_numpy(dtype=float)
+
+
+def encode_object_columns(X, label_encoder):
+    """
+    Turn object and categorical columns into integer codes; weather_condition
+    uses the label encoder's codes so training, continuation and inference agree.
+    """
+    for col in X.columns:
+        if X[col].dtype == 'object' or isinstance(X[col].dtype, pd.CategoricalDtype):
+            if col == 'weather_condition':
+                X[col] = condition_codes(X[col], label_encoder).astype('int8')
+            else:
+                X[col] = X[col].astype('category').cat.codes
+    return X
+
+
+def train_regression_model(X, y, n_jobs=None, **params):
     """
     Train a regression model for temperature forecasting.
 
     Args:
         X (pd.DataFrame): Feature DataFrame.
         y (pd.Series): Target Series (temperature).
+        n_jobs (int, optional): Number of threads XGBoost may use (default: all cores).
+        **params: XGBoost parameters overriding `MODEL_PARAMS`.
 
     Returns:
         XGBRegressor: Trained regression model.
     """
-    model = xgb.XGBRegressor(n_estimators=100, random_state=42)
+    model = xgb.XGBRegressor(**{**MODEL_PARAMS, **params}, n_jobs=_thread_budget(n_jobs))
     model.fit(X, y)
     return model
 
 
-def train_classification_model(X, y, label_encoder):
+def train_classification_model(X, y, label_encoder, n_jobs=None, **params):
     """
     Train a classification model for weather condition prediction.
+    `X` is a DataFrame, or an already encoded matrix; `params` override
+    `MODEL_PARAMS`.
     """
-    for col in X.columns:
-        if X[col].dtype == 'object':
-            X[col] = X[col].astype('category').cat.codes
+    if isinstance(X, pd.DataFrame):
+        X = encode_object_columns(X.copy(), label_encoder)
 
-    model = xgb.XGBClassifier(n_estimators=100, random_state=42)
+    model = xgb.XGBClassifier(**{**MODEL_PARAMS, **params}, n_jobs=_thread_budget(n_jobs))
     model.fit(X, y)
 
     def reverse_encode_predictions(encoded_predictions):
@@ -80,30 +125,44 @@ def train_classification_model(X, y, label_encoder):
     return model, reverse_encode_predictions
 
 
-def save_model(model, filename, features_filename, feature_list):
+def continue_training(model, X, y, extra_trees, label_encoder=None, n_jobs=None, feature_names=None):
     """
-    Save a trained model to a file using pickle.
+    Continue boosting a trained model on new rows, adding at most
+    `extra_trees` trees on top of the existing ensemble.
 
     Args:
-        model: Trained model object.
-        filename (str): Path to save the model file.
+        model (XGBRegressor or XGBClassifier): Previously trained model.
+        X (pd.DataFrame or np.ndarray): Features of the newly arrived rows.
+        y (pd.Series): Targets of the newly arrived rows.
+        extra_trees (int): Number of boosting rounds to add.
+        label_encoder (LabelEncoder, optional): Needed when X has a
+            weather_condition column.
+        n_jobs (int, optional): Number of threads XGBoost may use (default: all cores).
+        feature_names (list, optional): Column names when X is a bare matrix.
+
+    Returns:
+        Same type as `model`: A new model with the extended ensemble.
     """
-    artifacts_dir = 'artifacts'
-    os.makedirs(artifacts_dir, exist_ok=True)
+    if isinstance(X, pd.DataFrame):
+        X = encode_object_columns(X.copy(), label_encoder)
+    params = {'tree_method': 'hist', 'nthread': _thread_budget(n_jobs), 'seed': 42}
+    dtrain = xgb.DMatrix(X, label=y, feature_names=feature_names)
+    booster = xgb.train(params, dtrain, num_boost_round=extra_trees,
+                        xgb_model=model.get_booster())
 
-    model_path = os.path.join(artifacts_dir, filename)
+    updated = type(model)(n_jobs=_thread_budget(n_jobs))
+    updated.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+    return updated
 
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
-    print(f"Model saved to {model_path}")
 
-    feats_path = os.path.join(artifacts_dir, features_filename)
-    with open(feats_path, 'wb') as f:
-        pickle.dump(feature_list, f)
-    print(f"Feature list saved to {feats_path}")
+def model_tree_count(model):
+    """
+    Return the number of boosting rounds in a trained model.
+    """
+    return model.get_booster().num_boosted_rounds()
 
 
-def predict_next_step(df, reg_model, clf_model, le, lags=24):
+def predict_next_step(df, reg_model, clf_model, le, lags=24, artifacts_dir=ARTIFACTS_DIR):
     """
     Predicts next hour's temperature and weather condition, appends to DataFrame.
     Leaves other feature columns as NaN.
@@ -114,6 +173,7 @@ def predict_next_step(df, reg_model, clf_model, le, lags=24):
         clf_model (XGBClassifier): Trained classification model.
         le (LabelEncoder): For decoding weather condition.
         lags (int): Number of lags to use.
+        artifacts_dir (str): Directory whose current artifact version supplies the feature lists.
 
     Returns:
         pd.DataFrame: df with a new row for next hour containing predicted values.
@@ -124,10 +184,9 @@ def predict_next_step(df, reg_model, clf_model, le, lags=24):
     next_dt = last_row['date_time'].iloc[0] + timedelta(hours=1)
 
     # Load feature lists
-    with open("artifacts/temperature_features.pkl", "rb") as f:
-        temp_feature_list = pickle.load(f)
-    with open("artifacts/condition_features.pkl", "rb") as f:
-        cond_feature_list = pickle.load(f)
+    bundle = ArtifactBundle(artifacts_dir)
+    temp_feature_list = bundle.features('temperature')
+    cond_feature_list = bundle.features('condition')
 
     # Ensure all features exist in last_row and convert to numeric
     Xp_temp = last_row.reindex(columns=temp_feature_list)
@@ -135,7 +194,6 @@ def predict_next_step(df, reg_model, clf_model, le, lags=24):
 
     # Drop object dtype columns (or convert them if necessary)
     Xp_temp = Xp_temp.select_dtypes(include=[np.number]).fillna(0)
-    print(cond_feature_list)
     if 'weather_condition' in cond_feature_list:
         if last_row['weather_condition'].dtype == object:
             encoded_value = le.transform([last_row['weather_condition'].iloc[0]])[0]
@@ -0,0 +1,434 @@
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from model.data_fetcher import DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+from model.data_preprocessor import CODE_MAP, WEATHER_CONDITION_DTYPE
+from model.weather_store import DEFAULT_STORE_DIR, _write_partition, load_observations, location_key
+
+PREDICTION_LOG_DIR = 'prediction_log'
+RECORDS_FILE = 'records.bin'
+META_FILE = 'meta.json'
+ACCURACY_FILE = 'accuracy.parquet'
+# Fixed-width records; 'issued_at' never decreases along the file, so it is the sorted time index
+RECORD_DTYPE = np.dtype([
+    ('issued_at', '<i8'),
+    ('time', '<i8'),
+    ('horizon', '<i2'),
+    ('version', '<i2'),
+    ('temperature', '<f4'),
+    ('condition', 'i1'),
+])
+CONDITIONS = list(WEATHER_CONDITION_DTYPE.categories)
+ACCURACY_SUMS = ['predictions', 'error_sum', 'abs_error_sum', 'sq_error_sum', 'condition_misses']
+_HOUR = 3600
+
+
+def _seconds(times):
+    return (pd.to_datetime(pd.Series(times)).to_numpy(dtype='datetime64[s]')).astype(np.int64)
+
+
+class PredictionLog:
+    """
+    Append-only log of every forecast made for a location, kept next to its
+    raw observations. Each forecast step is one fixed-width record: the hour
+    the forecast was issued from, the hour it is for, the horizon, the model
+    version and the predicted temperature and condition.
+
+    Records are appended in issue order (older forecasts are merged in by
+    `insert`), so the memory-mapped 'issued_at' column is a sorted index: a range read is two binary searches plus a
+    read of the matching records. Since every forecast is for 1 to
+    `max_horizon` hours after its issue time, reads by target hour use the
+    same index.
+
+    Observations are joined as they arrive: `score` matches the predictions
+    for newly observed hours and adds their errors to per (model version,
+    day, horizon) sums. Rolling accuracy is computed from these sums, not by
+    rescanning the log.
+    """
+
+    def __init__(self, location, root=DEFAULT_STORE_DIR):
+        self.location = location
+        self.root = root
+        self.path = os.path.join(root, location, PREDICTION_LOG_DIR)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _meta(self):
+        try:
+            with open(self._file(META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'versions': [], 'max_horizon': 0, 'scored_through': None}
+
+    def _save_meta(self, meta):
+        with open(f"{self._file(META_FILE)}.tmp", 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{self._file(META_FILE)}.tmp", self._file(META_FILE))
+
+    @contextlib.contextmanager
+    def _locked(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file('.lock'), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def records(self):
+        """
+        Memory-map the complete records (a torn trailing record is ignored).
+
+        Returns:
+            np.ndarray: Structured array of `RECORD_DTYPE`, read-only.
+        """
+        try:
+            count = os.path.getsize(self._file(RECORDS_FILE)) // RECORD_DTYPE.itemsize
+        except FileNotFoundError:
+            count = 0
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self._file(RECORDS_FILE), dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+    def _to_records(self, forecast, meta, model_version):
+        """
+        Records of a forecast frame, registering the model version in `meta`.
+        """
+        times = _seconds(forecast['date_time'])
+        horizons = forecast['horizon'].to_numpy(dtype=np.int64)
+        if model_version not in meta['versions']:
+            meta['versions'].append(model_version)
+        meta['max_horizon'] = max(meta['max_horizon'], int(horizons.max()))
+        records = np.empty(len(forecast), dtype=RECORD_DTYPE)
+        records['issued_at'] = times - horizons * _HOUR
+        records['time'] = times
+        records['horizon'] = horizons
+        records['version'] = meta['versions'].index(model_version)
+        records['temperature'] = forecast['temperature'].to_numpy(dtype=np.float32)
+        records['condition'] = pd.Categorical(forecast['weather_condition'].astype(str),
+                                              categories=CONDITIONS).codes
+        return records
+
+    def append(self, forecast, model_version):
+        """
+        Log one forecast. A forecast issued from the same hour by the same
+        model version as the last logged one (e.g. a rerun with no new data)
+        is not logged again.
+
+        Args:
+            forecast (pd.DataFrame): Output of `forecast_recursive` ('date_time',
+                'horizon', 'temperature', 'weather_condition'), all issued from
+                the same hour.
+            model_version (str): Artifact version that made the forecast.
+
+        Returns:
+            int: Number of records written (0 for a repeated forecast).
+
+        Raises:
+            ValueError: If the forecast mixes issue times or was issued before
+                the last logged forecast.
+        """
+        if forecast.empty:
+            return 0
+        times = _seconds(forecast['date_time'])
+        horizons = forecast['horizon'].to_numpy(dtype=np.int64)
+        issued = np.unique(times - horizons * _HOUR)
+        if len(issued) != 1:
+            raise ValueError("A forecast must be issued from a single hour")
+
+        with self._locked():
+            meta = self._meta()
+            existing = self.records()
+            if len(existing) and issued[0] < existing['issued_at'][-1]:
+                raise ValueError(f"Forecast issued at {pd.Timestamp(issued[0], unit='s')} is older than the "
+                                 f"last logged forecast")
+            if (len(existing) and issued[0] == existing['issued_at'][-1]
+                    and meta['versions'][existing['version'][-1]] == model_version):
+                return 0
+            records = self._to_records(forecast, meta, model_version)
+            # The meta file goes first: a crash in between leaves an unused version, never an unknown one
+            self._save_meta(meta)
+            with open(self._file(RECORDS_FILE), 'ab') as f:
+                # Drop a record torn by an earlier crash before appending
+                f.truncate(len(existing) * RECORD_DTYPE.itemsize)
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        return len(records)
+
+    def insert(self, forecasts, model_version):
+        """
+        Log forecasts issued before the last logged one, e.g. the horizon-1
+        predictions of a backfill. Unlike `append`, the records are merged
+        into issue order, which rewrites the records file, so this is meant
+        for occasional bulk loads. Blocks of an (issue hour, model version)
+        already in the log are skipped, so a repeated backfill adds nothing.
+        Predictions for hours that were already scored are added to the
+        accuracy sums right away; later hours are scored by `score`.
+
+        Args:
+            forecasts (pd.DataFrame): 'date_time', 'horizon', 'temperature'
+                and 'weather_condition', from any number of issue hours.
+            model_version (str): Artifact version that made the forecasts.
+
+        Returns:
+            int: Number of records written.
+        """
+        if forecasts.empty:
+            return 0
+        with self._locked():
+            meta = self._meta()
+            existing = np.array(self.records())
+            records = self._to_records(forecasts, meta, model_version)
+            logged = pd.MultiIndex.from_arrays([existing['issued_at'], existing['version']])
+            records = records[~pd.MultiIndex.from_arrays([records['issued_at'], records['version']]).isin(logged)]
+            if not len(records):
+                return 0
+            self._save_meta(meta)
+
+            merged = np.concatenate([existing, records])
+            merged = merged[np.argsort(merged['issued_at'], kind='stable')]
+            tmp_path = f"{self._file(RECORDS_FILE)}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(merged.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._file(RECORDS_FILE))
+
+            if meta['scored_through'] is not None:
+                scored = records[records['time'] <= _seconds([meta['scored_through']])[0]]
+                self._accumulate(self._join(self._frame(scored, meta['versions'])))
+        return len(records)
+
+    def _slice(self, records, start, end, by):
+        """
+        Row range of the records with `by` ('issued_at' or 'time') in [start, end].
+        """
+        issued = records['issued_at']
+        if by == 'time':
+            max_horizon = self._meta()['max_horizon']
+            start = None if start is None else start - max_horizon * _HOUR
+            end = None if end is None else end - _HOUR
+        lo = 0 if start is None else int(np.searchsorted(issued, start, side='left'))
+        hi = len(records) if end is None else int(np.searchsorted(issued, end, side='right'))
+        return lo, hi
+
+    def read(self, start=None, end=None, by='time'):
+        """
+        Read the predictions in a time window with two binary searches.
+
+        Args:
+            start (datetime, optional): Inclusive lower bound.
+            end (datetime, optional): Inclusive upper bound.
+            by (str): Bound the hour predicted for ('time') or the hour the
+                forecast was issued from ('issued_at').
+
+        Returns:
+            pd.DataFrame: 'issued_at', 'time', 'horizon', 'model_version',
+                'predicted_temperature' and 'predicted_condition', in log order.
+        """
+        if by not in ('time', 'issued_at'):
+            raise ValueError(f"Unknown range key {by!r}, expected 'time' or 'issued_at'")
+        start_s = None if start is None else int(_seconds([start])[0])
+        end_s = None if end is None else int(_seconds([end])[0])
+        records = self.records()
+        lo, hi = self._slice(records, start_s, end_s, by)
+        chunk = np.array(records[lo:hi])
+        if by == 'time':
+            keep = np.ones(len(chunk), dtype=bool)
+            if start_s is not None:
+                keep &= chunk['time'] >= start_s
+            if end_s is not None:
+                keep &= chunk['time'] <= end_s
+            chunk = chunk[keep]
+        return self._frame(chunk, self._meta()['versions'])
+
+    @staticmethod
+    def _frame(chunk, versions):
+        return pd.DataFrame({
+            'issued_at': pd.to_datetime(chunk['issued_at'], unit='s'),
+            'time': pd.to_datetime(chunk['time'], unit='s'),
+            'horizon': chunk['horizon'],
+            'model_version': pd.Categorical.from_codes(chunk['version'], categories=versions),
+            'predicted_temperature': chunk['temperature'],
+            'predicted_condition': pd.Categorical.from_codes(chunk['condition'], dtype=WEATHER_CONDITION_DTYPE),
+        })
+
+    def join_observations(self, start=None, end=None):
+        """
+        Predictions for the hours in a window next to what was observed; the
+        observed columns stay empty until those hours are in the store.
+
+        Returns:
+            pd.DataFrame: `read` columns plus 'observed_temperature',
+                'observed_condition', 'error' and 'condition_miss'.
+        """
+        return self._join(self.read(start, end, by='time'))
+
+    def _join(self, predictions):
+        if predictions.empty:
+            return predictions
+        observed = load_observations(self.location, start=predictions['time'].min(),
+                                     end=predictions['time'].max(), root=self.root,
+                                     columns=['temperature_2m', 'weathercode'])
+        if observed.empty:
+            observed = pd.DataFrame({'time': pd.Series(dtype='datetime64[ns]'),
+                                     'temperature_2m': pd.Series(dtype=np.float32),
+                                     'weathercode': pd.Series(dtype='Int8')})
+        observed = pd.DataFrame({
+            'time': observed['time'],
+            'observed_temperature': observed['temperature_2m'],
+            'observed_condition': observed['weathercode'].map(CODE_MAP).fillna("Unknown")
+                                                       .astype(WEATHER_CONDITION_DTYPE),
+        })
+        joined = predictions.merge(observed, on='time', how='left')
+        joined['error'] = joined['predicted_temperature'] - joined['observed_temperature']
+        joined['condition_miss'] = (joined['predicted_condition'] != joined['observed_condition']).astype(float)
+        joined.loc[joined['observed_condition'].isna(), 'condition_miss'] = np.nan
+        return joined
+
+    def score(self):
+        """
+        Join the predictions for the hours observed since the last call and
+        add their errors to the accuracy sums. Forecasts are always issued
+        from the last observed hour, so `append` never logs a prediction for
+        an hour that was already scored; `insert` scores those itself.
+
+        Returns:
+            int: Number of predictions scored.
+        """
+        with self._locked():
+            meta = self._meta()
+            records = self.records()
+            if not len(records):
+                return 0
+            # Every logged prediction is for an hour after the first issue time
+            scored_through = pd.Timestamp(meta['scored_through'] or pd.Timestamp(records['issued_at'][0], unit='s'))
+            observed = load_observations(self.location, start=scored_through + pd.Timedelta(hours=1),
+                                         root=self.root, columns=['time'])
+            if observed.empty:
+                return 0
+            last_observed = observed['time'].max()
+            scored = self._accumulate(self.join_observations(scored_through + pd.Timedelta(hours=1),
+                                                             last_observed))
+            meta['scored_through'] = last_observed.isoformat()
+            self._save_meta(meta)
+            return scored
+
+    def _accumulate(self, joined):
+        """
+        Add the errors of joined predictions with an observation to the accuracy sums.
+        """
+        if joined.empty:
+            return 0
+        joined = joined.dropna(subset=['observed_temperature'])
+        if joined.empty:
+            return 0
+        error = joined['error'].astype(float)
+        joined = joined.assign(day=joined['time'].dt.floor('D'), error=error, abs_error=error.abs(),
+                               sq_error=error ** 2)
+        sums = joined.groupby(['model_version', 'day', 'horizon'], observed=True).agg(
+            predictions=('error', 'size'),
+            error_sum=('error', 'sum'),
+            abs_error_sum=('abs_error', 'sum'),
+            sq_error_sum=('sq_error', 'sum'),
+            condition_misses=('condition_miss', 'sum'),
+        ).reset_index()
+        sums['model_version'] = sums['model_version'].astype(str)
+        accuracy = self.accuracy_table()
+        if not accuracy.empty:
+            sums = pd.concat([accuracy, sums]).groupby(['model_version', 'day', 'horizon'],
+                                                       as_index=False)[ACCURACY_SUMS].sum()
+        _write_partition(sums.sort_values(['day', 'model_version', 'horizon']).reset_index(drop=True),
+                         self._file(ACCURACY_FILE))
+        return len(joined)
+
+    def accuracy_table(self):
+        """
+        Error sums per (model_version, day, horizon) of the scored predictions.
+        """
+        if not os.path.exists(self._file(ACCURACY_FILE)):
+            return pd.DataFrame(columns=['model_version', 'day', 'horizon'] + ACCURACY_SUMS)
+        return pd.read_parquet(self._file(ACCURACY_FILE))
+
+    def rolling_accuracy(self, days=7, end=None, by_horizon=False):
+        """
+        Accuracy of each model version over the last `days` scored days.
+
+        Args:
+            days (int): Window length in days.
+            end (datetime, optional): Last day of the window (default: the last scored day).
+            by_horizon (bool): Also split by forecast horizon.
+
+        Returns:
+            pd.DataFrame: Per model version (and horizon): 'predictions',
+                'temperature_bias', 'temperature_mae', 'temperature_rmse' and
+                'condition_error_rate'.
+        """
+        accuracy = self.accuracy_table()
+        if accuracy.empty:
+            return pd.DataFrame()
+        end = pd.Timestamp(end).floor('D') if end is not None else accuracy['day'].max()
+        window = accuracy[(accuracy['day'] > end - pd.Timedelta(days=days)) & (accuracy['day'] <= end)]
+        keys = ['model_version', 'horizon'] if by_horizon else ['model_version']
+        totals = window.groupby(keys)[ACCURACY_SUMS].sum()
+        return pd.DataFrame({
+            'predictions': totals['predictions'],
+            'temperature_bias': totals['error_sum'] / totals['predictions'],
+            'temperature_mae': totals['abs_error_sum'] / totals['predictions'],
+            'temperature_rmse': np.sqrt(totals['sq_error_sum'] / totals['predictions']),
+            'condition_error_rate': totals['condition_misses'] / totals['predictions'],
+        }).round(4).reset_index()
+
+
+def log_forecast(forecast, model_version, location, root=DEFAULT_STORE_DIR):
+    """
+    Append a forecast to the location's prediction log.
+
+    Returns:
+        int: Number of records written.
+    """
+    return PredictionLog(location, root).append(forecast, model_version)
+
+
+def score_predictions(location, root=DEFAULT_STORE_DIR):
+    """
+    Score the logged predictions against newly stored observations.
+
+    Returns:
+        int: Number of predictions scored.
+    """
+    return PredictionLog(location, root).score()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the prediction log and its rolling accuracy.")
+    parser.add_argument('--latitude', type=float, default=DEFAULT_LATITUDE)
+    parser.add_argument('--longitude', type=float, default=DEFAULT_LONGITUDE)
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--days', type=int, default=7, help="Rolling accuracy window in days.")
+    parser.add_argument('--by-horizon', action='store_true')
+    parser.add_argument('--start', help="Export the predictions for hours from this time...")
+    parser.add_argument('--end', help="...up to this time, joined with the observations.")
+    parser.add_argument('--output', default='predictions.csv')
+    args = parser.parse_args()
+
+    log = PredictionLog(location_key(args.latitude, args.longitude), args.store_dir)
+    if args.start or args.end:
+        joined = log.join_observations(args.start, args.end)
+        joined.to_csv(args.output, index=False)
+        print(f"{len(joined)} predictions written to {args.output}")
+        return
+    print(f"{len(log.records())} predictions logged, {log.score()} newly scored")
+    print(log.rolling_accuracy(args.days, by_horizon=args.by_horizon).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
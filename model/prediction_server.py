@@ -0,0 +1,308 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from model.artifact_bundle import ArtifactBundle, current_version
+from model.model_retrain_automation import ARTIFACTS_DIR
+
+
+class ModelCache:
+    """
+    Keeps the current artifact version loaded in memory and swaps in a new
+    one when the "current" pointer moves. The new version is fully loaded
+    before the swap; a failed reload keeps serving the old models.
+    """
+
+    def __init__(self, artifacts_dir=ARTIFACTS_DIR, check_interval=5.0):
+        self.artifacts_dir = artifacts_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._models = None
+        self._version = None
+        self._last_check = 0.0
+        self.refresh(force=True)
+
+    def _load(self, version):
+        bundle = ArtifactBundle(self.artifacts_dir, version)
+        return {
+            'reg_model': bundle.reg_model,
+            'clf_model': bundle.clf_model,
+            'temp_features': bundle.features('temperature'),
+            'cond_features': bundle.features('condition'),
+            'label_encoder': bundle.label_encoder,
+        }
+
+    def refresh(self, force=False):
+        """
+        Reload the artifacts if a newer version has been published.
+
+        Args:
+            force (bool): Skip the check interval and the version comparison.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            try:
+                version = current_version(self.artifacts_dir)
+                if version is None:
+                    raise FileNotFoundError(f"No artifact version published in {self.artifacts_dir}")
+                if force or version != self._version:
+                    models = self._load(version)
+                    self._models, self._version = models, version
+                    print(f"Loaded model artifacts version {version}")
+            except (OSError, ValueError) as exc:
+                if self._models is None:
+                    raise
+                print(f"Keeping model version {self._version}, reload failed: {exc}")
+
+    def get(self):
+        """
+        Return the current (version, models) pair, reloading if needed.
+
+        Returns:
+            tuple: Version string and dict of loaded artifacts.
+        """
+        self.refresh()
+        return self._version, self._models
+
+
+def _feature_matrix(rows, features, fill, codes=None):
+    X = np.full((len(rows), len(features)), fill, dtype=np.float32)
+    for i, row in enumerate(rows):
+        for j, name in enumerate(features):
+            value = row.get(name)
+            if value is None:
+                continue
+            if codes is not None and name == 'weather_condition':
+                value = codes.get(value, np.nan)
+            X[i, j] = value
+    return X
+
+
+def _coerce_rows(rows):
+    """
+    Check the shape of request rows and convert feature values to float, so a
+    malformed row is rejected before it can fail a shared batch.
+    'weather_condition' stays a label and None marks a missing feature.
+
+    Raises:
+        ValueError: If `rows` is not a non-empty list of objects, or a value
+            is not a number.
+    """
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("'rows' must be a non-empty list")
+    coerced = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"row {i} is not an object")
+        clean = {}
+        for name, value in row.items():
+            if value is None or name == 'weather_condition':
+                clean[name] = value
+                continue
+            try:
+                clean[name] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"row {i}: {name} is not a number: {value!r}") from None
+        coerced.append(clean)
+    return coerced
+
+
+def predict_rows(models, rows):
+    """
+    Score feature rows with both models in one batched call each.
+
+    Args:
+        models (dict): Artifacts loaded by `ModelCache`.
+        rows (list): Feature dicts keyed by feature name; features missing
+            from the temperature model input are filled with 0 as in
+            `predict_next_step`, and 'weather_condition' is given as its label.
+
+    Returns:
+        list: Dicts with 'temperature' and 'weather_condition' per row.
+    """
+    le = models['label_encoder']
+    codes = {condition: code for code, condition in enumerate(le.classes_)}
+    X_temp = _feature_matrix(rows, models['temp_features'], 0.0)
+    X_cond = _feature_matrix(rows, models['cond_features'], np.nan, codes)
+
+    temperatures = models['reg_model'].predict(X_temp)
+    conditions = le.inverse_transform(models['clf_model'].predict(X_cond))
+    return [
+        {'temperature': round(float(t), 4), 'weather_condition': str(c)}
+        for t, c in zip(temperatures, conditions)
+    ]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into one model call. The worker
+    waits up to `max_wait_ms` after the first request for more rows, up to
+    `max_batch_rows`, then scores them together.
+    """
+
+    def __init__(self, cache, max_batch_rows=256, max_wait_ms=2.0):
+        self.cache = cache
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, rows):
+        """
+        Queue rows for scoring and wait for their predictions.
+
+        Args:
+            rows (list): Feature dicts.
+
+        Returns:
+            tuple: Model version and list of prediction dicts.
+        """
+        future = Future()
+        self._queue.put((rows, future))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._score(batch)
+
+    def _score(self, batch):
+        try:
+            version, models = self.cache.get()
+            predictions = predict_rows(models, [row for rows, _ in batch for row in rows])
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            # Score the requests one at a time so only the failing one errors
+            for item in batch:
+                self._score([item])
+            return
+        start = 0
+        for rows, future in batch:
+            future.set_result((version, predictions[start:start + len(rows)]))
+            start += len(rows)
+
+
+def make_handler(batcher):
+    """
+    Build the request handler class bound to a batcher.
+
+    Endpoints:
+        GET  /health   -> {"status": "ok", "model_version": ...}
+        POST /predict  -> body {"row": {...}} or {"rows": [{...}, ...]}
+    """
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/health':
+                return self._reply(404, {'error': 'not found'})
+            version, _ = batcher.cache.get()
+            self._reply(200, {'status': 'ok', 'model_version': version})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self._reply(404, {'error': 'not found'})
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                rows = payload['rows'] if 'rows' in payload else [payload['row']]
+            except (ValueError, KeyError, TypeError):
+                return self._reply(400, {'error': "expected JSON body with 'row' or 'rows'"})
+            try:
+                rows = _coerce_rows(rows)
+            except ValueError as exc:
+                return self._reply(400, {'error': str(exc)})
+            try:
+                version, predictions = batcher.submit(rows)
+            except Exception as exc:
+                return self._reply(500, {'error': str(exc)})
+            self._reply(200, {'model_version': version, 'predictions': predictions})
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictionHandler
+
+
+def create_server(artifacts_dir=ARTIFACTS_DIR, host='127.0.0.1', port=8050, max_batch_rows=256, max_wait_ms=2.0):
+    """
+    Create a prediction server with warm models. Call `serve_forever()` on
+    the result to start serving; `server.batcher` exposes the batcher.
+
+    Args:
+        artifacts_dir (str): Directory holding the model artifacts.
+        host (str): Interface to bind.
+        port (int): Port to bind, 0 for any free port.
+        max_batch_rows (int): Upper bound on rows scored in one model call.
+        max_wait_ms (float): How long to wait for more requests to batch.
+
+    Returns:
+        ThreadingHTTPServer: The configured server.
+    """
+    batcher = MicroBatcher(ModelCache(artifacts_dir), max_batch_rows, max_wait_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    server.batcher = batcher
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve temperature and weather condition predictions.")
+    parser.add_argument('--artifacts-dir', default=ARTIFACTS_DIR)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--max-batch-rows', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    server = create_server(args.artifacts_dir, args.host, args.port, args.max_batch_rows, args.max_wait_ms)
+    print(f"Serving predictions on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_CACHE_DIR = 'weather_cache'
+MAX_CACHE_BYTES = 256 * 2 ** 20
+# Windows ending this close to the day they were fetched may still be revised
+RECENT_DAYS = 5
+RECENT_TTL_SECONDS = 3600
+
+
+class ResponseCache:
+    """
+    Content-addressed, gzip-compressed on-disk cache of API responses.
+
+    Entries are keyed by a hash of the endpoint and the request parameters
+    (location, date window, variables, timezone). Windows that ended within
+    `recent_days` of the moment they were fetched expire after `recent_ttl`
+    seconds; all others are final and are kept until evicted. When the cache
+    grows past `max_bytes` the least recently used entries are removed.
+
+    Every entry is a file `<root>/<key[:2]>/<key>.json.gz`; its mtime is the
+    fetch time and its atime the last use, so the cache needs no index and
+    can be shared by processes.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=MAX_CACHE_BYTES, recent_days=RECENT_DAYS,
+                 recent_ttl=RECENT_TTL_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.recent_days = recent_days
+        self.recent_ttl = recent_ttl
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        # Upper bound on the bytes on disk; the directory is only rescanned when it passes max_bytes
+        self._size = None
+
+    @staticmethod
+    def key(base_url, params):
+        """
+        Hash of the endpoint and the parameters; the order of list-valued
+        parameters such as the comma-separated variables does not matter.
+        """
+        canonical = {name: ','.join(sorted(str(value).split(','))) if name == 'hourly' else str(value)
+                     for name, value in params.items()}
+        payload = json.dumps({'url': base_url, 'params': canonical}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json.gz")
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _is_stale(self, params, fetched_at):
+        end_date = params.get('end_date')
+        if end_date is None:
+            return time.time() - fetched_at > self.recent_ttl
+        final_after = datetime.fromisoformat(str(end_date)) + timedelta(days=self.recent_days + 1)
+        was_recent = datetime.utcfromtimestamp(fetched_at) < final_after
+        return was_recent and time.time() - fetched_at > self.recent_ttl
+
+    def get(self, base_url, params):
+        """
+        Return the cached JSON response, or None on a miss or an expired entry.
+        """
+        path = self._path(self.key(base_url, params))
+        try:
+            fetched_at = os.stat(path).st_mtime
+            if self._is_stale(params, fetched_at):
+                os.remove(path)
+                self._count('expired')
+                self._count('misses')
+                return None
+            with gzip.open(path, 'rb') as f:
+                data = json.loads(f.read())
+            os.utime(path, (time.time(), fetched_at))
+        except (OSError, ValueError, EOFError):
+            self._count('misses')
+            return None
+        self._count('hits')
+        return data
+
+    def put(self, base_url, params, content):
+        """
+        Store a successful response body (bytes) and evict old entries if
+        the cache is over its size limit.
+        """
+        path = self._path(self.key(base_url, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per process and thread, as several runs can share the cache
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            f.write(content)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        self._count('stores')
+        with self._lock:
+            self._size = None if self._size is None else self._size + size
+        if self._size is None or self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith('.json.gz'):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in `max_bytes`.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self.counters['evictions'] += removed
+            self._size = total
+        return removed
+
+    def stats(self):
+        """
+        Hit/miss counters of this process plus the current size of the cache.
+        """
+        entries = self._entries()
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        return {**counters, 'hit_rate': round(counters['hits'] / lookups, 3) if lookups else None,
+                'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+
+_default_cache = None
+
+
+def default_cache():
+    """
+    Process-wide cache in `DEFAULT_CACHE_DIR`, so counters add up across fetches.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
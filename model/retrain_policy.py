@@ -0,0 +1,122 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+RETRAIN_STATE_FILE = 'retrain_state.json'
+RETRAIN_LOG_FILE = 'retrain_log.jsonl'
+
+EXTRA_TREES = 10
+MAX_TOTAL_TREES = 400
+MIN_NEW_ROWS = 24
+DRIFT_THRESHOLD = 0.25
+DRIFT_TOLERANCE = {'rmse': 0.1, 'error_rate': 0.01}
+BASELINE_SMOOTHING = 0.3
+
+
+def load_retrain_state(artifacts_dir):
+    """
+    Load the bookkeeping written after the last training run.
+
+    Args:
+        artifacts_dir (str): Artifacts directory.
+
+    Returns:
+        dict: Saved state, or None if no model has been trained yet.
+    """
+    path = os.path.join(artifacts_dir, RETRAIN_STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_retrain_state(state, artifacts_dir):
+    """
+    Atomically write the retrain bookkeeping next to the artifacts.
+
+    Args:
+        state (dict): JSON-serializable state.
+        artifacts_dir (str): Artifacts directory.
+    """
+    os.makedirs(artifacts_dir, exist_ok=True)
+    path = os.path.join(artifacts_dir, RETRAIN_STATE_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(f"{path}.tmp", path)
+
+
+def log_retrain(record, artifacts_dir):
+    """
+    Append one JSON line describing which training path a run took.
+
+    Args:
+        record (dict): JSON-serializable run record.
+        artifacts_dir (str): Artifacts directory.
+    """
+    os.makedirs(artifacts_dir, exist_ok=True)
+    record = {'logged_at': datetime.utcnow().isoformat(), **record}
+    with open(os.path.join(artifacts_dir, RETRAIN_LOG_FILE), 'a') as f:
+        f.write(json.dumps(record, default=str) + '\n')
+    print(f"Retrain path: {record['path']} ({record['reason']})")
+
+
+def validation_metrics(reg_model, clf_model, X_reg, y_reg, X_cls, y_cls):
+    """
+    Score the previous models on rows they have not been trained on.
+
+    Returns:
+        dict: 'rmse' of the temperature model and 'error_rate' of the condition model.
+    """
+    rmse = float(np.sqrt(np.mean((reg_model.predict(X_reg) - np.asarray(y_reg)) ** 2)))
+    error_rate = float(np.mean(clf_model.predict(X_cls) != np.asarray(y_cls)))
+    return {'rmse': rmse, 'error_rate': error_rate}
+
+
+def choose_retrain_path(state, n_new_rows, classes, trees, metrics=None, drift_threshold=DRIFT_THRESHOLD,
+                        extra_trees=EXTRA_TREES, max_total_trees=MAX_TOTAL_TREES):
+    """
+    Decide between continuing the previous models, a full refit, or skipping.
+
+    Args:
+        state (dict): Output of `load_retrain_state`, None on the first run.
+        n_new_rows (int): Rows that arrived since the last training run.
+        classes (list): Weather condition classes of the current label encoder.
+        trees (int): Trees in the larger of the previous models.
+        metrics (dict, optional): `validation_metrics` of the previous models on the new rows.
+        drift_threshold (float): Relative degradation over the baseline that forces a full
+            refit, on top of the absolute `DRIFT_TOLERANCE`.
+        extra_trees (int): Trees a continuation would add.
+        max_total_trees (int): Ensemble size above which a full refit is forced.
+
+    Returns:
+        tuple: ('full' | 'incremental' | 'skip', reason)
+    """
+    if state is None:
+        return 'full', 'no previous model'
+    if list(classes) != state['classes']:
+        return 'full', 'weather condition classes changed'
+    if n_new_rows == 0:
+        return 'skip', 'no new rows'
+    if n_new_rows < MIN_NEW_ROWS:
+        return 'skip', f'only {n_new_rows} new rows'
+    if trees + extra_trees > max_total_trees:
+        return 'full', f'ensemble would exceed {max_total_trees} trees'
+
+    baseline = state.get('baseline')
+    if baseline and metrics:
+        for name, tolerance in DRIFT_TOLERANCE.items():
+            if metrics[name] > baseline[name] * (1 + drift_threshold) + tolerance:
+                return 'full', f'{name} drifted to {metrics[name]:.4f} from baseline {baseline[name]:.4f}'
+    return 'incremental', 'validation within drift threshold'
+
+
+def update_baseline(baseline, metrics):
+    """
+    Blend the latest out-of-sample metrics into the running baseline.
+    """
+    if not baseline:
+        return dict(metrics)
+    return {name: (1 - BASELINE_SMOOTHING) * baseline[name] + BASELINE_SMOOTHING * metrics[name]
+            for name in metrics}
@@ -0,0 +1,219 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from model.data_preprocessor import CODE_MAP
+from model.weather_store import DEFAULT_STORE_DIR, _write_partition, load_observations, append_observations
+
+ROLLUPS_DIR = 'rollups'
+PREDICTIONS_DIR = 'predictions'
+ROLLUP_LEVELS = ['hourly', 'daily', 'weekly', 'monthly']
+ROLLUP_VARIABLES = [
+    'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m', 'wind_direction_10m',
+    'pressure_msl', 'precipitation', 'cloudcover'
+]
+ROLLUP_STATS = ['mean', 'min', 'max', 'sum']
+
+
+def _bucket_starts(times, level):
+    """
+    Start of the bucket each timestamp falls in. Weeks start on Monday.
+    """
+    times = pd.Series(pd.to_datetime(times))
+    if level == 'hourly':
+        return times.dt.floor('h')
+    if level == 'daily':
+        return times.dt.floor('D')
+    if level == 'weekly':
+        return times.dt.floor('D') - pd.to_timedelta(times.dt.dayofweek, unit='D')
+    if level == 'monthly':
+        return times.dt.to_period('M').dt.start_time
+    raise ValueError(f"Unknown rollup level '{level}', expected one of {ROLLUP_LEVELS}")
+
+
+def _bucket_end(start, level):
+    return start + {
+        'hourly': pd.Timedelta(hours=1),
+        'daily': pd.Timedelta(days=1),
+        'weekly': pd.Timedelta(days=7),
+        'monthly': pd.offsets.MonthBegin(1),
+    }[level]
+
+
+def _rollup_dir(location, level, root):
+    return os.path.join(root, location, ROLLUPS_DIR, level)
+
+
+def _predictions_root(location, root):
+    return os.path.join(root, location)
+
+
+def record_predictions(forecast, location, root=DEFAULT_STORE_DIR):
+    """
+    Keep forecasts next to the raw data so rollups can score them once the
+    observations arrive. A later forecast for the same hour (i.e. a shorter
+    horizon) replaces the earlier one.
+
+    Args:
+        forecast (pd.DataFrame): Forecast with 'date_time', 'temperature' and
+            'weather_condition' columns (e.g. from `forecast_recursive`).
+        location (str): Location key from `location_key`.
+        root (str): Root directory of the store.
+
+    Returns:
+        int: Number of predictions written.
+    """
+    predictions = pd.DataFrame({
+        'time': pd.to_datetime(forecast['date_time']),
+        'predicted_temperature': forecast['temperature'].astype(float),
+        'predicted_condition': forecast['weather_condition'].astype(str),
+    })
+    written = append_observations(predictions, PREDICTIONS_DIR, _predictions_root(location, root))
+    observed = load_observations(location, start=predictions['time'].min(), end=predictions['time'].max(),
+                                 root=root, columns=['time'])
+    if not observed.empty:
+        update_rollups(observed['time'], location, root)
+    return written
+
+
+def _aggregate(frame, level):
+    """
+    Aggregate raw rows (joined with predictions) into buckets of one level.
+    """
+    frame = frame.assign(bucket=_bucket_starts(frame['time'], level).to_numpy())
+    grouped = frame.groupby('bucket', sort=True)
+    stats = grouped[ROLLUP_VARIABLES].agg(ROLLUP_STATS)
+    stats.columns = [f"{var}_{stat}" for var, stat in stats.columns]
+    stats['hours'] = grouped.size()
+
+    errors = grouped.agg(
+        predictions=('error', 'count'),
+        temperature_bias=('error', 'mean'),
+        temperature_mae=('abs_error', 'mean'),
+        temperature_mse=('sq_error', 'mean'),
+        condition_error_rate=('condition_miss', 'mean'),
+    )
+    errors['temperature_rmse'] = np.sqrt(errors.pop('temperature_mse'))
+    return stats.join(errors).rename_axis('time').reset_index()
+
+
+def _join_predictions(raw, predictions):
+    # Aggregate in float64 so monthly sums of the float32 store keep their precision
+    frame = raw.astype({col: 'float64' for col in ROLLUP_VARIABLES})
+    if predictions.empty:
+        frame['error'] = np.nan
+        frame['condition_miss'] = np.nan
+    else:
+        frame = frame.merge(predictions, on='time', how='left')
+        frame['error'] = frame['predicted_temperature'] - frame['temperature_2m']
+        actual = frame['weathercode'].map(CODE_MAP).fillna("Unknown")
+        frame['condition_miss'] = (frame['predicted_condition'] != actual).astype(float)
+        frame.loc[frame['predicted_condition'].isna(), 'condition_miss'] = np.nan
+    frame['abs_error'] = frame['error'].abs()
+    frame['sq_error'] = frame['error'] ** 2
+    return frame
+
+
+def _merge_rollup(buckets, location, level, root):
+    """
+    Replace the given buckets in the yearly partitions of one level.
+    """
+    os.makedirs(_rollup_dir(location, level, root), exist_ok=True)
+    for year, chunk in buckets.groupby(buckets['time'].dt.year):
+        path = os.path.join(_rollup_dir(location, level, root), f"{year}.parquet")
+        if os.path.exists(path):
+            existing = pd.read_parquet(path)
+            chunk = pd.concat([existing[~existing['time'].isin(chunk['time'])], chunk], ignore_index=True)
+        _write_partition(chunk.sort_values('time').reset_index(drop=True), path)
+
+
+def update_rollups(times, location, root=DEFAULT_STORE_DIR):
+    """
+    Recompute the rollup buckets that contain the given timestamps at every
+    level. Only the raw rows of those buckets are read, so the cost depends
+    on how much data arrived, not on the size of the store.
+
+    Args:
+        times (array-like): Timestamps of rows that were added or changed.
+        location (str): Location key from `location_key`.
+        root (str): Root directory of the store.
+
+    Returns:
+        dict: Number of buckets rewritten per level.
+    """
+    times = pd.Series(pd.to_datetime(times))
+    if times.empty:
+        return {level: 0 for level in ROLLUP_LEVELS}
+    first, last = times.min(), times.max()
+    start = min(_bucket_starts([first], level)[0] for level in ROLLUP_LEVELS)
+    end = max(_bucket_end(_bucket_starts([last], level)[0], level) for level in ROLLUP_LEVELS)
+    window_end = end - pd.Timedelta(microseconds=1)
+
+    raw = load_observations(location, start=start, end=window_end, root=root,
+                            columns=ROLLUP_VARIABLES + ['weathercode'])
+    if raw.empty:
+        return {level: 0 for level in ROLLUP_LEVELS}
+    predictions = load_observations(PREDICTIONS_DIR, start=start, end=window_end,
+                                    root=_predictions_root(location, root))
+    frame = _join_predictions(raw, predictions)
+
+    counts = {}
+    for level in ROLLUP_LEVELS:
+        touched = _bucket_starts(times, level).unique()
+        buckets = _aggregate(frame, level)
+        buckets = buckets[buckets['time'].isin(touched)]
+        _merge_rollup(buckets, location, level, root)
+        counts[level] = len(buckets)
+    return counts
+
+
+def rebuild_rollups(location, root=DEFAULT_STORE_DIR):
+    """
+    Recompute every rollup bucket of a location from the raw store.
+
+    Returns:
+        dict: Number of buckets written per level.
+    """
+    observed = load_observations(location, root=root, columns=['time'])
+    return update_rollups(observed['time'] if not observed.empty else [], location, root)
+
+
+def has_rollups(location, root=DEFAULT_STORE_DIR):
+    return all(glob.glob(os.path.join(_rollup_dir(location, level, root), '*.parquet')) for level in ROLLUP_LEVELS)
+
+
+def load_rollup(location, level, start=None, end=None, root=DEFAULT_STORE_DIR, columns=None):
+    """
+    Read the buckets of one level, touching only the yearly partitions that
+    overlap the window.
+
+    Args:
+        location (str): Location key from `location_key`.
+        level (str): One of `ROLLUP_LEVELS`.
+        start (datetime, optional): Inclusive lower bound on the bucket start.
+        end (datetime, optional): Inclusive upper bound on the bucket start.
+        root (str): Root directory of the store.
+        columns (list, optional): Columns to read; 'time' is always included.
+
+    Returns:
+        pd.DataFrame: Buckets sorted by 'time' (the bucket start), empty if none are stored.
+    """
+    if level not in ROLLUP_LEVELS:
+        raise ValueError(f"Unknown rollup level '{level}', expected one of {ROLLUP_LEVELS}")
+    paths = sorted(glob.glob(os.path.join(_rollup_dir(location, level, root), '*.parquet')))
+    years = [int(os.path.splitext(os.path.basename(p))[0]) for p in paths]
+    paths = [p for p, y in zip(paths, years)
+             if (start is None or y >= pd.Timestamp(start).year) and (end is None or y <= pd.Timestamp(end).year)]
+    if not paths:
+        return pd.DataFrame()
+    if columns is not None:
+        columns = ['time'] + [c for c in columns if c != 'time']
+
+    df = pd.concat([pd.read_parquet(p, columns=columns) for p in paths], ignore_index=True)
+    if start is not None:
+        df = df[df['time'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['time'] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
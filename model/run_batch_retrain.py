@@ -0,0 +1,119 @@
+import argparse
+import csv
+import os
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from model.run_model_retrain import run_model_retrain
+from model.weather_store import DEFAULT_STORE_DIR
+
+SITES_OUTPUT_DIR = 'sites'
+
+Site = namedtuple('Site', ['name', 'latitude', 'longitude'])
+
+
+def load_sites(path):
+    """
+    Read the list of forecast sites from a CSV file.
+
+    Args:
+        path (str): CSV file with 'name', 'latitude' and 'longitude' columns.
+
+    Returns:
+        list: Site tuples in file order.
+    """
+    with open(path, newline='') as f:
+        return [Site(row['name'], float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(f)]
+
+
+def check_site_names(sites):
+    """
+    Check that every site name is a plain directory name, so a site's output
+    folder cannot point outside the output root.
+
+    Args:
+        sites (list): Site tuples.
+
+    Raises:
+        ValueError: If a name is empty, '.', '..' or contains a path separator.
+    """
+    invalid = [site.name for site in sites
+               if site.name in ('', '.', '..') or os.path.basename(site.name) != site.name
+               or (os.altsep and os.altsep in site.name)]
+    if invalid:
+        raise ValueError(f"Site names must be plain directory names: {invalid}")
+
+
+def _run_site(site, output_root, store_dir, n_jobs):
+    """
+    Run the full retrain pipeline for one site inside a worker process.
+    Errors are caught and reported so one failing site does not abort the batch.
+    """
+    started = time.perf_counter()
+    try:
+        run_model_retrain(site.latitude, site.longitude, store_dir,
+                          output_dir=os.path.join(output_root, site.name), n_jobs=n_jobs)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return {'site': site.name, 'ok': error is None, 'seconds': time.perf_counter() - started, 'error': error}
+
+
+def run_batch_retrain(sites, workers=None, output_root=SITES_OUTPUT_DIR, store_dir=DEFAULT_STORE_DIR):
+    """
+    Run fetch, preprocessing, feature engineering, training and prediction
+    for many sites in a process pool. Each site writes its CSVs and artifacts
+    to `output_root/<site name>/`. The cores are split evenly between the
+    workers so XGBoost threads do not oversubscribe the machine.
+
+    Args:
+        sites (list): Site tuples to process.
+        workers (int, optional): Number of worker processes (default: all cores).
+        output_root (str): Directory holding one output folder per site.
+        store_dir (str): Root directory of the shared weather store.
+
+    Returns:
+        list: One result dict per site with 'site', 'ok', 'seconds' and 'error'.
+
+    Raises:
+        ValueError: If a site name is not a plain directory name.
+    """
+    check_site_names(sites)
+    cores = os.cpu_count() or 1
+    workers = min(workers or cores, len(sites)) or 1
+    n_jobs = max(1, cores // workers)
+
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_site, site, output_root, store_dir, n_jobs): site for site in sites}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool as exc:
+                # A worker that dies (e.g. killed for memory) breaks the pool;
+                # its site and every site still pending are recorded as failed
+                result = {'site': futures[future].name, 'ok': False, 'seconds': time.perf_counter() - started,
+                          'error': f"BrokenProcessPool: {exc}"}
+            status = 'done' if result['ok'] else 'FAILED'
+            print(f"[{result['site']}] {status} in {result['seconds']:.1f}s")
+            if result['error']:
+                print(result['error'])
+            results.append(result)
+
+    failed = [r['site'] for r in results if not r['ok']]
+    print(f"Processed {len(sites)} sites with {workers} workers, {len(failed)} failed: {failed}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain and forecast for a list of sites.")
+    parser.add_argument('sites_csv', help="CSV file with name,latitude,longitude columns")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--output-root', default=SITES_OUTPUT_DIR)
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+    run_batch_retrain(load_sites(args.sites_csv), args.workers, args.output_root, args.store_dir)
@@ -1,37 +1,206 @@
-from model.data_fetcher import get_initial_data
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from model.artifact_bundle import current_version, load_bundle, publish_bundle
+from model.data_fetcher import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, sync_store
 from model.data_preprocessor import preprocess_data
 from model.feature_engineering import feature_engineering_pipeline
-from model.model_retrain_automation import (create_lagged_features, prepare_data, train_regression_model,
-                                            train_classification_model, save_model, predict_next_step)
+from model.feature_selection import load_selection
+from model.forecasting import forecast_recursive
+from model.incremental_features import fit_feature_state, save_feature_state
+from model.instrumentation import RUN_LOG_FILE, RunRecorder, annotate_run, frame_memory_mb, stage
+from model.lag_features import DEFAULT_LAGS, normalize_lags
+from model.model_retrain_automation import (create_lagged_features, predict_next_step, continue_training,
+                                            model_tree_count, ARTIFACTS_DIR)
+from model.prediction_log import log_forecast, score_predictions
+from model.retrain_policy import (EXTRA_TREES, choose_retrain_path, load_retrain_state, log_retrain,
+                                  save_retrain_state, update_baseline, validation_metrics)
+from model.rollups import record_predictions
+from model.training_orchestrator import build_training_matrix, fit_concurrently, fit_full, fit_weights
+from model.weather_store import DEFAULT_STORE_DIR, location_key, load_observations
 
+TRAINING_YEARS = 3
+FORECAST_HOURS = 168
 
-def run_model_retrain():
+
+def _train_models(df_lagged, le, artifacts_dir, n_jobs, retrain_mode):
     """
-    Initialize the weather forecasting system and start the scheduler.
+    Train or update both models and record which path was taken. In 'auto'
+    mode the previous models keep boosting on the rows that arrived since the
+    last run, unless their error on those rows drifted past the threshold,
+    the label classes or features changed, or the ensemble grew too large.
+    Both models read one shared feature matrix and are fitted concurrently
+    within the `n_jobs` thread budget; nothing is published unless both fits succeed.
+    If a feature selection was saved (`feature_selection --apply`), the models
+    train on, and the bundle lists, only the pruned features.
+    """
+    started = time.perf_counter()
+    selected = load_selection(artifacts_dir)
+    if selected and not all(set(features) <= set(df_lagged.columns) for features in selected.values()):
+        print("Saved feature selection names features that no longer exist; training on all features")
+        selected = None
+    with stage('build_training_matrix', len(df_lagged)) as entry:
+        data = build_training_matrix(df_lagged, le, selected)
+        entry['matrix_mb'] = round(data.matrix.nbytes / 2 ** 20, 2)
+    X_reg, y_reg = data.X('temperature'), data.targets['temperature']
+    X_cls, y_cls = data.X('condition'), data.targets['condition']
+    temp_feature_list = data.features('temperature')
+    cond_feature_list = data.features('condition')
+
+    state = load_retrain_state(artifacts_dir)
+    bundle = load_bundle(artifacts_dir)
+    features_changed = bundle is not None and (bundle.features('temperature') != temp_feature_list
+                                               or bundle.features('condition') != cond_feature_list)
+    if bundle is None or features_changed:
+        state = None
+    prev_reg = bundle.reg_model if state else None
+    prev_cls = bundle.clf_model if state else None
+
+    # Rows are sorted by time, so the new rows are a suffix and slicing them does not copy
+    trained_until = np.datetime64(pd.Timestamp(state['trained_until'])) if state else None
+    first_new = int(np.searchsorted(df_lagged['date_time'].to_numpy(), trained_until, side='right')) if state else 0
+    new_rows = slice(first_new, len(df_lagged))
+    n_new_rows = len(df_lagged) - first_new
+    metrics = None
+    if state and n_new_rows and list(le.classes_) == state['classes']:
+        with stage('validate', n_new_rows):
+            metrics = validation_metrics(prev_reg, prev_cls, X_reg[new_rows], y_reg[new_rows],
+                                         X_cls[new_rows], y_cls[new_rows])
+    trees = max(model_tree_count(prev_reg), model_tree_count(prev_cls)) if state else 0
+
+    if retrain_mode == 'full':
+        path, reason = 'full', 'full refit requested'
+    elif features_changed:
+        path, reason = 'full', 'feature set changed'
+    else:
+        path, reason = choose_retrain_path(state, n_new_rows, le.classes_, trees, metrics)
+
+    if path == 'full':
+        with stage('fit_models', len(X_reg)):
+            models, timings = fit_full(data, le, n_jobs)
+        state = {'baseline': None, 'last_full_refit': df_lagged['date_time'].max()}
+    elif path == 'incremental':
+        with stage('fit_models', n_new_rows):
+            models, timings = fit_concurrently({
+                'temperature': lambda threads: continue_training(
+                    prev_reg, X_reg[new_rows], y_reg[new_rows], EXTRA_TREES, n_jobs=threads,
+                    feature_names=temp_feature_list),
+                'condition': lambda threads: continue_training(
+                    prev_cls, X_cls[new_rows], y_cls[new_rows], EXTRA_TREES, le, threads,
+                    feature_names=cond_feature_list),
+            }, fit_weights(le), n_jobs)
+        state['baseline'] = update_baseline(state.get('baseline'), metrics)
+    else:
+        models, timings = {'temperature': prev_reg, 'condition': prev_cls}, None
+    model_reg, model_cls = models['temperature'], models['condition']
+
+    annotate_run(retrain_path=path, retrain_reason=reason, validation=metrics, fit_jobs=timings,
+                 feature_counts={'temperature': len(temp_feature_list), 'condition': len(cond_feature_list)})
+
+    if path != 'skip':
+        version = publish_bundle(
+            artifacts_dir,
+            models={'temperature': model_reg, 'condition': model_cls},
+            features={'temperature': temp_feature_list, 'condition': cond_feature_list},
+            feature_dtypes=data.dtypes,
+            label_classes=le.classes_,
+            lags=normalize_lags(DEFAULT_LAGS),
+            training_window=(df_lagged['date_time'].min(), df_lagged['date_time'].max()),
+            metrics=metrics,
+            extra={'retrain_path': path, 'pruned_features': selected is not None},
+        )
+        annotate_run(model_version=version)
+        state.update(trained_until=df_lagged['date_time'].max(), classes=list(le.classes_))
+        save_retrain_state(state, artifacts_dir)
+
+    log_retrain({
+        'path': path,
+        'reason': reason,
+        'new_rows': n_new_rows,
+        'training_rows': len(df_lagged) if path == 'full' else (n_new_rows if path == 'incremental' else 0),
+        'validation': metrics,
+        'trees': [model_tree_count(model_reg), model_tree_count(model_cls)],
+        'seconds': round(time.perf_counter() - started, 3),
+    }, artifacts_dir)
+    return model_reg, model_cls, temp_feature_list, cond_feature_list
+
+
+def run_model_retrain(latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE, store_dir=DEFAULT_STORE_DIR,
+                      output_dir='.', n_jobs=None, retrain_mode='auto', profile=None, run_context=None):
     """
-    df = get_initial_data(years=3)
-    df = preprocess_data(df)
-    df, le = feature_engineering_pipeline(df)
-    print(df)
-    df.to_csv('weather_data.csv', index=False)
+    Initialize the weather forecasting system and start the scheduler.
+    Only the hours missing from the local store are fetched; training reads
+    the last `TRAINING_YEARS` years back from the store.
 
-    df_lagged = create_lagged_features(df)
-    df_lagged.dropna(inplace=True)
+    Args:
+        latitude (float): Latitude of the location (default: Hyderabad).
+        longitude (float): Longitude of the location (default: Hyderabad).
+        store_dir (str): Root directory of the weather store.
+        output_dir (str): Directory for the CSV outputs and the 'artifacts' folder.
+        n_jobs (int, optional): Thread budget for model training (default: all cores).
+        retrain_mode (str): 'auto' to continue the previous models on new data
+            unless validation drifted, or 'full' to always refit from scratch.
+        profile (list, optional): Stage names to run under cProfile (default: the
+            WEATHER_PROFILE_STAGES environment variable).
+        run_context (dict, optional): Extra values for the run metrics record
+            (e.g. the trigger and the interpreter start-up time).
 
-    X_reg, y_reg = prepare_data(df_lagged, 'temperature', True)
-    print(X_reg, y_reg)
-    model_reg = train_regression_model(X_reg, y_reg)
-    feature_list = X_reg.columns.tolist()
-    save_model(model_reg, 'temperature_model.pkl', 'temperature_features.pkl', feature_list)
+    Returns:
+        dict: 'run_id', the lagged training 'features' and the 'forecast', so a
+            resident process can keep them warm.
+    """
+    artifacts_dir = os.path.join(output_dir, ARTIFACTS_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    location = location_key(latitude, longitude)
+    with RunRecorder('retrain', artifacts_dir, profile, location=location, retrain_mode=retrain_mode,
+                     **(run_context or {})) as run:
+        with stage('sync_store') as entry:
+            entry['rows_out'] = sync_store(TRAINING_YEARS, latitude, longitude, store_dir)
+        with stage('score_predictions') as entry:
+            entry['rows_out'] = score_predictions(location, store_dir)
+        with stage('load_observations') as entry:
+            window_start = datetime.utcnow() - timedelta(days=365 * TRAINING_YEARS)
+            raw_df = load_observations(location, start=window_start, root=store_dir)
+            entry.update(rows_out=len(raw_df), frame_mb=frame_memory_mb(raw_df))
+        with stage('preprocess_data', len(raw_df)) as entry:
+            df = preprocess_data(raw_df)
+            entry.update(rows_out=len(df), frame_mb=frame_memory_mb(df))
+        with stage('feature_engineering', len(df)) as entry:
+            df, le = feature_engineering_pipeline(df)
+            entry.update(rows_out=len(df), frame_mb=frame_memory_mb(df))
+        with stage('save_feature_state', len(df)):
+            save_feature_state(fit_feature_state(raw_df, df, le), artifacts_dir)
+        with stage('write_weather_data', len(df)):
+            df.to_csv(os.path.join(output_dir, 'weather_data.csv'), index=False)
 
-    X_cls, y_cls = prepare_data(df_lagged, 'weather_condition_encoded', False)
-    model_cls, reverse_encoder = train_classification_model(X_cls, y_cls, le)
-    feature_list = X_cls.columns.tolist()
-    save_model(model_cls, 'condition_model.pkl', 'condition_features.pkl', feature_list)
+        with stage('create_lagged_features', len(df)) as entry:
+            df_lagged = create_lagged_features(df)
+            df_lagged.dropna(inplace=True)
+            entry.update(rows_out=len(df_lagged), frame_mb=frame_memory_mb(df_lagged))
 
-    df_with_predictions = predict_next_step(df, model_reg, model_cls, le, lags=24)
-    df_with_predictions = df_with_predictions.iloc[:, :9]
-    df_with_predictions.to_csv('weather_data_with_predictions.csv', index=False)
-    print("Prediction added and saved.")
+        with stage('train', len(df_lagged)):
+            model_reg, model_cls, temp_feature_list, cond_feature_list = _train_models(
+                df_lagged, le, artifacts_dir, n_jobs, retrain_mode)
 
+        with stage('forecast_recursive', len(df_lagged)) as entry:
+            forecast = forecast_recursive(df_lagged, model_reg, model_cls, le, temp_feature_list,
+                                          cond_feature_list, FORECAST_HOURS)
+            forecast.to_csv(os.path.join(output_dir, 'weather_forecast.csv'), index=False)
+            record_predictions(forecast, location, store_dir)
+            # A rerun with no new data repeats the last block, which the log drops
+            log_forecast(forecast, current_version(artifacts_dir), location, store_dir)
+            entry['rows_out'] = len(forecast)
 
+        with stage('predict_next_step', len(df_lagged)) as entry:
+            df_with_predictions = predict_next_step(df_lagged, model_reg, model_cls, le, lags=24,
+                                                    artifacts_dir=artifacts_dir)
+            df_with_predictions = df_with_predictions.iloc[:, :9]
+            df_with_predictions.to_csv(os.path.join(output_dir, 'weather_data_with_predictions.csv'), index=False)
+            entry['rows_out'] = len(df_with_predictions)
+        print(f"Prediction added and saved. Run {run.record['run_id']} metrics appended to "
+              f"{os.path.join(artifacts_dir, RUN_LOG_FILE)}")
+    return {'run_id': run.record['run_id'], 'features': df_lagged, 'forecast': forecast}
@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+
+from model.data_preprocessor import (CODE_MAP, COLUMN_RENAMES, SMOOTH_COLUMNS, WEATHER_CONDITION_DTYPE,
+                                     enforce_schema, historical_data)
+from model.incremental_features import ewm_continue
+from model.weather_store import DEFAULT_STORE_DIR, iter_months
+
+HISTOGRAM_BINS = 8192
+# Raw names of the columns the statistics pass reads (SMOOTH_COLUMNS are among them)
+_RAW_NAMES = {name: raw for raw, name in COLUMN_RENAMES.items()}
+_STATS_COLUMNS = [_RAW_NAMES.get(col, col) for col in historical_data]
+
+
+class StreamingHistogram:
+    """
+    Fixed-bin histogram used as a constant-memory stand-in for a column's
+    full history. Quantiles are interpolated within a bin, so the median is
+    within one bin width of the exact value; the mode is the centre of the
+    fullest bin (exact for whole-number data with unit bins).
+    """
+
+    def __init__(self, low, high, bins=HISTOGRAM_BINS):
+        self.edges = np.linspace(low, high, bins + 1)
+        # counts[0] and counts[-1] hold values below `low` and at or above `high`
+        self.counts = np.zeros(bins + 2, dtype=np.int64)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        index = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def add(self, value, count):
+        """
+        Add `count` occurrences of one value.
+        """
+        if count:
+            self.counts[np.searchsorted(self.edges, value, side='right')] += count
+
+    def copy(self):
+        other = StreamingHistogram.__new__(StreamingHistogram)
+        other.edges, other.counts = self.edges, self.counts.copy()
+        return other
+
+    def quantile(self, q):
+        total = self.total
+        if not total:
+            return np.nan
+        cumulative = np.cumsum(self.counts)
+        rank = q * total
+        index = min(int(np.searchsorted(cumulative, rank, side='left')), len(self.counts) - 1)
+        if index == 0:
+            return self.edges[0]
+        if index == len(self.counts) - 1:
+            return self.edges[-1]
+        before = cumulative[index - 1]
+        low, high = self.edges[index - 1], self.edges[index]
+        return low + (rank - before) / self.counts[index] * (high - low)
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def mode(self):
+        inner = self.counts[1:-1]
+        if not inner.any():
+            return np.nan
+        # argmax returns the first (smallest) bin on ties, like Series.mode()[0]
+        index = int(np.argmax(inner))
+        return (self.edges[index] + self.edges[index + 1]) / 2
+
+
+def _histogram_range(column):
+    # Leave room for the out-of-range values whose median is taken too
+    max_val, min_val = historical_data[column]
+    span = max_val - min_val
+    return min_val - span, max_val + span
+
+
+class StreamingPreprocessor:
+    """
+    Applies `preprocess_data` to a history one chunk at a time. The EWM
+    accumulators are carried across chunk boundaries, and the global
+    statistics (cloud-cover mode for gaps, column medians for outliers) are
+    kept in fixed-size histograms, so memory does not grow with the history.
+
+    Statistics are either running (each chunk uses the statistics of
+    everything seen up to and including it) or, after `fit`, frozen at
+    their values over the whole history, which reproduces the batch result
+    up to the histogram resolution.
+    """
+
+    def __init__(self):
+        self.ewm = {col: (np.nan, 1.0) for col in SMOOTH_COLUMNS}
+        self.cloud = StreamingHistogram(-0.5, 100.5, 101)
+        self.medians = {col: StreamingHistogram(*_histogram_range(col))
+                        for col in historical_data if col != 'cloud_coverage'}
+        self.medians['cloud_coverage'] = self.cloud
+        self.cloud_missing = 0
+        self.rows = 0
+        self.frozen = False
+        self.last_time = None
+
+    def _prepare(self, raw):
+        df = enforce_schema(raw.rename(columns=COLUMN_RENAMES)).reset_index(drop=True)
+        if not pd.api.types.is_datetime64_any_dtype(df['date_time']):
+            df['date_time'] = pd.to_datetime(df['date_time'])
+        if self.last_time is not None and len(df) and df['date_time'].iloc[0] <= self.last_time:
+            raise ValueError(f"Chunks must be in time order; got {df['date_time'].iloc[0]} after {self.last_time}")
+        return df
+
+    def _smooth(self, df, ewm):
+        for col in SMOOTH_COLUMNS:
+            weighted, old_wt = ewm[col]
+            df[col], weighted, old_wt = ewm_continue(df[col].to_numpy(dtype=float), weighted, old_wt)
+            ewm[col] = (weighted, old_wt)
+        return df
+
+    def _observe(self, df):
+        """
+        Add a chunk (gaps not yet filled, smoothing applied) to the statistics.
+        Cloud-cover gaps are counted and enter the median at the final mode.
+        """
+        self.cloud.update(df['cloud_coverage'])
+        self.cloud_missing += int(df['cloud_coverage'].isna().sum())
+        for col, histogram in self.medians.items():
+            if col == 'cloud_coverage':
+                continue
+            values = df[col].fillna(0) if col == 'precipitation' else df[col]
+            histogram.update(values)
+        self.rows += len(df)
+
+    def cloud_mode(self):
+        return self.cloud.mode()
+
+    def median(self, column):
+        if column != 'cloud_coverage':
+            return self.medians[column].median()
+        histogram = self.cloud.copy()
+        histogram.add(self.cloud_mode(), self.cloud_missing)
+        return histogram.median()
+
+    def fit(self, chunks):
+        """
+        Compute the statistics over a whole history and freeze them, so
+        `transform` treats every chunk the way the batch pipeline would.
+
+        Args:
+            chunks (iterable): Raw hourly frames in time order.
+
+        Returns:
+            StreamingPreprocessor: self.
+        """
+        ewm = dict(self.ewm)
+        for raw in chunks:
+            df = self._prepare(raw)
+            self._observe(self._smooth(df, ewm))
+            self.last_time = df['date_time'].iloc[-1] if len(df) else self.last_time
+        self.last_time = None
+        self.frozen = True
+        return self
+
+    def transform(self, raw):
+        """
+        Preprocess the next chunk of the history.
+
+        Args:
+            raw (pd.DataFrame): Raw hourly rows strictly after the previous chunk.
+
+        Returns:
+            pd.DataFrame: The chunk as `preprocess_data` would return it.
+
+        Raises:
+            ValueError: If the chunk does not start after the previous one.
+        """
+        df = self._prepare(raw)
+        if df.empty:
+            return enforce_schema(df)
+        df['weather_condition'] = df['weathercode'].map(CODE_MAP).fillna("Unknown").astype(WEATHER_CONDITION_DTYPE)
+        df = self._smooth(df, self.ewm)
+        if not self.frozen:
+            self._observe(df)
+
+        mode = self.cloud_mode()
+        if not np.isnan(mode):
+            df['cloud_coverage'] = df['cloud_coverage'].fillna(mode)
+        df['precipitation'] = df['precipitation'].fillna(0)
+
+        for column, (max_val, min_val) in historical_data.items():
+            outlier_mask = (df[column] < min_val) | (df[column] > max_val)
+            if outlier_mask.any():
+                df.loc[outlier_mask, column] = self.median(column)
+
+        self.last_time = df['date_time'].iloc[-1]
+        return enforce_schema(df)
+
+
+def preprocess_stream(chunks, preprocessor=None):
+    """
+    Generator stage that preprocesses raw chunks as they are consumed.
+
+    Args:
+        chunks (iterable): Raw hourly frames in time order (e.g. from `iter_months`).
+        preprocessor (StreamingPreprocessor, optional): Carries state across
+            calls; a new one with running statistics is used by default.
+
+    Yields:
+        pd.DataFrame: Preprocessed chunks.
+    """
+    preprocessor = preprocessor or StreamingPreprocessor()
+    for raw in chunks:
+        yield preprocessor.transform(raw)
+
+
+def preprocess_store(location, root=DEFAULT_STORE_DIR, start=None, end=None, two_pass=True):
+    """
+    Preprocess a location's stored history month by month. Peak memory is
+    about one month partition plus the fixed-size statistics, whatever the
+    length of the history.
+
+    Args:
+        location (str): Location key from `location_key`.
+        root (str): Root directory of the store.
+        start (datetime, optional): Inclusive lower bound on 'time'.
+        end (datetime, optional): Inclusive upper bound on 'time'.
+        two_pass (bool): Read the history twice, first to fix the statistics
+            over the whole window (matching `preprocess_data`); with False a
+            single pass uses running statistics.
+
+    Yields:
+        pd.DataFrame: One preprocessed month at a time.
+    """
+    preprocessor = StreamingPreprocessor()
+    if two_pass:
+        preprocessor.fit(iter_months(location, start=start, end=end, root=root, columns=_STATS_COLUMNS))
+    yield from preprocess_stream(iter_months(location, start=start, end=end, root=root), preprocessor)
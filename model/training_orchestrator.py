@@ -0,0 +1,223 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+
+from model.model_retrain_automation import (encode_object_columns, feature_columns, train_classification_model,
+                                            train_regression_model)
+
+TARGETS = {'temperature': 'temperature', 'condition': 'weather_condition_encoded'}
+
+
+@dataclass
+class TrainingMatrix:
+    """
+    The features of both models in one float32 matrix. The columns are
+    ordered so that each model's features form a contiguous block, so
+    `X(name)` is a view and neither model copies the shared columns.
+
+    Attributes:
+        matrix (np.ndarray): Rows of the lagged frame by the union of both feature lists.
+        columns (list): Feature name of each matrix column.
+        blocks (dict): Column slice of each model ('temperature', 'condition').
+        targets (dict): Target array of each model.
+        dtypes (dict): Per model, the source dtype of each feature, for the artifact manifest.
+    """
+    matrix: np.ndarray
+    columns: list
+    blocks: dict
+    targets: dict
+    dtypes: dict
+
+    def X(self, name):
+        return self.matrix[:, self.blocks[name]]
+
+    def features(self, name):
+        return self.columns[self.blocks[name]]
+
+
+def build_training_matrix(df_lagged, label_encoder, selected=None):
+    """
+    Build the shared feature matrix of both models in a single allocation,
+    with the same features `prepare_data` selects for each of them.
+
+    Args:
+        df_lagged (pd.DataFrame): Lagged feature frame without missing values.
+        label_encoder (LabelEncoder): Encoder for the weather_condition feature.
+        selected (dict, optional): Pruned feature list per model (see
+            `feature_selection`); each model keeps only these features.
+
+    Returns:
+        TrainingMatrix: The matrix, its per-model column blocks and the targets.
+    """
+    reg_features = feature_columns(df_lagged, TARGETS['temperature'], True)
+    cls_features = feature_columns(df_lagged, TARGETS['condition'], False)
+    if selected:
+        reg_features = [col for col in reg_features if col in set(selected['temperature'])]
+        cls_features = [col for col in cls_features if col in set(selected['condition'])]
+    reg_only = [col for col in reg_features if col not in set(cls_features)]
+    shared = [col for col in reg_features if col in set(cls_features)]
+    cls_only = [col for col in cls_features if col not in set(reg_features)]
+    columns = reg_only + shared + cls_only
+
+    matrix = np.empty((len(df_lagged), len(columns)), dtype=np.float32)
+    for j, col in enumerate(columns):
+        values = df_lagged[col]
+        if values.dtype == 'object' or isinstance(values.dtype, pd.CategoricalDtype):
+            values = encode_object_columns(df_lagged[[col]].copy(), label_encoder)[col]
+        matrix[:, j] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+
+    blocks = {'temperature': slice(0, len(reg_only) + len(shared)), 'condition': slice(len(reg_only), len(columns))}
+    return TrainingMatrix(
+        matrix=matrix,
+        columns=columns,
+        blocks=blocks,
+        targets={name: df_lagged[target].to_numpy() for name, target in TARGETS.items()},
+        dtypes={name: df_lagged.dtypes[columns[block]].astype(str).to_dict() for name, block in blocks.items()},
+    )
+
+
+def split_cpu_budget(weights, cpu_budget=None):
+    """
+    Split a thread budget between jobs in proportion to their weights, at
+    least one thread each; the remainder goes to the heaviest job.
+
+    Args:
+        weights (dict): Relative cost of each job.
+        cpu_budget (int, optional): Total threads (default: all cores).
+
+    Returns:
+        dict: Threads per job.
+    """
+    budget = cpu_budget or os.cpu_count() or 1
+    total = sum(weights.values())
+    shares = {name: max(1, int(budget * weight / total)) for name, weight in weights.items()}
+    leftover = budget - sum(shares.values())
+    if leftover > 0:
+        shares[max(weights, key=weights.get)] += leftover
+    return shares
+
+
+def fit_concurrently(jobs, weights, cpu_budget=None):
+    """
+    Run training jobs at the same time in threads (XGBoost releases the GIL
+    while it trains), each limited to its share of the CPU budget. With a
+    budget below two threads the jobs run one after the other instead.
+    Every job is allowed to finish; if any failed, the first error is raised,
+    so the caller never sees (or publishes) a partial set of models.
+
+    Args:
+        jobs (dict): Job name to a callable taking the thread count and
+            returning the trained model.
+        weights (dict): Relative cost of each job, for `split_cpu_budget`.
+        cpu_budget (int, optional): Total threads (default: all cores).
+
+    Returns:
+        tuple: (models, timings) dicts keyed by job name; timings hold the
+            'threads' and 'seconds' of each job.
+    """
+    budget = cpu_budget or os.cpu_count() or 1
+    concurrent = budget >= 2 and len(jobs) > 1
+    threads = split_cpu_budget(weights, budget) if concurrent else {name: budget for name in jobs}
+
+    def timed(name):
+        started = time.perf_counter()
+        model = jobs[name](threads[name])
+        return model, {'threads': threads[name], 'seconds': round(time.perf_counter() - started, 4)}
+
+    if not concurrent:
+        results = {name: timed(name) for name in jobs}
+    else:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            # Copy the context so instrumentation sees the active run
+            futures = {name: pool.submit(contextvars.copy_context().run, timed, name) for name in jobs}
+            wait(futures.values())
+        for future in futures.values():
+            if future.exception() is not None:
+                raise future.exception()
+        results = {name: future.result() for name, future in futures.items()}
+
+    models = {name: model for name, (model, _) in results.items()}
+    timings = {name: timing for name, (_, timing) in results.items()}
+    return models, timings
+
+
+def fit_weights(label_encoder):
+    """
+    Relative cost of the two fits: a condition round grows one tree per
+    class, a temperature round one tree.
+    """
+    return {'temperature': 1, 'condition': max(1, len(label_encoder.classes_))}
+
+
+def fit_full(data, label_encoder, cpu_budget=None):
+    """
+    Fit both models from scratch on a `TrainingMatrix`, concurrently.
+
+    Returns:
+        tuple: (models, timings) as returned by `fit_concurrently`.
+    """
+    return fit_concurrently({
+        'temperature': lambda threads: name_features(
+            train_regression_model(data.X('temperature'), data.targets['temperature'], threads),
+            data.features('temperature')),
+        'condition': lambda threads: name_features(
+            train_classification_model(data.X('condition'), data.targets['condition'], label_encoder, threads)[0],
+            data.features('condition')),
+    }, fit_weights(label_encoder), cpu_budget)
+
+
+def fit_and_score(name, X_train, y_train, X_test, y_test, n_jobs=None, params=None):
+    """
+    Fit one model on a training block and score it on the following test
+    block, as the backtest and the feature selection report do.
+
+    Args:
+        name (str): 'temperature' or 'condition'.
+        X_train, y_train: Training features and targets.
+        X_test, y_test: Test features and targets.
+        n_jobs (int, optional): Threads XGBoost may use (default: all cores).
+        params (dict, optional): XGBoost parameters overriding `MODEL_PARAMS`.
+
+    Returns:
+        tuple: (model, result) where result holds the metrics ('rmse' and
+            'mae', or 'accuracy' and 'f1_macro'), 'fit_seconds' and
+            'predict_seconds'. The classifier is trained on contiguous class
+            codes (XGBoost needs them and a training block may lack some
+            conditions); the metrics compare the original codes.
+    """
+    params = params or {}
+    started = time.perf_counter()
+    if name == 'temperature':
+        model = train_regression_model(X_train, y_train, n_jobs, **params)
+    else:
+        classes = np.unique(y_train)
+        model = train_classification_model(X_train, np.searchsorted(classes, y_train), None, n_jobs, **params)[0]
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    predictions = model.predict(X_test)
+    predict_seconds = time.perf_counter() - started
+
+    if name == 'temperature':
+        errors = predictions - y_test
+        metrics = {'rmse': float(np.sqrt(np.mean(errors ** 2))), 'mae': float(np.mean(np.abs(errors)))}
+    else:
+        predictions = classes[predictions.astype(int)]
+        metrics = {'accuracy': float(np.mean(predictions == y_test)),
+                   'f1_macro': float(f1_score(y_test, predictions, average='macro', zero_division=0))}
+    return model, {**metrics, 'fit_seconds': fit_seconds, 'predict_seconds': predict_seconds}
+
+
+def name_features(model, features):
+    """
+    Attach feature names to a model trained on a bare matrix, so the saved
+    artifact and name-based inference see the same columns as before.
+    """
+    model.get_booster().feature_names = list(features)
+    return model
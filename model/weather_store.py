@@ -0,0 +1,168 @@
+import os
+import glob
+
+import pandas as pd
+
+from model.data_preprocessor import RAW_DTYPES, enforce_schema
+
+DEFAULT_STORE_DIR = 'weather_store'
+
+
+def location_key(latitude, longitude):
+    """
+    Build the directory name used to partition the store by location.
+
+    Args:
+        latitude (float): Latitude of the location.
+        longitude (float): Longitude of the location.
+
+    Returns:
+        str: Filesystem-safe location key, e.g. 'lat17.3850_lon78.4867'.
+    """
+    return f"lat{latitude:.4f}_lon{longitude:.4f}"
+
+
+def _location_dir(location, root):
+    return os.path.join(root, location)
+
+
+def _partition_path(location, month, root):
+    return os.path.join(_location_dir(location, root), f"{month}.parquet")
+
+
+def list_partitions(location, root=DEFAULT_STORE_DIR):
+    """
+    List the month partitions stored for a location, oldest first.
+
+    Args:
+        location (str): Location key from `location_key`.
+        root (str): Root directory of the store.
+
+    Returns:
+        list: Month labels in 'YYYY-MM' format.
+    """
+    paths = glob.glob(os.path.join(_location_dir(location, root), '*.parquet'))
+    return sorted(os.path.splitext(os.path.basename(p))[0] for p in paths)
+
+
+def _write_partition(df, path):
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def append_observations(df, location, root=DEFAULT_STORE_DIR):
+    """
+    Merge raw hourly observations into the month partitions of a location.
+    Only the months touched by `df` are rewritten; rows with an existing
+    timestamp replace the stored ones. Partitions are written with the
+    compact `RAW_DTYPES`.
+
+    Args:
+        df (pd.DataFrame): Raw hourly data with a 'time' column.
+        location (str): Location key from `location_key`.
+        root (str): Root directory of the store.
+
+    Returns:
+        int: Number of rows written.
+    """
+    if df.empty:
+        return 0
+
+    os.makedirs(_location_dir(location, root), exist_ok=True)
+    df = df.copy()
+    df['time'] = pd.to_datetime(df['time'])
+    months = df['time'].dt.strftime('%Y-%m')
+
+    for month, chunk in df.groupby(months, sort=True):
+        path = _partition_path(location, month, root)
+        if os.path.exists(path):
+            chunk = pd.concat([pd.read_parquet(path), chunk], ignore_index=True)
+        chunk = enforce_schema(chunk.drop_duplicates(subset='time', keep='last').sort_values('time'), RAW_DTYPES)
+        _write_partition(chunk.reset_index(drop=True), path)
+    return len(df)
+
+
+def load_observations(location, start=None, end=None, root=DEFAULT_STORE_DIR, columns=None):
+    """
+    Load stored observations for a location, reading only the month
+    partitions that overlap the requested window.
+
+    Args:
+        location (str): Location key from `location_key`.
+        start (datetime, optional): Inclusive lower bound on 'time'.
+        end (datetime, optional): Inclusive upper bound on 'time'.
+        root (str): Root directory of the store.
+        columns (list, optional): Columns to read; 'time' is always included.
+
+    Returns:
+        pd.DataFrame: Hourly observations sorted by 'time', empty if none are stored.
+    """
+    months = list_partitions(location, root)
+    if start is not None:
+        months = [m for m in months if m >= pd.Timestamp(start).strftime('%Y-%m')]
+    if end is not None:
+        months = [m for m in months if m <= pd.Timestamp(end).strftime('%Y-%m')]
+    if not months:
+        return pd.DataFrame()
+    if columns is not None:
+        columns = ['time'] + [c for c in columns if c != 'time']
+
+    df = pd.concat(
+        [pd.read_parquet(_partition_path(location, m, root), columns=columns) for m in months],
+        ignore_index=True
+    )
+    if start is not None:
+        df = df[df['time'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['time'] <= pd.Timestamp(end)]
+    return enforce_schema(df, RAW_DTYPES).reset_index(drop=True)
+
+
+def iter_months(location, start=None, end=None, root=DEFAULT_STORE_DIR, columns=None):
+    """
+    Yield stored observations one month partition at a time, oldest first,
+    so a long history can be processed without holding it in memory.
+
+    Args:
+        location (str): Location key from `location_key`.
+        start (datetime, optional): Inclusive lower bound on 'time'.
+        end (datetime, optional): Inclusive upper bound on 'time'.
+        root (str): Root directory of the store.
+        columns (list, optional): Columns to read; 'time' is always included.
+
+    Yields:
+        pd.DataFrame: Hourly observations of one month sorted by 'time'.
+    """
+    if columns is not None:
+        columns = ['time'] + [c for c in columns if c != 'time']
+    for month in list_partitions(location, root):
+        if start is not None and month < pd.Timestamp(start).strftime('%Y-%m'):
+            continue
+        if end is not None and month > pd.Timestamp(end).strftime('%Y-%m'):
+            break
+        df = pd.read_parquet(_partition_path(location, month, root), columns=columns)
+        if start is not None:
+            df = df[df['time'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['time'] <= pd.Timestamp(end)]
+        if not df.empty:
+            yield enforce_schema(df, RAW_DTYPES).reset_index(drop=True)
+
+
+def last_observation_time(location, root=DEFAULT_STORE_DIR):
+    """
+    Return the timestamp of the latest stored observation for a location.
+
+    Args:
+        location (str): Location key from `location_key`.
+        root (str): Root directory of the store.
+
+    Returns:
+        pd.Timestamp: Latest 'time' value, or None if the store is empty.
+    """
+    months = list_partitions(location, root)
+    if not months:
+        return None
+    df = pd.read_parquet(_partition_path(location, months[-1], root), columns=['time'])
+    return df['time'].max()
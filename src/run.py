@@ -1,9 +1,34 @@
-from model.run_model_retrain import run_model_retrain
+import argparse
+import time
 
+_started = time.perf_counter()
+from model.forecast_daemon import job_lock  # noqa: E402
+from model.run_model_retrain import run_model_retrain  # noqa: E402
+IMPORT_SECONDS = time.perf_counter() - _started
 
-def run_model():
-    run_model_retrain()
+
+def run_model(output_dir='.'):
+    # Same lock as the daemon's jobs, so a cron run never writes the artifacts while a job does
+    with job_lock(output_dir) as acquired:
+        if not acquired:
+            print(f"Skipped: another process is running a job in {output_dir}")
+            return
+        # A cold run pays the library imports each time; record them so cron and daemon latencies compare
+        run_model_retrain(output_dir=output_dir,
+                          run_context={'trigger': 'cron', 'import_seconds': round(IMPORT_SECONDS, 3)})
+
+
+def run_daemon():
+    from model.forecast_daemon import ForecastDaemon
+    ForecastDaemon().run()
 
 
 if __name__ == "__main__":
-    run_model()
+    parser = argparse.ArgumentParser(description="Retrain and forecast once, or keep running as a scheduler.")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Stay resident: forecast hourly and retrain daily with warm state.")
+    args = parser.parse_args()
+    if args.daemon:
+        run_daemon()
+    else:
+        run_model()
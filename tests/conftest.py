@@ -0,0 +1,69 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+
+class StubArchive(ThreadingHTTPServer):
+    """
+    Local stand-in for the Open-Meteo archive. Every window is answered with
+    hourly rows from its start date through 00:00 of the day after its end
+    date, so consecutive windows overlap by one hour. `failures` maps a
+    window start date to the status codes returned before it succeeds.
+    """
+
+    def __init__(self, failures=None):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.failures = {start: list(codes) for start, codes in (failures or {}).items()}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/archive"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        with self.server.lock:
+            self.server.requests.append((params['start_date'], params['end_date']))
+            pending = self.server.failures.get(params['start_date'])
+            status = pending.pop(0) if pending else 200
+        if status != 200:
+            self.send_response(status)
+            self.end_headers()
+            return
+        times = pd.date_range(params['start_date'], pd.Timestamp(params['end_date']) + pd.Timedelta(days=1),
+                              freq='H')
+        hourly = {'time': times.strftime('%Y-%m-%dT%H:%M').tolist()}
+        for i, name in enumerate(params['hourly'].split(',')):
+            hourly[name] = [float(i)] * len(times)
+        body = json.dumps({'hourly': hourly}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_archive():
+    servers = []
+
+    def start(failures=None):
+        server = StubArchive(failures)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+import requests
+
+from model import data_fetcher
+from model.data_fetcher import HOURLY_VARIABLES, fetch_open_meteo_chunked
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    # Record the jitter bounds instead of sleeping
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append(high)
+        return 0
+
+    monkeypatch.setattr(data_fetcher.random, 'uniform', uniform)
+    return bounds
+
+
+def test_windows_follow_calendar_months(stub_archive):
+    server = stub_archive()
+    df = fetch_open_meteo_chunked('2024-01-15', '2024-04-10', base_url=server.url, cache=False)
+
+    assert sorted(server.requests) == [('2024-01-15', '2024-01-31'), ('2024-02-01', '2024-02-29'),
+                                       ('2024-03-01', '2024-03-31'), ('2024-04-01', '2024-04-10')]
+    assert len(df.attrs['chunk_latencies']) == 4
+
+
+def test_merged_frame_has_no_duplicate_hours(stub_archive):
+    server = stub_archive()
+    df = fetch_open_meteo_chunked('2024-01-15', '2024-04-10', chunk='quarter', base_url=server.url, cache=False)
+
+    assert sorted(server.requests) == [('2024-01-15', '2024-03-31'), ('2024-04-01', '2024-04-10')]
+    assert df['time'].is_unique and df['time'].is_monotonic_increasing
+    expected = pd.date_range('2024-01-15', '2024-04-11', freq='H')
+    assert df['time'].tolist() == expected.tolist()
+    assert list(df.columns) == ['time'] + HOURLY_VARIABLES
+
+
+def test_retryable_statuses_are_retried_with_backoff(stub_archive, backoffs):
+    server = stub_archive({'2024-02-01': [429, 503, 500]})
+    df = fetch_open_meteo_chunked('2024-01-01', '2024-02-29', base_url=server.url, cache=False, backoff=0.5)
+
+    assert server.requests.count(('2024-02-01', '2024-02-29')) == 4
+    assert backoffs == [0.5, 1.0, 2.0]
+    attempts = {lat['start_date']: lat['attempts'] for lat in df.attrs['chunk_latencies']}
+    assert attempts == {'2024-01-01': 1, '2024-02-01': 4}
+    assert df['time'].is_unique
+
+
+def test_gives_up_after_the_last_retry(stub_archive, backoffs):
+    server = stub_archive({'2024-01-01': [502] * 3})
+    with pytest.raises(requests.HTTPError):
+        fetch_open_meteo_chunked('2024-01-01', '2024-01-31', base_url=server.url, cache=False, retries=2)
+    assert len(server.requests) == 3
+    assert len(backoffs) == 2
+
+
+def test_client_errors_are_not_retried(stub_archive, backoffs):
+    server = stub_archive({'2024-01-01': [400]})
+    with pytest.raises(requests.HTTPError):
+        fetch_open_meteo_chunked('2024-01-01', '2024-01-31', base_url=server.url, cache=False)
+    assert len(server.requests) == 1
+    assert backoffs == []
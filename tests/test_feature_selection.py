@@ -0,0 +1,24 @@
+import numpy as np
+from xgboost import XGBRegressor
+
+from model.feature_selection import correlation_clusters, select_features
+
+
+def test_min_features_floor_holds_for_collinear_input():
+    rng = np.random.default_rng(0)
+    signals = rng.normal(size=(2000, 3))
+    # Twelve features, four near-copies of each of three signals: three clusters
+    X = np.repeat(signals, 4, axis=1) + rng.normal(0, 0.01, (2000, 12))
+    y = signals @ [3.0, 2.0, 1.0]
+    features = [f'f{j}' for j in range(12)]
+    model = XGBRegressor(n_estimators=30, max_depth=3, n_jobs=1).fit(X, y)
+
+    selection = select_features(model, X, features, min_features=8)
+    assert len(selection['features']) == 8
+    assert set(selection['features']) | set(selection['dropped']) == set(features)
+    # The features added back are the most important of the pruned ones
+    importance = selection['importance']
+    representatives = {cluster[0][0] for cluster in correlation_clusters(X, features, importance)}
+    assert len(representatives) == 3
+    added = set(selection['features']) - representatives
+    assert min(importance[name] for name in added) >= max(importance[name] for name in selection['dropped'])
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.data_preprocessor import preprocess_data
+from model.feature_engineering import ROLLING_COLUMNS, ROLLING_WINDOW, feature_engineering_pipeline
+from model.incremental_features import fit_feature_state, update_features
+from model.model_retrain_automation import create_lagged_features
+
+LAGS = [1, 2, 3, 24]
+
+
+def _raw_hours(hours, seed=0):
+    rng = np.random.default_rng(seed)
+    raw = pd.DataFrame({
+        'time': pd.date_range('2024-01-01', periods=hours, freq='H'),
+        'temperature_2m': 25 + 5 * np.sin(np.arange(hours) / 24 * 2 * np.pi) + rng.normal(0, 1, hours),
+        'relative_humidity_2m': rng.uniform(30, 90, hours),
+        'wind_speed_10m': rng.uniform(0, 20, hours),
+        'wind_direction_10m': rng.uniform(0, 360, hours),
+        'pressure_msl': rng.normal(1010, 3, hours),
+        'precipitation': rng.exponential(0.2, hours),
+        'cloudcover': rng.integers(0, 101, hours).astype(float),
+        'weathercode': rng.choice([0, 1, 2, 3, 61], hours),
+    })
+    # Sensor glitches outside the valid ranges, before and after the split
+    for column, value in [('temperature_2m', 80.0), ('wind_speed_10m', 300.0), ('cloudcover', 150.0),
+                          ('precipitation', 900.0), ('relative_humidity_2m', -20.0), ('pressure_msl', 1200.0)]:
+        raw.loc[rng.choice(hours, 25, replace=False), column] = value
+    for column in ['temperature_2m', 'cloudcover', 'precipitation', 'pressure_msl']:
+        raw.loc[rng.choice(hours, 15, replace=False), column] = np.nan
+    return raw
+
+
+def _full_recompute(raw, medians=None):
+    df, _ = feature_engineering_pipeline(preprocess_data(raw.copy(), medians))
+    return create_lagged_features(df, LAGS)
+
+
+@pytest.mark.parametrize('batches', [[300], [1, 47, 252]])
+def test_update_matches_full_recompute_with_outliers(batches):
+    raw = _raw_hours(800)
+    split = 500
+    history, le = feature_engineering_pipeline(preprocess_data(raw.iloc[:split].copy()))
+    state = fit_feature_state(raw.iloc[:split], history, le, LAGS)
+
+    rolling = [f'{col}_rolling_mean_{ROLLING_WINDOW}' for col in ROLLING_COLUMNS]
+    start = split
+    for size in batches:
+        rows = update_features(raw.iloc[start:start + size], state)
+        # A full recompute over everything received so far, with the medians frozen at fit time
+        expected = _full_recompute(raw.iloc[:start + size], state.outlier_medians)
+        expected = expected.iloc[start:].reset_index(drop=True)
+        exact = [col for col in expected.columns if col not in rolling]
+        pd.testing.assert_frame_equal(rows[exact], expected[exact])
+        pd.testing.assert_frame_equal(rows[rolling], expected[rolling], rtol=1e-6)
+        start += size
+
+
+def test_frozen_medians_are_the_fitted_history_medians():
+    raw = _raw_hours(500)
+    history, le = feature_engineering_pipeline(preprocess_data(raw.copy()))
+    state = fit_feature_state(raw, history, le, LAGS)
+    # Freezing changes nothing for the history the state was fitted on
+    pd.testing.assert_frame_equal(_full_recompute(raw, state.outlier_medians), _full_recompute(raw))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from model.prediction_log import PredictionLog
+from model.weather_store import append_observations
+
+
+def _forecast(issued_at, hours=168, offset=0.0):
+    times = pd.date_range(pd.Timestamp(issued_at) + pd.Timedelta(hours=1), periods=hours, freq='H')
+    return pd.DataFrame({
+        'date_time': times,
+        'horizon': range(1, hours + 1),
+        'temperature': [20.0 + offset] * hours,
+        'weather_condition': ['Clear sky'] * hours,
+    })
+
+
+def test_repeated_forecast_is_logged_once(tmp_path):
+    log = PredictionLog('test', str(tmp_path))
+    forecast = _forecast('2026-10-10 05:00')
+    assert log.append(forecast, 'v1') == 168
+    # Reruns with no new data issue the same forecast again
+    assert log.append(forecast, 'v1') == 0
+    assert log.append(forecast, 'v1') == 0
+    assert len(log.records()) == 168
+
+
+def test_one_block_per_distinct_forecast(tmp_path):
+    log = PredictionLog('test', str(tmp_path))
+    log.append(_forecast('2026-10-10 05:00'), 'v1')
+    log.append(_forecast('2026-10-10 05:00', offset=1.0), 'v2')  # new model, same issue hour
+    log.append(_forecast('2026-10-10 06:00'), 'v2')
+    log.append(_forecast('2026-10-10 06:00'), 'v2')
+
+    blocks = log.read(by='issued_at').groupby(['issued_at', 'model_version'], observed=True).size()
+    assert blocks.tolist() == [168, 168, 168]
+
+
+def _observations(start, end, temperature):
+    times = pd.date_range(start, end, freq='H')
+    return pd.DataFrame({'time': times, 'temperature_2m': temperature, 'weathercode': 0})
+
+
+def test_backfilled_forecasts_are_merged_in_issue_order_and_scored(tmp_path):
+    root = str(tmp_path)
+    log = PredictionLog('test', root)
+    append_observations(_observations('2026-10-09 00:00', '2026-10-10 06:00', 21.0), 'test', root)
+    log.append(_forecast('2026-10-10 05:00'), 'v2')
+    assert log.score() == 1  # 06:00 at horizon 1
+
+    # One-hour-ahead predictions for hours that were observed before the live forecast
+    times = pd.date_range('2026-10-09 01:00', '2026-10-10 05:00', freq='H')
+    backfill = pd.DataFrame({'date_time': times, 'horizon': 1, 'temperature': 20.5,
+                             'weather_condition': 'Clear sky'})
+    assert log.insert(backfill, 'v1') == len(times)
+    assert log.insert(backfill, 'v1') == 0
+
+    issued = log.records()['issued_at']
+    assert len(issued) == 168 + len(times) and np.all(np.diff(issued) >= 0)
+    assert log.append(_forecast('2026-10-10 06:00'), 'v2') == 168
+    accuracy = log.rolling_accuracy(days=2).set_index('model_version')
+    assert accuracy.loc['v1', 'predictions'] == len(times)
+    assert accuracy.loc['v1', 'temperature_mae'] == 0.5
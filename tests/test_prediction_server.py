@@ -0,0 +1,81 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import LabelEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+from model.prediction_server import MicroBatcher, make_handler
+
+FEATURES = ['temperature_lag_1', 'humidity_lag_1']
+
+
+class StaticCache:
+    """Model cache stand-in serving two small fitted models."""
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 40, (50, len(FEATURES)))
+        le = LabelEncoder().fit(['Clear sky', 'Slight rain'])
+        self.models = {
+            'reg_model': LinearRegression().fit(X, X[:, 0]),
+            'clf_model': DecisionTreeClassifier().fit(X, (X[:, 1] > 20).astype(int)),
+            'temp_features': FEATURES,
+            'cond_features': FEATURES,
+            'label_encoder': le,
+        }
+
+    def get(self):
+        return 'v1', self.models
+
+
+@pytest.fixture
+def batcher():
+    # A long wait so concurrent requests land in the same micro-batch
+    batcher = MicroBatcher(StaticCache(), max_wait_ms=200.0)
+    yield batcher
+    batcher.close()
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, json.dumps(payload).encode(), {'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def test_bad_row_is_rejected_without_failing_concurrent_requests(batcher):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(batcher))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+    try:
+        with ThreadPoolExecutor(2) as pool:
+            bad = pool.submit(_post, url, {'row': {'temperature_lag_1': 'warm', 'humidity_lag_1': 50}})
+            good = pool.submit(_post, url, {'row': {'temperature_lag_1': '25.5', 'humidity_lag_1': 50}})
+            (bad_status, bad_body), (good_status, good_body) = bad.result(), good.result()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert bad_status == 400 and 'temperature_lag_1' in bad_body['error']
+    assert good_status == 200
+    assert good_body['predictions'][0]['temperature'] == pytest.approx(25.5, abs=1e-3)
+
+
+def test_failed_batch_is_rescored_one_request_at_a_time(batcher):
+    # Infinity passes validation but makes the regressor raise for the whole batch
+    with ThreadPoolExecutor(2) as pool:
+        bad = pool.submit(batcher.submit, [{'temperature_lag_1': np.inf, 'humidity_lag_1': 50.0}])
+        good = pool.submit(batcher.submit, [{'temperature_lag_1': 25.5, 'humidity_lag_1': 50.0}])
+        with pytest.raises(ValueError):
+            bad.result()
+        version, predictions = good.result()
+    assert version == 'v1' and predictions[0]['temperature'] == pytest.approx(25.5, abs=1e-3)
@@ -0,0 +1,67 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from model.data_fetcher import ARCHIVE_URL, fetch_open_meteo_chunked
+from model.response_cache import RECENT_TTL_SECONDS, ResponseCache
+
+
+def _params(start_date, end_date):
+    return {'latitude': 17.385, 'longitude': 78.4867, 'start_date': start_date, 'end_date': end_date,
+            'hourly': 'temperature_2m,weathercode', 'timezone': 'Asia/Kolkata'}
+
+
+def _age(cache, params, seconds):
+    path = cache._path(cache.key(ARCHIVE_URL, params))
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_rerun_is_answered_from_cache(stub_archive, tmp_path):
+    server = stub_archive()
+    cache = ResponseCache(str(tmp_path))
+    first = fetch_open_meteo_chunked('2023-01-01', '2023-06-30', base_url=server.url, cache=cache)
+    assert len(server.requests) == 6
+
+    second = fetch_open_meteo_chunked('2023-01-01', '2023-06-30', base_url=server.url, cache=cache)
+    assert len(server.requests) == 6
+    assert cache.counters['hits'] == 6
+    assert all(lat['cached'] for lat in second.attrs['chunk_latencies'])
+    assert second.equals(first)
+
+
+def test_recent_windows_expire_after_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    today = datetime.utcnow().date()
+    recent = _params((today - timedelta(days=3)).isoformat(), today.isoformat())
+    final = _params('2023-01-01', '2023-01-31')
+    for params in (recent, final):
+        cache.put(ARCHIVE_URL, params, json.dumps({'hourly': {}}).encode())
+
+    assert cache.get(ARCHIVE_URL, recent) is not None
+    _age(cache, recent, RECENT_TTL_SECONDS + 60)
+    assert cache.get(ARCHIVE_URL, recent) is None
+    assert cache.counters['expired'] == 1
+
+    # A window that was already final when fetched never expires
+    _age(cache, final, 30 * 24 * 3600)
+    assert cache.get(ARCHIVE_URL, final) is not None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    windows = [_params(f'2023-{month:02d}-01', f'2023-{month:02d}-28') for month in range(1, 5)]
+    for params in windows[:3]:
+        cache.put(ARCHIVE_URL, params, json.dumps({'hourly': {'x': os.urandom(2000).hex()}}).encode())
+    for age, params in zip([300, 200, 100], windows[:3]):
+        _age(cache, params, age)
+    # Reading the oldest entry makes the second one the least recently used
+    assert cache.get(ARCHIVE_URL, windows[0]) is not None
+
+    cache = ResponseCache(str(tmp_path), max_bytes=cache.stats()['bytes'] + 100)
+    cache.put(ARCHIVE_URL, windows[3], json.dumps({'hourly': {'x': os.urandom(2000).hex()}}).encode())
+
+    assert cache.counters['evictions'] == 1
+    assert cache.get(ARCHIVE_URL, windows[1]) is None
+    assert all(cache.get(ARCHIVE_URL, params) is not None for params in (windows[0], windows[2], windows[3]))
@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+
+import pytest
+
+from model import run_batch_retrain as batch
+from model.run_batch_retrain import Site
+
+
+@pytest.mark.parametrize('name', ['../escape', 'nested/site', '..', '', os.path.abspath('site')])
+def test_site_names_outside_the_output_root_are_rejected(name, tmp_path):
+    with pytest.raises(ValueError, match='plain directory names'):
+        batch.run_batch_retrain([Site('ok', 17.4, 78.5), Site(name, 17.4, 78.5)], output_root=str(tmp_path))
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="workers must inherit the patch")
+def test_dead_worker_fails_its_sites_instead_of_the_batch(tmp_path, monkeypatch):
+    def run_model_retrain(latitude, longitude, store_dir, output_dir, n_jobs):
+        if os.path.basename(output_dir) == 'crash':
+            os._exit(1)
+
+    monkeypatch.setattr(batch, 'run_model_retrain', run_model_retrain)
+    results = batch.run_batch_retrain([Site('crash', 17.4, 78.5), Site('other', 28.6, 77.2)], workers=1,
+                                      output_root=str(tmp_path), store_dir=str(tmp_path))
+    by_site = {result['site']: result for result in results}
+    assert set(by_site) == {'crash', 'other'}
+    assert not by_site['crash']['ok'] and 'BrokenProcessPool' in by_site['crash']['error']
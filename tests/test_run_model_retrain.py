@@ -0,0 +1,33 @@
+import json
+import os
+
+import pandas as pd
+
+from benchmarks.synthetic_weather import synthetic_hourly
+from model import run_model_retrain as retrain
+from model.prediction_log import PredictionLog
+from model.retrain_policy import MIN_NEW_ROWS
+from model.weather_store import append_observations, location_key
+
+
+def test_skipped_retrain_still_logs_the_new_forecast(tmp_path, monkeypatch):
+    store_dir, output_dir = str(tmp_path / 'store'), str(tmp_path / 'out')
+    location = location_key(retrain.DEFAULT_LATITUDE, retrain.DEFAULT_LONGITUDE)
+    start = (pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=60)).floor('D')
+    raw = synthetic_hourly(60 / 365, start=start, missing_rate=0, outlier_rate=0)
+    new_rows = MIN_NEW_ROWS // 4
+    arrivals = [raw.iloc[:-new_rows], raw.iloc[-new_rows:]]
+
+    # Each run receives the next batch of observations instead of calling the API
+    def sync_store(years, latitude, longitude, root):
+        return append_observations(arrivals.pop(0), location, root)
+
+    monkeypatch.setattr(retrain, 'sync_store', sync_store)
+    for _ in range(2):
+        retrain.run_model_retrain(store_dir=store_dir, output_dir=output_dir, n_jobs=1)
+
+    with open(os.path.join(output_dir, 'artifacts', 'retrain_log.jsonl')) as f:
+        paths = [json.loads(line)['path'] for line in f]
+    assert paths == ['full', 'skip']
+    issued = PredictionLog(location, store_dir).read(by='issued_at')['issued_at'].unique()
+    assert list(issued) == [raw['time'].iloc[-new_rows - 1], raw['time'].iloc[-1]]